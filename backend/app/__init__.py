@@ -1,10 +1,29 @@
+import atexit
 import logging
+import threading
 from flask import Flask
 from flask_cors import CORS
 from pymongo import MongoClient
 from app.config import Config
+from app.commands import register_commands
 from app.routes.movie_routes import movie_bp
 from app.routes.history_routes import history_bp
+from app.routes.catalog_routes import catalog_bp
+from app.services.upstream_client import UpstreamClient
+from app.services.catalog_sync import CatalogSyncScheduler
+from app.services.search_index import SearchIndexRegistry
+from app.services.history_writer import HistoryWriter
+from app.services.history_service import HistoryService
+from app.services.history_rollups import HistoryRollups
+from app.services.stats_cache import StatsCache
+from app.services.live_stats import LiveStats
+from app.services.history_jobs import HistoryJobRunner
+from app.services.recent_history import RecentHistory
+from app.utils.cache import ResponseCache
+from app.utils.concurrency import SingleFlight
+from app.utils.json_encoding import init_json
+
+logger = logging.getLogger(__name__)
 
 def setup_logger():
     logging.basicConfig(
@@ -13,9 +32,61 @@ def setup_logger():
     )
     return logging.getLogger(__name__)
 
+def ensure_history_indexes(db, retention_days=0):
+    """Create missing search_history indexes; a failure is logged, not fatal"""
+    history_service = HistoryService(db)
+    try:
+        history_service.ensure_indexes(retention_days)
+        HistoryRollups(db).ensure_indexes()
+        missing = history_service.missing_indexes()
+    except Exception as e:
+        logger.warning(f"Could not ensure search_history indexes: {str(e)}")
+        return
+    if missing:
+        logger.warning(f"search_history is missing indexes: {', '.join(missing)}")
+
+def start_history_index_build(app):
+    """
+    Ensure the search_history indexes in a daemon thread, so an unreachable
+    MongoDB cannot hold up startup; its own client gives up after
+    HISTORY_INDEX_TIMEOUT_MS.
+    """
+    def build():
+        client = MongoClient(
+            app.config['MONGODB_URI'],
+            serverSelectionTimeoutMS=app.config['HISTORY_INDEX_TIMEOUT_MS']
+        )
+        try:
+            ensure_history_indexes(client.get_default_database(), app.config['HISTORY_RETENTION_DAYS'])
+        finally:
+            client.close()
+
+    thread = threading.Thread(target=build, name='history-indexes', daemon=True)
+    thread.start()
+    return thread
+
+def start_background_jobs(app):
+    """
+    Start the periodic stats refresh, live stats snapshots and catalog sync.
+    Only the serving process calls this (gunicorn.conf.py and run.py), so
+    `flask` CLI commands and tests never start these threads.
+    """
+    if app.config['HISTORY_STATS_REFRESH_INTERVAL'] > 0:
+        app.history_stats.start(app.config['HISTORY_STATS_REFRESH_INTERVAL'])
+
+    if app.config['LIVE_STATS_SNAPSHOT_INTERVAL'] > 0:
+        app.live_stats.start(lambda: app.db.search_stats_sketches, app.config['LIVE_STATS_SNAPSHOT_INTERVAL'])
+
+    if app.config['CATALOG_SYNC_INTERVAL'] > 0 and app.catalog_sync is None:
+        app.catalog_sync = CatalogSyncScheduler(app, app.config['CATALOG_SYNC_INTERVAL'])
+        app.catalog_sync.start()
+
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+
+    # Serialize datetimes and ObjectIds natively, with orjson when available
+    init_json(app)
     
     # Initialize CORS
     CORS(app)
@@ -23,10 +94,87 @@ def create_app(config_class=Config):
     # Initialize MongoDB
     client = MongoClient(app.config['MONGODB_URI'])
     app.db = client.get_default_database()
+
+    # Create and check the search_history indexes without blocking startup
+    app.history_index_build = None
+    if app.config['HISTORY_ENSURE_INDEXES']:
+        app.history_index_build = start_history_index_build(app)
+
+    # Initialize shared upstream HTTP client
+    app.upstream = UpstreamClient.from_config(app.config)
+
+    # Initialize upstream response cache and request coalescing
+    app.lotr_cache = ResponseCache(
+        max_entries=app.config['LOTR_CACHE_MAX_ENTRIES'],
+        stale_ttl=app.config['LOTR_CACHE_STALE_TTL']
+    )
+    app.lotr_flight = SingleFlight()
+
+    # Initialize in-memory catalog search indexes
+    app.search_indexes = SearchIndexRegistry()
     
+    # Initialize cache of /api/history/stats results
+    def load_history_stats(days):
+        with app.app_context():
+            return HistoryService.from_app(app).get_statistics(days)
+
+    app.history_stats = StatsCache(
+        load_history_stats,
+        ttl=app.config['HISTORY_STATS_CACHE_TTL'],
+        min_refresh_interval=app.config['HISTORY_STATS_MIN_REFRESH']
+    )
+
+    # Initialize streaming sketches for live statistics
+    app.live_stats = LiveStats.from_config(app.config)
+
+    # Initialize write-behind buffer for search history
+    def history_written(docs):
+        if app.config['HISTORY_STATS_ROLLUPS']:
+            HistoryRollups(app.db).apply(docs)
+        app.history_stats.bump()
+
+    app.history_writer = None
+    if app.config['HISTORY_WRITE_BEHIND']:
+        app.history_writer = HistoryWriter(
+            lambda: app.db.search_history,
+            batch_size=app.config['HISTORY_FLUSH_BATCH_SIZE'],
+            flush_interval=app.config['HISTORY_FLUSH_INTERVAL'],
+            max_queue_size=app.config['HISTORY_QUEUE_MAX_SIZE'],
+            enqueue_timeout=app.config['HISTORY_ENQUEUE_TIMEOUT'],
+            on_written=history_written,
+            max_retries=app.config['HISTORY_WRITE_MAX_RETRIES'],
+            retry_backoff=app.config['HISTORY_WRITE_RETRY_BACKOFF']
+        )
+        atexit.register(app.history_writer.close)
+
+    # Initialize cache of search history totals
+    app.history_counts = ResponseCache(
+        max_entries=app.config['HISTORY_COUNT_CACHE_MAX_ENTRIES'],
+        stale_ttl=0
+    )
+
+    # Initialize ring buffers of each user's most recent searches
+    app.recent_history = None
+    if app.config['RECENT_HISTORY_SIZE'] > 0:
+        app.recent_history = RecentHistory(
+            size=app.config['RECENT_HISTORY_SIZE'],
+            max_users=app.config['RECENT_HISTORY_MAX_USERS'],
+            ttl=app.config['RECENT_HISTORY_TTL']
+        )
+
+    # Initialize background runner for large history clears
+    app.history_jobs = HistoryJobRunner.from_app(app)
+
     # Register blueprints
     app.register_blueprint(movie_bp, url_prefix='/api')
     app.register_blueprint(history_bp, url_prefix='/api')
+    app.register_blueprint(catalog_bp, url_prefix='/api')
+
+    # Register CLI commands
+    register_commands(app)
+
+    # Catalog sync scheduler, started with the other background jobs
+    app.catalog_sync = None
     
     # Error handlers
     @app.errorhandler(404)
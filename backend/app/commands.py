@@ -0,0 +1,86 @@
+# app/commands.py
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from app.services.catalog_sync import CatalogSyncService, CATALOG_COLLECTIONS
+from app.services.history_ingest import HistoryIngestor
+from app.services.history_service import HistoryService
+from app.services.history_rollups import HistoryRollups
+
+@click.command('sync-catalog')
+@click.option('--resource', '-r', multiple=True,
+              type=click.Choice(sorted(CATALOG_COLLECTIONS)),
+              help='Resource to sync (repeatable). Defaults to all.')
+@with_appcontext
+def sync_catalog_command(resource):
+    """Mirror the LOTR API catalog into local MongoDB collections."""
+    service = CatalogSyncService.from_app(current_app)
+    failed = False
+    for result in service.sync_all(resource or None):
+        if result['status'] == 'ok':
+            click.echo(
+                f"{result['resource']}: {result['total']} docs, "
+                f"{result['written']} written, {result['unchanged']} unchanged, "
+                f"{result['deleted']} deleted"
+            )
+        else:
+            failed = True
+            click.echo(f"{result['resource']}: failed - {result['error']}", err=True)
+    if failed:
+        raise SystemExit(1)
+
+@click.command('ensure-indexes')
+@click.option('--backfill/--no-backfill', default=True,
+              help='Add normalized fields to history records that lack them.')
+@with_appcontext
+def ensure_indexes_command(backfill):
+    """Create the search_history indexes and normalized fields."""
+    history_service = HistoryService(current_app.db)
+    for name in history_service.ensure_indexes(current_app.config['HISTORY_RETENTION_DAYS']) + HistoryRollups(current_app.db).ensure_indexes():
+        click.echo(f"index {name}: ok")
+    if backfill:
+        updated = history_service.backfill_normalized_fields()
+        click.echo(f"normalized fields added to {updated} records")
+
+@click.command('backfill-rollups')
+@click.option('--date-from', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='First day to rebuild (YYYY-MM-DD). Defaults to the oldest search.')
+@click.option('--date-to', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Last day to rebuild (YYYY-MM-DD). Defaults to today.')
+@with_appcontext
+def backfill_rollups_command(date_from, date_to):
+    """Rebuild the daily search statistics rollups from search_history."""
+    rollups = HistoryRollups(current_app.db)
+    rollups.ensure_indexes()
+    days, rows = rollups.rebuild(date_from, date_to)
+    current_app.history_stats.invalidate()
+    click.echo(f"rebuilt {days} days, {rows} rollup rows")
+
+@click.command('ingest-history')
+@click.argument('source', type=click.File('rb'))
+@click.option('--chunk-size', type=int, help='Records per insert_many. Defaults to HISTORY_INGEST_CHUNK_SIZE.')
+@click.option('--workers', type=int, help='Parallel writers. Defaults to HISTORY_INGEST_WORKERS.')
+@with_appcontext
+def ingest_history_command(source, chunk_size, workers):
+    """Bulk load search history from an NDJSON file ('-' for stdin)."""
+    ingestor = HistoryIngestor.from_app(current_app)
+    if chunk_size:
+        ingestor.chunk_size = chunk_size
+    if workers:
+        ingestor.workers = workers
+
+    report = ingestor.ingest(source)
+    for reject in report['rejects']:
+        click.echo(f"line {reject['line']}: {reject['error']}", err=True)
+    click.echo(
+        f"{report['inserted']} inserted, {report['rejected']} rejected "
+        f"in {report['seconds']}s ({report['rows_per_second']} rows/s)"
+    )
+    if report['rejected']:
+        raise SystemExit(1)
+
+def register_commands(app):
+    app.cli.add_command(sync_catalog_command)
+    app.cli.add_command(ensure_indexes_command)
+    app.cli.add_command(backfill_rollups_command)
+    app.cli.add_command(ingest_history_command)
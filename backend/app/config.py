@@ -8,9 +8,114 @@ class Config:
     MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://mongodb:27017/redbook')
     LOTR_API_TOKEN = os.getenv('LOTR_API_TOKEN')
     LOTR_API_BASE_URL = 'https://the-one-api.dev/v2'
+
+    # Upstream HTTP connection pool (timeouts in seconds)
+    LOTR_HTTP_POOL_SIZE = int(os.getenv('LOTR_HTTP_POOL_SIZE', 20))
+    LOTR_HTTP_CONNECT_TIMEOUT = float(os.getenv('LOTR_HTTP_CONNECT_TIMEOUT', 3.05))
+    LOTR_HTTP_READ_TIMEOUT = float(os.getenv('LOTR_HTTP_READ_TIMEOUT', 10))
+    LOTR_HTTP_MAX_RETRIES = int(os.getenv('LOTR_HTTP_MAX_RETRIES', 3))
+    LOTR_HTTP_RETRY_BACKOFF = float(os.getenv('LOTR_HTTP_RETRY_BACKOFF', 0.5))
+
+    # Upstream rate limit (requests per period, waits in seconds)
+    LOTR_RATE_LIMIT_REQUESTS = int(os.getenv('LOTR_RATE_LIMIT_REQUESTS', 100))
+    LOTR_RATE_LIMIT_PERIOD = int(os.getenv('LOTR_RATE_LIMIT_PERIOD', 600))
+    LOTR_RATE_LIMIT_MAX_WAIT = float(os.getenv('LOTR_RATE_LIMIT_MAX_WAIT', 5))
+    LOTR_RATE_LIMIT_BACKGROUND_MAX_WAIT = float(os.getenv('LOTR_RATE_LIMIT_BACKGROUND_MAX_WAIT', 600))
+
+    # Upstream response cache (TTLs in seconds)
+    LOTR_CACHE_MAX_ENTRIES = int(os.getenv('LOTR_CACHE_MAX_ENTRIES', 256))
+    LOTR_CACHE_DEFAULT_TTL = int(os.getenv('LOTR_CACHE_DEFAULT_TTL', 3600))
+    LOTR_CACHE_STALE_TTL = int(os.getenv('LOTR_CACHE_STALE_TTL', 86400))
+    LOTR_CACHE_TTLS = {
+        'movie': int(os.getenv('LOTR_CACHE_TTL_MOVIE', 3600)),
+        'movie_detail': int(os.getenv('LOTR_CACHE_TTL_MOVIE_DETAIL', 6 * 3600))
+    }
+
+    # Streaming of paginated upstream collections
+    LOTR_STREAM_PAGE_SIZE = int(os.getenv('LOTR_STREAM_PAGE_SIZE', 200))
+    LOTR_STREAM_PREFETCH = int(os.getenv('LOTR_STREAM_PREFETCH', 2))
+
+    # Concurrent batch lookups
+    LOTR_BATCH_CONCURRENCY = int(os.getenv('LOTR_BATCH_CONCURRENCY', 8))
+    LOTR_BATCH_MAX_IDS = int(os.getenv('LOTR_BATCH_MAX_IDS', 50))
+
+    # Encode JSON responses with orjson (in requirements.txt; the standard
+    # library encoder is the fallback when it is missing)
+    JSON_FAST_ENCODER = os.getenv('JSON_FAST_ENCODER', 'True') == 'True'
+
+    # Streamed JSON responses (sizes in bytes)
+    STREAM_COMPRESSION_MIN_SIZE = int(os.getenv('STREAM_COMPRESSION_MIN_SIZE', 1024))
+    STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 16384))
+    STREAM_CURSOR_BATCH_SIZE = int(os.getenv('STREAM_CURSOR_BATCH_SIZE', 500))
+
+    # Local catalog mirror (interval in seconds, 0 disables the scheduler)
+    CATALOG_MIRROR_ENABLED = os.getenv('CATALOG_MIRROR_ENABLED', 'True') == 'True'
+    CATALOG_SYNC_INTERVAL = int(os.getenv('CATALOG_SYNC_INTERVAL', 6 * 3600))
+    CATALOG_SYNC_PAGE_SIZE = int(os.getenv('CATALOG_SYNC_PAGE_SIZE', 1000))
+
+    # Write-behind batching of search history inserts
+    HISTORY_WRITE_BEHIND = os.getenv('HISTORY_WRITE_BEHIND', 'True') == 'True'
+    HISTORY_FLUSH_BATCH_SIZE = int(os.getenv('HISTORY_FLUSH_BATCH_SIZE', 500))
+    HISTORY_FLUSH_INTERVAL = float(os.getenv('HISTORY_FLUSH_INTERVAL', 1.0))
+    HISTORY_QUEUE_MAX_SIZE = int(os.getenv('HISTORY_QUEUE_MAX_SIZE', 10000))
+    HISTORY_ENQUEUE_TIMEOUT = float(os.getenv('HISTORY_ENQUEUE_TIMEOUT', 0.5))
+    HISTORY_WRITE_MAX_RETRIES = int(os.getenv('HISTORY_WRITE_MAX_RETRIES', 3))
+    HISTORY_WRITE_RETRY_BACKOFF = float(os.getenv('HISTORY_WRITE_RETRY_BACKOFF', 0.5))
+
+    # Short-lived cache of /api/history totals, keyed by filter
+    HISTORY_COUNT_CACHE_TTL = int(os.getenv('HISTORY_COUNT_CACHE_TTL', 30))
+    HISTORY_COUNT_CACHE_MAX_ENTRIES = int(os.getenv('HISTORY_COUNT_CACHE_MAX_ENTRIES', 1024))
+
+    # Daily rollups for /api/history/stats; the raw path is capped at 30 days
+    HISTORY_STATS_ROLLUPS = os.getenv('HISTORY_STATS_ROLLUPS', 'True') == 'True'
+    HISTORY_STATS_MAX_DAYS = int(os.getenv('HISTORY_STATS_MAX_DAYS', 365))
+
+    # /api/history/stats result cache (refresh interval 0 disables the scheduler)
+    HISTORY_STATS_CACHE_TTL = int(os.getenv('HISTORY_STATS_CACHE_TTL', 60))
+    HISTORY_STATS_MIN_REFRESH = float(os.getenv('HISTORY_STATS_MIN_REFRESH', 2.0))
+    HISTORY_STATS_REFRESH_INTERVAL = int(os.getenv('HISTORY_STATS_REFRESH_INTERVAL', 30))
+
+    # Streaming sketches behind /api/history/stats/live (snapshot interval 0 disables sharing)
+    LIVE_STATS_BUCKET_SECONDS = int(os.getenv('LIVE_STATS_BUCKET_SECONDS', 3600))
+    LIVE_STATS_BUCKETS = int(os.getenv('LIVE_STATS_BUCKETS', 24))
+    LIVE_STATS_TERM_CAPACITY = int(os.getenv('LIVE_STATS_TERM_CAPACITY', 100))
+    LIVE_STATS_CMS_WIDTH = int(os.getenv('LIVE_STATS_CMS_WIDTH', 2048))
+    LIVE_STATS_CMS_DEPTH = int(os.getenv('LIVE_STATS_CMS_DEPTH', 5))
+    LIVE_STATS_HLL_PRECISION = int(os.getenv('LIVE_STATS_HLL_PRECISION', 12))
+    LIVE_STATS_SNAPSHOT_INTERVAL = int(os.getenv('LIVE_STATS_SNAPSHOT_INTERVAL', 30))
+
+    # Retention (0 keeps history forever) and chunked background clears
+    HISTORY_RETENTION_DAYS = int(os.getenv('HISTORY_RETENTION_DAYS', 0))
+    HISTORY_CLEAR_SYNC_LIMIT = int(os.getenv('HISTORY_CLEAR_SYNC_LIMIT', 10000))
+    HISTORY_CLEAR_BATCH_SIZE = int(os.getenv('HISTORY_CLEAR_BATCH_SIZE', 1000))
+    HISTORY_CLEAR_BATCH_PAUSE = float(os.getenv('HISTORY_CLEAR_BATCH_PAUSE', 0.1))
+
+    # Cursor batch size for /api/history/export
+    HISTORY_EXPORT_BATCH_SIZE = int(os.getenv('HISTORY_EXPORT_BATCH_SIZE', 2000))
+
+    # /api/history/<user_name> page size (default and maximum) and the
+    # in-process buffers of each user's last searches (0 disables them)
+    HISTORY_USER_MAX_LIMIT = int(os.getenv('HISTORY_USER_MAX_LIMIT', 1000))
+    RECENT_HISTORY_SIZE = int(os.getenv('RECENT_HISTORY_SIZE', 20))
+    RECENT_HISTORY_MAX_USERS = int(os.getenv('RECENT_HISTORY_MAX_USERS', 10000))
+    RECENT_HISTORY_TTL = float(os.getenv('RECENT_HISTORY_TTL', 60))
+
+    # Bulk history ingestion (/api/history/ingest and `flask ingest-history`)
+    HISTORY_INGEST_CHUNK_SIZE = int(os.getenv('HISTORY_INGEST_CHUNK_SIZE', 5000))
+    HISTORY_INGEST_WORKERS = int(os.getenv('HISTORY_INGEST_WORKERS', 4))
+    HISTORY_INGEST_MAX_REJECTS = int(os.getenv('HISTORY_INGEST_MAX_REJECTS', 100))
+
+    # Create and check the search_history indexes on startup, in the
+    # background; the check gives up if MongoDB is unreachable for this long
+    HISTORY_ENSURE_INDEXES = os.getenv('HISTORY_ENSURE_INDEXES', 'True') == 'True'
+    HISTORY_INDEX_TIMEOUT_MS = int(os.getenv('HISTORY_INDEX_TIMEOUT_MS', 5000))
+
     DEBUG = os.getenv('FLASK_DEBUG', 'False') == 'True'
     TESTING = False
 
 class TestConfig(Config):
     TESTING = True
-    MONGODB_URI = 'mongodb://mongodb:27017/redbook_test'
\ No newline at end of file
+    MONGODB_URI = 'mongodb://mongodb:27017/redbook_test'
+    # Tests read history right after searching
+    HISTORY_WRITE_BEHIND = False
+    HISTORY_ENSURE_INDEXES = False
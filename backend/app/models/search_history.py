@@ -1,7 +1,13 @@
 # app/models/search_history.py
+import re
 from datetime import datetime
 
+_KEYWORD = re.compile(r'[^\W_]+')
+
 class SearchHistory:
+    # Built once per search on the write path; reads never go through the model
+    __slots__ = ('user_name', 'search_term', 'results_count', 'timestamp')
+
     def __init__(self, user_name, search_term, results_count):
         self.user_name = user_name
         self.search_term = search_term
@@ -13,9 +19,29 @@ class SearchHistory:
             'user_name': self.user_name,
             'search_term': self.search_term,
             'results_count': self.results_count,
-            'timestamp': self.timestamp
+            'timestamp': self.timestamp,
+            **SearchHistory.normalized_fields(self.user_name, self.search_term)
+        }
+
+    @staticmethod
+    def normalized_fields(user_name, search_term):
+        """
+        Lowercase copies of the text fields and their keywords, so filters
+        and searches can use an index instead of a case-insensitive regex
+        """
+        user_name_lower = (user_name or '').lower()
+        search_term_lower = (search_term or '').lower()
+        return {
+            'user_name_lower': user_name_lower,
+            'search_term_lower': search_term_lower,
+            'search_keywords': SearchHistory.keywords(user_name_lower + ' ' + search_term_lower)
         }
 
+    @staticmethod
+    def keywords(text):
+        """Distinct lowercase words of `text`, in order; underscores separate words"""
+        return list(dict.fromkeys(_KEYWORD.findall((text or '').lower())))
+
     @staticmethod
     def from_dict(data):
         search = SearchHistory(
@@ -24,4 +50,4 @@ class SearchHistory:
             results_count=data['results_count']
         )
         search.timestamp = data.get('timestamp', datetime.utcnow())
-        return search
\ No newline at end of file
+        return search
@@ -0,0 +1,70 @@
+# app/routes/catalog_routes.py
+from flask import Blueprint, jsonify
+from app.services.lotr_service import LotrService
+from app.services.rate_limiter import UpstreamRateLimited
+from app.utils.streaming import stream_json_array
+
+catalog_bp = Blueprint('catalog', __name__)
+
+@catalog_bp.route('/books', methods=['GET'])
+def get_books():
+    try:
+        return stream_json_array('books', LotrService().iter_books())
+    except UpstreamRateLimited as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@catalog_bp.route('/books/<book_id>/chapters', methods=['GET'])
+def get_book_chapters(book_id):
+    try:
+        return stream_json_array('chapters', LotrService().iter_book_chapters(book_id))
+    except UpstreamRateLimited as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@catalog_bp.route('/chapters', methods=['GET'])
+def get_chapters():
+    try:
+        return stream_json_array('chapters', LotrService().iter_chapters())
+    except UpstreamRateLimited as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@catalog_bp.route('/characters', methods=['GET'])
+def get_characters():
+    try:
+        return stream_json_array('characters', LotrService().iter_characters())
+    except UpstreamRateLimited as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@catalog_bp.route('/characters/<character_id>/quotes', methods=['GET'])
+def get_character_quotes(character_id):
+    try:
+        return stream_json_array('quotes', LotrService().iter_character_quotes(character_id))
+    except UpstreamRateLimited as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@catalog_bp.route('/quotes', methods=['GET'])
+def get_quotes():
+    try:
+        return stream_json_array('quotes', LotrService().iter_quotes())
+    except UpstreamRateLimited as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@catalog_bp.route('/movies/<movie_id>/quotes', methods=['GET'])
+def get_movie_quotes(movie_id):
+    try:
+        return stream_json_array('quotes', LotrService().iter_movie_quotes(movie_id))
+    except UpstreamRateLimited as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,8 +1,21 @@
 # app/routes/history_routes.py
 from flask import Blueprint, jsonify, request, current_app
-from app.services.history_service import HistoryService
-from datetime import datetime, timedelta
+from app.services.history_service import (
+    HistoryService, HISTORY_COUNT_MODES, HISTORY_SEARCH_MODES, HISTORY_SORT_FIELDS,
+    RELEVANCE_SORT, decode_history_cursor
+)
+from app.services.history_ingest import HistoryIngestor, InvalidGzipBody, gunzip_lines
+from app.utils.http_cache import conditional_json
+from app.utils.json_encoding import dumps, encode_default
+from app.utils.streaming import stream_json_array, stream_text
+from app.utils.timestamps import parse_iso_timestamp
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from itertools import chain
+import csv
+import io
 import logging
+import math
 
 # Initialize blueprint and logger
 history_bp = Blueprint('history', __name__)
@@ -13,104 +26,112 @@ def get_history():
     """
     Get search history with filtering, sorting, and pagination.
     Query parameters:
-    - page: Page number (default: 1)
+    - cursor: Opaque next_cursor from the previous page; pass it empty for
+      the first page. Selects keyset pagination, where every page costs
+      the same and pages do not shift as new searches arrive
+    - page: Page number (default: 1), ignored when cursor is given
     - per_page: Items per page (default: 10)
-    - sort: Sort field (timestamp, user_name, search_term, results_count)
+    - sort: Sort field (timestamp, user_name, search_term, results_count,
+      or relevance for text searches; default: relevance when searching)
     - order: Sort order (asc, desc)
-    - user: Filter by username
+    - user: Filter by username prefix (case-insensitive)
     - date_from: Filter by date (YYYY-MM-DD)
     - date_to: Filter by date (YYYY-MM-DD)
     - search: Search in user_name or search_term
+    - search_mode: text (default) matches words by prefix using an index;
+      regex matches any substring but scans the collection
+    - count: Total to report (exact, estimate, none; default: exact).
+      estimate is instant when unfiltered, none skips counting entirely
     """
     try:
         # Get query parameters with defaults
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 10))
-        sort_field = request.args.get('sort', 'timestamp')
+        sort_field = request.args.get('sort', None)
         sort_order = request.args.get('order', 'desc')
         user_filter = request.args.get('user', None)
         date_from = request.args.get('date_from', None)
         date_to = request.args.get('date_to', None)
         search = request.args.get('search', None)
+        search_mode = _search_mode(request.args.get('search_mode', 'text'))
+        cursor = request.args.get('cursor', None)
+        count = request.args.get('count', 'exact')
 
         # Validate pagination parameters
         if page < 1:
             page = 1
         if per_page < 1 or per_page > 100:
             per_page = 10
+        if count not in HISTORY_COUNT_MODES:
+            count = 'exact'
 
         # Build filter query
-        query = {}
-        
-        if user_filter:
-            query['user_name'] = {'$regex': user_filter, '$options': 'i'}
-
-        if search:
-            query['$or'] = [
-                {'user_name': {'$regex': search, '$options': 'i'}},
-                {'search_term': {'$regex': search, '$options': 'i'}}
-            ]
-
-        # Date filtering
-        if date_from or date_to:
-            query['timestamp'] = {}
-            if date_from:
-                try:
-                    from_date = datetime.strptime(date_from, '%Y-%m-%d')
-                    query['timestamp']['$gte'] = from_date
-                except ValueError:
-                    return jsonify({'error': 'Invalid date_from format. Use YYYY-MM-DD'}), 400
-
-            if date_to:
-                try:
-                    to_date = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
-                    query['timestamp']['$lt'] = to_date
-                except ValueError:
-                    return jsonify({'error': 'Invalid date_to format. Use YYYY-MM-DD'}), 400
-
-        # Validate sort field
-        valid_sort_fields = ['timestamp', 'user_name', 'search_term', 'results_count']
-        if sort_field not in valid_sort_fields:
+        try:
+            query = HistoryService.filter_query(user_filter, date_from, date_to, search, search_mode)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Validate sort field; relevance needs the words of a text search
+        search_terms = HistoryService.search_terms(search) if search and search_mode == 'text' else []
+        if sort_field is None and search_terms:
+            sort_field = RELEVANCE_SORT
+        if sort_field not in HISTORY_SORT_FIELDS and not (sort_field == RELEVANCE_SORT and search_terms):
             sort_field = 'timestamp'
 
         # Validate sort order
         sort_direction = -1 if sort_order.lower() == 'desc' else 1
 
+        # Validate cursor
+        after = None
+        if cursor:
+            try:
+                after = decode_history_cursor(cursor, sort_field, sort_direction)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
         try:
             # Initialize history service
-            history_service = HistoryService(current_app.db)
-            
-            # Get paginated results
-            total_count = history_service.count_history(query)
-            history_items = history_service.get_history_paginated(
+            history_service = HistoryService.from_app(current_app)
+
+            # Get the page and its total (cached per filter)
+            result = history_service.get_history_page(
                 query=query,
                 page=page,
+                after=after,
                 per_page=per_page,
                 sort_field=sort_field,
-                sort_direction=sort_direction
+                sort_direction=sort_direction,
+                count=count,
+                search_terms=search_terms
             )
+            history_items = result['items']
+            total_count = result['total']
 
             # Calculate pagination metadata
-            total_pages = (total_count + per_page - 1) // per_page
-            has_next = page < total_pages
-            has_prev = page > 1
+            pagination = {
+                'per_page': per_page,
+                'total_items': total_count,
+                'count': count,
+                'has_next': result['has_next'],
+                'next_cursor': result['next_cursor']
+            }
+            if cursor is None:
+                pagination.update({
+                    'page': page,
+                    'total_pages': (total_count + per_page - 1) // per_page if total_count is not None else None,
+                    'has_prev': page > 1
+                })
 
             # Prepare response
             response = {
                 'history': history_items,
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total_items': total_count,
-                    'total_pages': total_pages,
-                    'has_next': has_next,
-                    'has_prev': has_prev
-                },
+                'pagination': pagination,
                 'filters': {
                     'user': user_filter,
                     'date_from': date_from,
                     'date_to': date_to,
-                    'search': search
+                    'search': search,
+                    'search_mode': search_mode
                 },
                 'sort': {
                     'field': sort_field,
@@ -136,35 +157,222 @@ def get_history_stats():
     """
     Get statistics about search history.
     Returns counts of searches by day, popular search terms, and active users.
+    Query parameters:
+    - days: Window in days (default: 7, up to HISTORY_STATS_MAX_DAYS once
+      the rollups are backfilled, 30 otherwise)
+    Results are cached per window and refreshed in the background.
     """
     try:
-        history_service = HistoryService(current_app.db)
+        history_service = HistoryService.from_app(current_app)
         
-        # Get date range for stats
+        # Get date range for stats; only backfilled rollups make long ranges cheap
+        rollups = history_service.rollups
+        max_days = current_app.config['HISTORY_STATS_MAX_DAYS'] if rollups is not None and rollups.ready() else 30
         days = int(request.args.get('days', 7))
-        if days < 1 or days > 30:
+        if days < 1 or days > max_days:
             days = 7
 
-        stats = history_service.get_statistics(days)
-        return jsonify(stats)
+        stats = current_app.history_stats.get_entry(days)
+        return conditional_json(stats.value, last_modified=stats.modified)
 
     except Exception as e:
         logger.error(f"Error getting history stats: {str(e)}")
         return jsonify({'error': 'Error retrieving statistics'}), 500
 
+@history_bp.route('/history/stats/live', methods=['GET'])
+def get_history_stats_live():
+    """
+    Get approximate real-time statistics from in-memory sketches.
+    Query parameters:
+    - hours: Window, rounded up to whole buckets (default: every bucket
+      kept, 24 hours with the default settings)
+    - limit: Number of popular terms (default: 10, max: 50)
+
+    The response cost does not depend on the number of searches. Error
+    bounds are returned with every response:
+    - distinct_users: HyperLogLog, relative standard error ~1.04/sqrt(2^p)
+    - popular_terms counts: never undercounted; each overestimates by at
+      most its max_error (<= total / capacity, Space-Saving) and, with
+      probability 1 - failure_probability, by at most e/width * total
+      (Count-Min)
+    Other workers are included as of their last snapshot.
+    """
+    try:
+        live_stats = current_app.live_stats
+        kept_hours = live_stats.buckets * live_stats.bucket_seconds / 3600
+        hours = float(request.args.get('hours', kept_hours))
+        limit = int(request.args.get('limit', 10))
+        if hours <= 0 or hours > kept_hours:
+            hours = kept_hours
+        buckets = math.ceil(hours * 3600 / live_stats.bucket_seconds)
+        if limit < 1 or limit > 50:
+            limit = 10
+
+        return jsonify(live_stats.query(buckets, top_k=limit))
+
+    except ValueError:
+        return jsonify({'error': 'Invalid parameters provided'}), 400
+    except Exception as e:
+        logger.error(f"Error getting live history stats: {str(e)}")
+        return jsonify({'error': 'Error retrieving statistics'}), 500
+
+@history_bp.route('/history/stats/cache', methods=['GET'])
+def get_history_stats_cache():
+    """
+    Get statistics cache metrics: entries, write generation, hits, misses,
+    stale reads, recomputes and coalesced requests.
+    """
+    return jsonify(current_app.history_stats.stats())
+
+@history_bp.route('/history/writer/stats', methods=['GET'])
+def get_history_writer_stats():
+    """
+    Get write-behind buffer metrics: queue depth, written and failed
+    records, synchronous (backpressure) writes and flush latency.
+    """
+    writer = current_app.history_writer
+    if writer is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(writer.stats(), enabled=True))
+
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+EXPORT_FIELDS = ['id', 'user_name', 'search_term', 'results_count', 'timestamp']
+
+def _export_row(doc):
+    timestamp = doc.get('timestamp')
+    return {
+        'id': str(doc['_id']),
+        'user_name': doc.get('user_name'),
+        'search_term': doc.get('search_term'),
+        'results_count': doc.get('results_count'),
+        'timestamp': encode_default(timestamp) if timestamp else None
+    }
+
+def _ndjson_chunks(docs):
+    for doc in docs:
+        yield dumps(_export_row(doc)) + '\n'
+
+def _csv_chunks(docs):
+    # One writer over a reused buffer; each row is drained as soon as it is written
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for doc in docs:
+        writer.writerow(_export_row(doc))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _search_mode(value):
+    """The requested search mode; unknown modes fall back to text"""
+    return value if value in HISTORY_SEARCH_MODES else 'text'
+
+def _parse_export_checkpoint(after_timestamp, after_id):
+    if after_id and not after_timestamp:
+        raise ValueError('after_id requires after_timestamp')
+    if not after_timestamp:
+        return None
+    try:
+        timestamp = parse_iso_timestamp(after_timestamp)
+    except ValueError:
+        raise ValueError('Invalid after_timestamp format. Use ISO 8601')
+    if not after_id:
+        return timestamp, None
+    try:
+        return timestamp, ObjectId(after_id)
+    except (InvalidId, TypeError):
+        raise ValueError('Invalid after_id')
+
+@history_bp.route('/history/export', methods=['GET'])
+def export_history():
+    """
+    Export search history as NDJSON or CSV, oldest first.
+    The export is streamed from the database cursor in constant memory.
+    Query parameters:
+    - format: ndjson (default) or csv
+    - user: Filter by user name
+    - date_from: Filter from date (YYYY-MM-DD)
+    - date_to: Filter to date (YYYY-MM-DD)
+    - search: Search in user names and search terms
+    - search_mode: text (default) or regex, as for /api/history
+    - after_timestamp: Resume after this entry timestamp (ISO 8601, as exported)
+    - after_id: Resume after this entry id (requires after_timestamp)
+    """
+    try:
+        export_format = request.args.get('format', 'ndjson').lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"Invalid format. Use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+        try:
+            query = HistoryService.filter_query(
+                request.args.get('user', None),
+                request.args.get('date_from', None),
+                request.args.get('date_to', None),
+                request.args.get('search', None),
+                _search_mode(request.args.get('search_mode', 'text'))
+            )
+            after = _parse_export_checkpoint(
+                request.args.get('after_timestamp', None),
+                request.args.get('after_id', None)
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        history_service = HistoryService.from_app(current_app)
+        docs = history_service.iter_export(
+            query,
+            after=after,
+            batch_size=current_app.config['HISTORY_EXPORT_BATCH_SIZE']
+        )
+
+        chunks = _csv_chunks(docs) if export_format == 'csv' else _ndjson_chunks(docs)
+        response = stream_text(chunks, EXPORT_FORMATS[export_format], 'history export')
+        response.headers['Content-Disposition'] = f'attachment; filename="search-history.{export_format}"'
+        return response
+
+    except Exception as e:
+        logger.error(f"Error exporting history: {str(e)}")
+        return jsonify({'error': 'Error exporting history'}), 500
+
 @history_bp.route('/history/<user_name>', methods=['GET'])
 def get_user_history(user_name):
     """
-    Get search history for a specific user.
+    Get search history for a specific user, newest first.
+    Query parameters:
+    - limit: Number of searches (default and maximum: HISTORY_USER_MAX_LIMIT)
+    - before: Only searches older than this timestamp (ISO 8601), to page back
+    The most recent searches are served from memory, even on the default
+    page; anything older is streamed from the database cursor.
     """
     try:
-        history_service = HistoryService(current_app.db)
-        user_history = history_service.get_user_history(user_name)
-        
-        if not user_history:
+        max_limit = current_app.config['HISTORY_USER_MAX_LIMIT']
+        try:
+            limit = min(max(int(request.args.get('limit', max_limit)), 1), max_limit)
+        except ValueError:
+            limit = max_limit
+
+        before = request.args.get('before', None)
+        if before:
+            try:
+                before = parse_iso_timestamp(before)
+            except ValueError:
+                return jsonify({'error': 'Invalid before format. Use ISO 8601'}), 400
+
+        history_service = HistoryService.from_app(current_app)
+        user_history = history_service.recent_user_history(
+            user_name,
+            limit,
+            before=before or None,
+            batch_size=current_app.config['STREAM_CURSOR_BATCH_SIZE']
+        )
+
+        first = next(user_history, None)
+        if first is None:
             return jsonify({'message': 'No history found for this user'}), 404
-            
-        return jsonify({'history': user_history})
+
+        return stream_json_array('history', chain([first], user_history))
 
     except Exception as e:
         logger.error(f"Error getting user history: {str(e)}")
@@ -175,6 +383,9 @@ def clear_history():
     """
     Clear search history. Optionally filter by user or date range.
     Requires confirmation in request body.
+    Clears matching more than HISTORY_CLEAR_SYNC_LIMIT records, or with
+    "async": true, run as a background job: the response is 202 with the
+    job id, and progress is available at /api/history/jobs/<job_id>.
     """
     try:
         if not request.is_json:
@@ -188,7 +399,23 @@ def clear_history():
         date_from = data.get('date_from')
         date_to = data.get('date_to')
 
-        history_service = HistoryService(current_app.db)
+        history_service = HistoryService.from_app(current_app)
+
+        # Large clears are deleted in throttled batches off the request
+        run_async = bool(data.get('async', False))
+        if not run_async:
+            sync_limit = current_app.config['HISTORY_CLEAR_SYNC_LIMIT']
+            query = history_service.clear_query(user_name, date_from, date_to)
+            run_async = history_service.count_history(query, limit=sync_limit + 1) > sync_limit
+
+        if run_async:
+            job = current_app.history_jobs.submit_clear(user_name, date_from, date_to)
+            return jsonify({
+                'message': 'History clear started',
+                'job_id': job['_id'],
+                'status_url': f"/api/history/jobs/{job['_id']}"
+            }), 202
+
         deleted_count = history_service.clear_history(user_name, date_from, date_to)
 
         return jsonify({
@@ -198,4 +425,49 @@ def clear_history():
 
     except Exception as e:
         logger.error(f"Error clearing history: {str(e)}")
-        return jsonify({'error': 'Error clearing history'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Error clearing history'}), 500
+
+@history_bp.route('/history/ingest', methods=['POST'])
+def ingest_history():
+    """
+    Bulk load search history from an NDJSON body, one record per line:
+    {"user_name", "search_term", "results_count", "timestamp"} plus an
+    optional "id" (rows from /api/history/export load back as they are).
+    The body is read as a stream and may be gzip-encoded.
+    Responds with inserted/rejected counts, rows per second and the first
+    HISTORY_INGEST_MAX_REJECTS rejected lines with their errors.
+    """
+    try:
+        lines = request.stream
+        if request.content_encoding == 'gzip':
+            lines = gunzip_lines(request.stream)
+
+        report = HistoryIngestor.from_app(current_app).ingest(lines)
+        if not report['received']:
+            return jsonify({'error': 'No records provided'}), 400
+
+        return jsonify(report)
+
+    except InvalidGzipBody as e:
+        return jsonify({'error': f'Invalid gzip body: {str(e)}'}), 400
+    except Exception as e:
+        logger.error(f"Error ingesting history: {str(e)}")
+        return jsonify({'error': 'Error ingesting history'}), 500
+
+@history_bp.route('/history/jobs/<job_id>', methods=['GET'])
+def get_history_job(job_id):
+    """
+    Get the status of a background history job: status (queued, running,
+    done, failed), total matching records, deleted_count and timestamps.
+    """
+    try:
+        job = current_app.history_jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+
+        job['job_id'] = job.pop('_id')
+        return jsonify(job)
+
+    except Exception as e:
+        logger.error(f"Error getting history job: {str(e)}")
+        return jsonify({'error': 'Error retrieving job'}), 500
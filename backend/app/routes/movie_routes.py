@@ -1,31 +1,127 @@
 # app/routes/movie_routes.py
-from flask import Blueprint, request, jsonify
-from app.services.lotr_service import LotrService
+from flask import Blueprint, request, jsonify, current_app
+from app.services.lotr_service import LotrService, MOVIE_RANGE_FIELDS, MOVIE_SORT_FIELDS
 from app.services.history_service import HistoryService
+from app.services.rate_limiter import UpstreamRateLimited
+from app.utils.http_cache import compute_etag, conditional_json, not_modified
 
 movie_bp = Blueprint('movie', __name__)
 
+MAX_NAME_LENGTH = 100
+
 @movie_bp.route('/movies', methods=['GET'])
 def get_movies():
+    """
+    Search movies with filtering, sorting, and pagination.
+    Query parameters:
+    - name: Case-insensitive substring of the movie name
+    - user: Username to record the search under
+    - <field>_min / <field>_max: Inclusive range on runtimeInMinutes,
+      budgetInMillions, boxOfficeRevenueInMillions, academyAwardWins
+      or rottenTomatoesScore
+    - sort: Comma-separated sort fields (name or any range field)
+    - order: Comma-separated sort orders (asc, desc), one per sort field
+    - page: Page number (default: 1)
+    - per_page: Items per page (default: 10)
+    """
     try:
         name = request.args.get('name', '')
         user_name = request.args.get('user', '')
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 10))
+
+        if len(name) > MAX_NAME_LENGTH:
+            return jsonify({'error': f'name must be at most {MAX_NAME_LENGTH} characters'}), 400
+
+        # Validate pagination parameters
+        if page < 1:
+            page = 1
+        if per_page < 1 or per_page > 100:
+            per_page = 10
+
+        # Range filters
+        ranges = []
+        range_filters = {}
+        for field in MOVIE_RANGE_FIELDS:
+            low = request.args.get(f'{field}_min')
+            high = request.args.get(f'{field}_max')
+            if low is None and high is None:
+                continue
+            try:
+                low = float(low) if low is not None else None
+                high = float(high) if high is not None else None
+            except ValueError:
+                return jsonify({'error': f'Invalid range for {field}. Use numbers'}), 400
+            ranges.append((field, low, high))
+            range_filters[field] = {'min': low, 'max': high}
+
+        # Sort keys; unknown fields are ignored
+        sort_fields = [f for f in request.args.get('sort', '').split(',') if f]
+        sort_orders = [o.lower() for o in request.args.get('order', '').split(',') if o]
+        sort_keys = []
+        for position, field in enumerate(sort_fields):
+            if field not in MOVIE_SORT_FIELDS:
+                continue
+            order = sort_orders[min(position, len(sort_orders) - 1)] if sort_orders else 'asc'
+            sort_keys.append((field, -1 if order == 'desc' else 1))
 
         lotr_service = LotrService()
-        history_service = HistoryService(movie_bp.current_app.db)
+        history_service = HistoryService.from_app(current_app)
+
+        # The response depends only on the catalog and the query, so a
+        # matching If-None-Match is answered before querying or serializing
+        etag = compute_etag(
+            lotr_service.movie_catalog_version(),
+            sorted((key, value) for key, value in request.args.items(multi=True) if key != 'user')
+        )
+        cached = not_modified(etag)
+        if cached is not None and not user_name:
+            return cached
 
         # Get movies from LOTR API
-        movies = lotr_service.get_movies(name)
+        movies, total_count = lotr_service.query_movies(
+            name=name,
+            ranges=ranges,
+            sort_keys=sort_keys,
+            page=page,
+            per_page=per_page
+        )
 
         # Log the search
         if user_name:
             history_service.add_search(
                 user_name=user_name,
                 search_term=name,
-                results_count=len(movies)
+                results_count=total_count
             )
 
-        return jsonify({'movies': movies})
+        if cached is not None:
+            return cached
+
+        total_pages = (total_count + per_page - 1) // per_page
+        return conditional_json({
+            'movies': movies,
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total_items': total_count,
+                'total_pages': total_pages,
+                'has_next': page < total_pages,
+                'has_prev': page > 1
+            },
+            'filters': {
+                'name': name,
+                'ranges': range_filters
+            },
+            'sort': [
+                {'field': field, 'order': 'desc' if direction == -1 else 'asc'}
+                for field, direction in sort_keys
+            ]
+        }, etag=etag, last_modified=lotr_service.movie_catalog_last_modified())
+    except ValueError:
+        return jsonify({'error': 'Invalid parameters provided'}), 400
+    except UpstreamRateLimited as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -34,25 +130,63 @@ def get_movie(movie_id):
     try:
         lotr_service = LotrService()
         movie = lotr_service.get_movie_by_id(movie_id)
-        
+
         if not movie:
             return jsonify({'error': 'Movie not found'}), 404
-            
-        return jsonify({'movie': movie})
+
+        return conditional_json({'movie': movie}, last_modified=lotr_service.movie_catalog_last_modified())
+    except UpstreamRateLimited as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# app/routes/history_routes.py
-from flask import Blueprint, jsonify
-from app.services.history_service import HistoryService
+@movie_bp.route('/movies/batch', methods=['GET'])
+def get_movies_batch():
+    """
+    Get several movies by id in one call.
+    Query parameters:
+    - ids: Comma-separated movie ids
+    Movies are returned in the requested order; ids that could not be
+    resolved are reported in `errors` instead of failing the whole batch.
+    """
+    try:
+        movie_ids = []
+        for movie_id in request.args.get('ids', '').split(','):
+            movie_id = movie_id.strip()
+            if movie_id and movie_id not in movie_ids:
+                movie_ids.append(movie_id)
 
-history_bp = Blueprint('history', __name__)
+        if not movie_ids:
+            return jsonify({'error': 'ids parameter is required'}), 400
 
-@history_bp.route('/history', methods=['GET'])
-def get_history():
-    try:
-        history_service = HistoryService(history_bp.current_app.db)
-        history = history_service.get_history()
-        return jsonify({'history': history})
+        max_ids = current_app.config['LOTR_BATCH_MAX_IDS']
+        if len(movie_ids) > max_ids:
+            return jsonify({'error': f'At most {max_ids} ids per batch'}), 400
+
+        lotr_service = LotrService()
+        movies, errors = lotr_service.get_movies_by_ids(movie_ids)
+
+        return jsonify({
+            'movies': [movies[movie_id] for movie_id in movie_ids if movie_id in movies],
+            'errors': errors
+        })
+    except UpstreamRateLimited as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@movie_bp.route('/upstream/stats', methods=['GET'])
+def get_upstream_stats():
+    """
+    Get counters for the upstream LOTR API layer.
+    Returns rate limiter queue depth and wait times, cache hits, misses and
+    stale (served while refreshing) lookups, how many upstream requests were
+    collapsed into an in-flight fetch, and the size of the in-memory search
+    indexes.
+    """
+    return jsonify({
+        'rate_limit': current_app.upstream.limiter.stats(),
+        'cache': current_app.lotr_cache.stats(),
+        'coalescing': current_app.lotr_flight.stats(),
+        'search_indexes': current_app.search_indexes.stats()
+    })
@@ -0,0 +1,167 @@
+# app/services/catalog_sync.py
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime
+from pymongo import ReplaceOne
+from app.services.rate_limiter import PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+# Upstream resource -> local mirror collection
+CATALOG_COLLECTIONS = {
+    'movie': 'catalog_movies',
+    'book': 'catalog_books',
+    'chapter': 'catalog_chapters',
+    'character': 'catalog_characters',
+    'quote': 'catalog_quotes'
+}
+
+def document_hash(doc):
+    """Stable content hash used to detect changed upstream documents"""
+    payload = json.dumps(doc, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+class CatalogSyncService:
+    """
+    Mirrors the LOTR API catalog into local MongoDB collections.
+
+    Each resource is paged in full from upstream, but only documents whose
+    content hash changed are written. Documents that disappeared upstream
+    are removed, and a checkpoint is recorded in `sync_checkpoints`.
+    """
+
+    def __init__(self, db, client, base_url, page_size=1000):
+        self.db = db
+        self.client = client
+        self.base_url = base_url
+        self.page_size = page_size
+        self.checkpoints = db.sync_checkpoints
+
+    @classmethod
+    def from_app(cls, app):
+        return cls(
+            app.db,
+            app.upstream,
+            app.config['LOTR_API_BASE_URL'],
+            app.config['CATALOG_SYNC_PAGE_SIZE']
+        )
+
+    def iter_upstream(self, resource):
+        """Yield every upstream document of `resource`, one page at a time"""
+        page = 1
+        while True:
+            response = self.client.get(
+                f'{self.base_url}/{resource}',
+                params={'limit': self.page_size, 'page': page},
+                priority=PRIORITY_BACKGROUND
+            )
+            response.raise_for_status()
+            body = response.json()
+            docs = body.get('docs', [])
+            yield from docs
+
+            if not docs or page >= body.get('pages', page):
+                break
+            page += 1
+
+    def sync_collection(self, resource):
+        """Synchronize one resource and return its checkpoint"""
+        collection = self.db[CATALOG_COLLECTIONS[resource]]
+        started_at = datetime.utcnow()
+
+        known = {
+            doc['_id']: doc.get('_hash')
+            for doc in collection.find({}, {'_hash': 1})
+        }
+        seen = set()
+        writes = []
+        unchanged = 0
+
+        try:
+            for doc in self.iter_upstream(resource):
+                doc_id = doc['_id']
+                seen.add(doc_id)
+                doc_hash = document_hash(doc)
+                if known.get(doc_id) == doc_hash:
+                    unchanged += 1
+                    continue
+                writes.append(ReplaceOne(
+                    {'_id': doc_id},
+                    dict(doc, _hash=doc_hash),
+                    upsert=True
+                ))
+        except Exception as e:
+            logger.error(f"Catalog sync failed for {resource}: {str(e)}")
+            checkpoint = {
+                'status': 'error',
+                'error': str(e),
+                'started_at': started_at,
+                'finished_at': datetime.utcnow()
+            }
+            self.checkpoints.update_one({'_id': resource}, {'$set': checkpoint}, upsert=True)
+            raise
+
+        if writes:
+            collection.bulk_write(writes, ordered=False)
+
+        removed = [doc_id for doc_id in known if doc_id not in seen]
+        if removed:
+            collection.delete_many({'_id': {'$in': removed}})
+
+        checkpoint = {
+            'collection': collection.name,
+            'status': 'ok',
+            'error': None,
+            'started_at': started_at,
+            'finished_at': datetime.utcnow(),
+            'last_success_at': datetime.utcnow(),
+            'total': len(seen),
+            'written': len(writes),
+            'unchanged': unchanged,
+            'deleted': len(removed)
+        }
+        self.checkpoints.update_one({'_id': resource}, {'$set': checkpoint}, upsert=True)
+        logger.info(
+            f"Catalog sync {resource}: {len(seen)} docs, {len(writes)} written, "
+            f"{len(removed)} deleted"
+        )
+        return dict(checkpoint, resource=resource)
+
+    def sync_all(self, resources=None):
+        """Synchronize every resource, continuing past individual failures"""
+        results = []
+        for resource in resources or CATALOG_COLLECTIONS:
+            try:
+                results.append(self.sync_collection(resource))
+            except Exception as e:
+                results.append({'resource': resource, 'status': 'error', 'error': str(e)})
+        return results
+
+class CatalogSyncScheduler:
+    """Background thread that runs a full catalog sync every `interval` seconds"""
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='catalog-sync', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    CatalogSyncService.from_app(self.app).sync_all()
+                except Exception as e:
+                    logger.error(f"Scheduled catalog sync failed: {str(e)}")
+            self._stop.wait(self.interval)
@@ -0,0 +1,214 @@
+# app/services/history_ingest.py
+import gzip
+import json
+import logging
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+from app.models.search_history import SearchHistory
+from app.services.history_service import HistoryService
+from app.utils.timestamps import parse_iso_timestamp
+
+logger = logging.getLogger(__name__)
+
+def _parse_timestamp(value):
+    """ISO 8601 string, extended JSON {"$date": ...} or epoch milliseconds; naive UTC"""
+    if isinstance(value, dict) and '$date' in value:
+        value = value['$date']
+        if isinstance(value, dict) and '$numberLong' in value:
+            value = int(value['$numberLong'])
+    if isinstance(value, str):
+        return parse_iso_timestamp(value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            return datetime.utcfromtimestamp(value / 1000)
+        except (OverflowError, OSError):
+            raise ValueError('timestamp is out of range')
+    raise ValueError('timestamp must be an ISO 8601 string or epoch milliseconds')
+
+class InvalidGzipBody(Exception):
+    """Raised when a gzip-encoded ingest body cannot be decompressed"""
+
+def gunzip_lines(stream):
+    """Decompress `stream` lazily, yielding its lines; corrupt data raises InvalidGzipBody"""
+    try:
+        yield from gzip.GzipFile(fileobj=stream)
+    except (gzip.BadGzipFile, zlib.error, EOFError) as e:
+        raise InvalidGzipBody(str(e))
+
+def _parse_id(value):
+    if isinstance(value, dict):
+        value = value.get('$oid')
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise ValueError('id must be an ObjectId')
+
+def validate_records(records, now=None):
+    """
+    Validate one chunk of decoded records.
+    Returns (docs, positions, rejects): the search_history documents, the
+    position in `records` of each, and [(position, error)] for the rest.
+    Records may carry `id` (as exported) or `_id`, which makes a replay
+    idempotent: rows that are already stored are rejected as duplicates.
+    """
+    now = now or datetime.utcnow()
+    docs, positions, rejects = [], [], []
+    for position, record in enumerate(records):
+        try:
+            if not isinstance(record, dict):
+                raise ValueError('record must be a JSON object')
+            user_name = record.get('user_name')
+            search_term = record.get('search_term')
+            results_count = record.get('results_count', 0)
+            if not isinstance(user_name, str) or not user_name:
+                raise ValueError('user_name is required')
+            if not isinstance(search_term, str):
+                raise ValueError('search_term must be a string')
+            if not isinstance(results_count, int) or isinstance(results_count, bool) or results_count < 0:
+                raise ValueError('results_count must be a non-negative integer')
+
+            timestamp = record.get('timestamp')
+            doc = {
+                'user_name': user_name,
+                'search_term': search_term,
+                'results_count': results_count,
+                'timestamp': now if timestamp is None else _parse_timestamp(timestamp),
+                **SearchHistory.normalized_fields(user_name, search_term)
+            }
+            record_id = record.get('_id', record.get('id'))
+            if record_id is not None:
+                doc['_id'] = _parse_id(record_id)
+        except ValueError as e:
+            rejects.append((position, str(e)))
+            continue
+        docs.append(doc)
+        positions.append(position)
+    return docs, positions, rejects
+
+
+class HistoryIngestor:
+    """
+    Bulk loader for NDJSON search history (one SearchHistory record per line).
+
+    Lines are decoded and validated a chunk of `chunk_size` at a time on
+    the calling thread while up to `workers` threads write earlier chunks
+    with unordered insert_many, so parsing and writing overlap and at most
+    about 2 * workers chunks are held in memory. Rollups are updated per
+    chunk; totals and cached statistics once the load is done.
+    """
+
+    def __init__(self, history_service, chunk_size=5000, workers=4, max_rejects=100):
+        self.history_service = history_service
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.max_rejects = max_rejects
+
+    @classmethod
+    def from_app(cls, app):
+        return cls(
+            HistoryService.from_app(app),
+            chunk_size=app.config['HISTORY_INGEST_CHUNK_SIZE'],
+            workers=app.config['HISTORY_INGEST_WORKERS'],
+            max_rejects=app.config['HISTORY_INGEST_MAX_REJECTS']
+        )
+
+    def ingest(self, lines):
+        """
+        Load `lines` (str or bytes, e.g. an open file); returns a report with
+        counts, throughput and up to `max_rejects` rejected lines.
+        """
+        start = time.monotonic()
+        report = {'received': 0, 'inserted': 0, 'rejected': 0, 'chunks': 0, 'rejects': []}
+        pending = set()
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='history-ingest') as executor:
+            try:
+                for chunk in self._chunks(lines, report):
+                    if len(pending) >= 2 * self.workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self._collect(future.result(), report)
+                    pending.add(executor.submit(self._write, *chunk))
+            finally:
+                for future in pending:
+                    self._collect(future.result(), report)
+
+        self._after_ingest(report)
+
+        elapsed = time.monotonic() - start
+        report['seconds'] = round(elapsed, 3)
+        report['rows_per_second'] = round(report['inserted'] / elapsed) if elapsed else report['inserted']
+        return report
+
+    def _chunks(self, lines, report):
+        """Yield (docs, line_numbers) per chunk, recording decode and validation rejects"""
+        records, numbers = [], []
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            report['received'] += 1
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                self._reject(report, number, f'invalid JSON: {str(e)}')
+                continue
+            numbers.append(number)
+            if len(records) >= self.chunk_size:
+                yield self._validate(records, numbers, report)
+                records, numbers = [], []
+        if records:
+            yield self._validate(records, numbers, report)
+
+    def _validate(self, records, numbers, report):
+        docs, positions, rejects = validate_records(records)
+        for position, error in rejects:
+            self._reject(report, numbers[position], error)
+        return docs, [numbers[position] for position in positions]
+
+    def _write(self, docs, numbers):
+        """Insert one chunk; returns (stored docs, [(line, error)])"""
+        if not docs:
+            return [], []
+        try:
+            self.history_service.collection.insert_many(docs, ordered=False)
+            stored, errors = docs, []
+        except BulkWriteError as e:
+            # Unordered inserts keep going past bad documents; keep what landed
+            write_errors = e.details.get('writeErrors', [])
+            rejected = {error['index'] for error in write_errors}
+            stored = [doc for index, doc in enumerate(docs) if index not in rejected]
+            errors = [(numbers[error['index']], error.get('errmsg', 'write error')) for error in write_errors]
+        except Exception as e:
+            logger.error(f"Error writing {len(docs)} ingested history records: {str(e)}")
+            stored, errors = [], [(number, str(e)) for number in numbers]
+
+        if stored and self.history_service.rollups is not None:
+            self.history_service.rollups.apply(stored)
+        return stored, errors
+
+    def _collect(self, result, report):
+        stored, errors = result
+        report['chunks'] += 1
+        report['inserted'] += len(stored)
+        for number, error in errors:
+            self._reject(report, number, error)
+
+    def _reject(self, report, number, error):
+        report['rejected'] += 1
+        if len(report['rejects']) < self.max_rejects:
+            report['rejects'].append({'line': number, 'error': error})
+
+    def _after_ingest(self, report):
+        if not report['inserted']:
+            return
+        if self.history_service.counts is not None:
+            self.history_service.counts.clear()
+        if self.history_service.recent is not None:
+            self.history_service.recent.clear()
+        if self.history_service.stats_cache is not None:
+            self.history_service.stats_cache.invalidate()
@@ -0,0 +1,91 @@
+# app/services/history_jobs.py
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from app.services.history_service import HistoryService
+
+logger = logging.getLogger(__name__)
+
+class HistoryJobRunner:
+    """
+    Runs large history clears in the background, one at a time.
+
+    A job deletes matching records in batches of `batch_size` _ids,
+    pausing `batch_pause` seconds between batches so replication and other
+    traffic keep up, and records its progress in the `history_jobs`
+    collection. Rollups and caches are brought up to date once it is done.
+    """
+
+    def __init__(self, app, batch_size=1000, batch_pause=0.1):
+        self.app = app
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='history-jobs')
+
+    @classmethod
+    def from_app(cls, app):
+        return cls(
+            app,
+            batch_size=app.config['HISTORY_CLEAR_BATCH_SIZE'],
+            batch_pause=app.config['HISTORY_CLEAR_BATCH_PAUSE']
+        )
+
+    @property
+    def jobs(self):
+        return self.app.db.history_jobs
+
+    def submit_clear(self, user_name=None, date_from=None, date_to=None):
+        """Queue a clear with the same filters as clear_history; returns the job document"""
+        query = HistoryService.clear_query(user_name, date_from, date_to)
+        job = {
+            '_id': uuid.uuid4().hex,
+            'type': 'clear',
+            'status': 'queued',
+            'filters': {'user_name': user_name, 'date_from': date_from, 'date_to': date_to},
+            'total': None,
+            'deleted_count': 0,
+            'batches': 0,
+            'created_at': datetime.utcnow(),
+            'started_at': None,
+            'finished_at': None,
+            'error': None
+        }
+        self.jobs.insert_one(job)
+        self._executor.submit(self._run_clear, job['_id'], query)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.find_one({'_id': job_id})
+
+    def _update(self, job_id, **fields):
+        self.jobs.update_one({'_id': job_id}, {'$set': fields})
+
+    def _run_clear(self, job_id, query):
+        with self.app.app_context():
+            history_service = HistoryService.from_app(self.app)
+            self._update(job_id, status='running', started_at=datetime.utcnow())
+            deleted = batches = 0
+            days = set()
+            try:
+                self._update(job_id, total=history_service.count_history(query))
+                while True:
+                    count, batch_days = history_service.delete_batch(query, self.batch_size)
+                    if not count:
+                        break
+                    deleted += count
+                    batches += 1
+                    days |= batch_days
+                    self._update(job_id, deleted_count=deleted, batches=batches)
+                    time.sleep(self.batch_pause)
+
+                history_service.after_clear(query, days)
+                self._update(job_id, status='done', deleted_count=deleted, finished_at=datetime.utcnow())
+            except Exception as e:
+                logger.error(f"History clear job {job_id} failed: {str(e)}")
+                history_service.after_clear(query, days)
+                self._update(job_id, status='failed', error=str(e), finished_at=datetime.utcnow())
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
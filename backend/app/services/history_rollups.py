@@ -0,0 +1,250 @@
+# app/services/history_rollups.py
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, IndexModel, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+DAY_FORMAT = '%Y-%m-%d'
+
+ROLLUP_INDEXES = [
+    IndexModel([('day', ASCENDING), ('kind', ASCENDING), ('key', ASCENDING)], name='day_kind_key', unique=True)
+]
+
+class HistoryRollups:
+    """
+    Per-day search counters in `search_stats_daily`, kept next to the raw
+    search_history records.
+
+    There is one row per (day, kind, key): kind 'total' (key ''), 'term'
+    (key = search term) and 'user' (key = user name, with last_search).
+    Rows are bumped with $inc upserts as searches are written, so the
+    statistics read a few rows per day instead of every raw record.
+
+    Rows only cover history written while rollups were on, so they are
+    trusted once a full rebuild has run (or history was empty when they
+    were first used); `ready` tells, and callers fall back to search_history
+    until then.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.collection = db.search_stats_daily
+        self.meta = db.search_stats_meta
+        self.history = db.search_history
+
+    def ensure_indexes(self):
+        return self.collection.create_indexes(ROLLUP_INDEXES)
+
+    def ready(self):
+        """Whether the rows cover all of search_history"""
+        if self.meta.find_one({'_id': 'backfill'}) is not None:
+            return True
+        if self.history.find_one({}, {'_id': 1}) is None:
+            # Nothing to backfill: every search from now on is applied
+            self._mark_ready()
+            return True
+        return False
+
+    def _mark_ready(self):
+        self.meta.update_one(
+            {'_id': 'backfill'},
+            {'$set': {'completed_at': datetime.utcnow()}},
+            upsert=True
+        )
+
+    def apply(self, docs):
+        """Count `docs` (search_history records) into their daily rows"""
+        counts = defaultdict(int)
+        last_search = {}
+        for doc in docs:
+            day = doc['timestamp'].strftime(DAY_FORMAT)
+            counts[(day, 'total', '')] += 1
+            if doc.get('search_term'):
+                counts[(day, 'term', doc['search_term'])] += 1
+            user_key = (day, 'user', doc['user_name'])
+            counts[user_key] += 1
+            last_search[user_key] = max(last_search.get(user_key, doc['timestamp']), doc['timestamp'])
+
+        now = datetime.utcnow()
+        operations = []
+        for key, count in counts.items():
+            update = {'$inc': {'count': count}, '$set': {'updated_at': now}}
+            if key in last_search:
+                update['$max'] = {'last_search': last_search[key]}
+            day, kind, name = key
+            operations.append(UpdateOne({'day': day, 'kind': kind, 'key': name}, update, upsert=True))
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    def statistics(self, days=7, limit=10):
+        """Statistics over the last `days` whole days, in the shape of HistoryService.get_statistics"""
+        first_day = (datetime.utcnow() - timedelta(days=days)).strftime(DAY_FORMAT)
+
+        pipeline = [
+            {
+                '$match': {
+                    'day': {'$gte': first_day}
+                }
+            },
+            {
+                '$facet': {
+                    'daily_searches': [
+                        {'$match': {'kind': 'total'}},
+                        {'$group': {'_id': '$day', 'count': {'$sum': '$count'}}},
+                        {'$sort': {'_id': 1}}
+                    ],
+                    'popular_terms': [
+                        {'$match': {'kind': 'term'}},
+                        {'$group': {'_id': '$key', 'count': {'$sum': '$count'}}},
+                        {'$sort': {'count': -1}},
+                        {'$limit': limit}
+                    ],
+                    'active_users': [
+                        {'$match': {'kind': 'user'}},
+                        {
+                            '$group': {
+                                '_id': '$key',
+                                'search_count': {'$sum': '$count'},
+                                'last_search': {'$max': '$last_search'}
+                            }
+                        },
+                        {'$sort': {'search_count': -1}},
+                        {'$limit': limit}
+                    ],
+                    'total': [
+                        {'$match': {'kind': 'total'}},
+                        {'$group': {'_id': None, 'count': {'$sum': '$count'}}}
+                    ]
+                }
+            }
+        ]
+        result = next(self.collection.aggregate(pipeline))
+
+        return {
+            'daily_searches': result['daily_searches'],
+            'popular_terms': result['popular_terms'],
+            'active_users': result['active_users'],
+            'period_days': days,
+            'total_searches': result['total'][0]['count'] if result['total'] else 0
+        }
+
+    def affected_days(self, query):
+        """Days holding search_history records that match `query`"""
+        return [
+            row['_id']
+            for row in self.history.aggregate([
+                {'$match': query},
+                {'$group': {'_id': {'$dateToString': {'format': DAY_FORMAT, 'date': '$timestamp'}}}}
+            ])
+        ]
+
+    def _rebuild_range(self, start, end, batch_size=1000):
+        """Recompute the rows of the days in [start, end) from search_history"""
+        window = {'timestamp': {'$gte': start, '$lt': end}}
+        day = {'$dateToString': {'format': DAY_FORMAT, 'date': '$timestamp'}}
+        sources = [
+            ('total', [
+                {'$match': window},
+                {'$group': {'_id': {'day': day, 'key': ''}, 'count': {'$sum': 1}}}
+            ]),
+            ('term', [
+                {'$match': dict(window, search_term={'$ne': ''})},
+                {'$group': {'_id': {'day': day, 'key': '$search_term'}, 'count': {'$sum': 1}}}
+            ]),
+            ('user', [
+                {'$match': window},
+                {
+                    '$group': {
+                        '_id': {'day': day, 'key': '$user_name'},
+                        'count': {'$sum': 1},
+                        'last_search': {'$max': '$timestamp'}
+                    }
+                }
+            ])
+        ]
+
+        # Overwrite each row in place rather than deleting the range first,
+        # so readers never see the days empty and a concurrent $inc is at
+        # most lost or doubled for the one row being overwritten
+        day_range = {'$gte': start.strftime(DAY_FORMAT), '$lt': end.strftime(DAY_FORMAT)}
+        existing = {
+            (row['day'], row['kind'], row['key'])
+            for row in self.collection.find({'day': day_range}, {'_id': 0, 'day': 1, 'kind': 1, 'key': 1})
+        }
+        started = datetime.utcnow()
+        rows = 0
+        batch = []
+        for kind, pipeline in sources:
+            for group in self.history.aggregate(pipeline, allowDiskUse=True):
+                if kind == 'term' and not group['_id']['key']:
+                    continue
+                row = {'day': group['_id']['day'], 'kind': kind, 'key': group['_id']['key'],
+                       'count': group['count'], 'updated_at': started}
+                if kind == 'user':
+                    row['last_search'] = group['last_search']
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    rows += self._write_rows(batch, existing)
+                    batch = []
+        if batch:
+            rows += self._write_rows(batch, existing)
+
+        # Rows neither rebuilt nor written since belong to searches that are gone
+        self.collection.delete_many({'day': day_range, 'updated_at': {'$not': {'$gte': started}}})
+        return rows
+
+    def _write_rows(self, rows, existing):
+        """Insert new rows and $set existing ones; rows created meanwhile are retried as upserts"""
+        def upsert(row):
+            key = {'day': row['day'], 'kind': row['kind'], 'key': row['key']}
+            return UpdateOne(key, {'$set': row}, upsert=True)
+
+        operations = [
+            upsert(row) if (row['day'], row['kind'], row['key']) in existing else InsertOne(row)
+            for row in rows
+        ]
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            duplicates = [error['index'] for error in e.details.get('writeErrors', []) if error.get('code') == 11000]
+            if len(duplicates) < len(e.details.get('writeErrors', [])):
+                raise
+            self.collection.bulk_write([upsert(rows[index]) for index in duplicates], ordered=False)
+        return len(rows)
+
+    def rebuild_day(self, day):
+        """Recompute the rows of `day` (YYYY-MM-DD) from search_history; returns the row count"""
+        start = datetime.strptime(day, DAY_FORMAT)
+        return self._rebuild_range(start, start + timedelta(days=1))
+
+    def rebuild(self, date_from=None, date_to=None):
+        """
+        Backfill: recompute every day between `date_from` and `date_to`
+        (datetimes, both inclusive; defaults to the whole history) with
+        three grouped passes over search_history. A search written while
+        its row is being overwritten can be counted twice or missed, so run
+        it when writes are quiet. A rebuild of the whole history marks the
+        rollups ready. Returns (days, rows) rebuilt.
+        """
+        full = date_from is None and date_to is None
+        if date_from is None:
+            oldest = self.history.find_one({}, {'timestamp': 1}, sort=[('timestamp', 1)])
+            if oldest is None:
+                self._mark_ready()
+                return 0, 0
+            date_from = oldest['timestamp']
+        if date_to is None:
+            date_to = datetime.utcnow()
+
+        start = datetime(date_from.year, date_from.month, date_from.day)
+        end = datetime(date_to.year, date_to.month, date_to.day) + timedelta(days=1)
+        if end <= start:
+            return 0, 0
+        rows = self._rebuild_range(start, end)
+        if full:
+            self._mark_ready()
+        return (end - start).days, rows
+
+    def clear(self):
+        return self.collection.delete_many({}).deleted_count
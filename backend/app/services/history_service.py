@@ -1,100 +1,375 @@
 # app/services/history_service.py
+import base64
+import logging
+import binascii
+import re
 from datetime import datetime, timedelta
+from itertools import chain
+from bson import json_util
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
 from app.models.search_history import SearchHistory
+from app.services.history_rollups import HistoryRollups
+
+logger = logging.getLogger(__name__)
+
+# Fields /api/history can sort on; results are ordered by (field, _id) so
+# every sort is total and each has a matching index for keyset seeks
+HISTORY_SORT_FIELDS = ['timestamp', 'user_name', 'search_term', 'results_count']
+
+# Text searches can also be ordered by relevance, computed per match
+RELEVANCE_SORT = 'relevance'
+
+# `text` matches word prefixes through the search_keywords multikey index;
+# `regex` is the unindexed substring match, kept as an explicit fallback
+HISTORY_SEARCH_MODES = ['text', 'regex']
+
+HISTORY_INDEXES = [
+    IndexModel([('user_name', ASCENDING), ('timestamp', DESCENDING)], name='user_name_timestamp'),
+    IndexModel([('timestamp', DESCENDING), ('_id', DESCENDING)], name='timestamp_id'),
+    IndexModel([('user_name', ASCENDING), ('_id', ASCENDING)], name='user_name_id'),
+    IndexModel([('search_term', ASCENDING), ('_id', ASCENDING)], name='search_term_id'),
+    IndexModel([('results_count', ASCENDING), ('_id', ASCENDING)], name='results_count_id'),
+    IndexModel([('user_name_lower', ASCENDING), ('timestamp', DESCENDING)], name='user_name_lower_timestamp'),
+    IndexModel([('search_term_lower', ASCENDING), ('timestamp', DESCENDING)], name='search_term_lower_timestamp'),
+    IndexModel([('search_keywords', ASCENDING), ('timestamp', DESCENDING)], name='search_keywords_timestamp')
+]
+
+# TTL index enforcing HISTORY_RETENTION_DAYS, managed by ensure_indexes
+RETENTION_INDEX = 'timestamp_ttl'
+
+# Normalized fields are an implementation detail and never returned
+HISTORY_INTERNAL_FIELDS = ['user_name_lower', 'search_term_lower', 'search_keywords']
+HISTORY_PROJECTION = {'_id': 0, **{field: 0 for field in HISTORY_INTERNAL_FIELDS}}
+
+def encode_history_cursor(sort_field, sort_direction, doc):
+    """Opaque token for the position right after `doc` in the given sort"""
+    position = {'f': sort_field, 'd': sort_direction, 'v': doc.get(sort_field), 'i': doc['_id']}
+    return base64.urlsafe_b64encode(json_util.dumps(position).encode('utf-8')).decode('ascii')
+
+def decode_history_cursor(token, sort_field, sort_direction):
+    """
+    Return the (value, _id) position encoded in `token`.
+    Raises ValueError for malformed tokens or tokens from another sort.
+    """
+    try:
+        position = json_util.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        value, last_id = position['v'], ObjectId(position['i'])
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError, InvalidId):
+        raise ValueError('Invalid cursor')
+    if position.get('f') != sort_field or position.get('d') != sort_direction:
+        raise ValueError('Cursor does not match the requested sort')
+    return value, last_id
+
+HISTORY_COUNT_MODES = ['exact', 'estimate', 'none']
+
+# Exports keep _id so clients can resume from the last row they received
+HISTORY_EXPORT_PROJECTION = {'user_name': 1, 'search_term': 1, 'results_count': 1, 'timestamp': 1}
 
 class HistoryService:
-    def __init__(self, db):
+    def __init__(self, db, writer=None, counts=None, count_ttl=30, rollups=None,
+                 stats_cache=None, live_stats=None, recent=None):
         self.db = db
         self.collection = db.search_history
+        self.writer = writer
+        # Optional HistoryRollups; statistics are then read from daily rows
+        self.rollups = rollups
+        # Optional StatsCache, told about every write
+        self.stats_cache = stats_cache
+        # Optional LiveStats sketches fed with every search
+        self.live_stats = live_stats
+        # Optional RecentHistory ring buffers of each user's last searches
+        self.recent = recent
+        # Optional ResponseCache of totals keyed by normalized filter
+        self.counts = counts
+        self.count_ttl = count_ttl
+
+    @classmethod
+    def from_app(cls, app):
+        return cls(
+            app.db,
+            writer=app.history_writer,
+            counts=app.history_counts,
+            count_ttl=app.config['HISTORY_COUNT_CACHE_TTL'],
+            rollups=HistoryRollups(app.db) if app.config['HISTORY_STATS_ROLLUPS'] else None,
+            stats_cache=app.history_stats,
+            live_stats=app.live_stats,
+            recent=app.recent_history
+        )
 
     def add_search(self, user_name, search_term, results_count):
-        """Add a new search to history"""
+        """
+        Add a new search to history.
+        With a write-behind writer the insert is queued and batched, and
+        the writer updates the rollups and stats cache once it is written.
+        """
         search = SearchHistory(user_name, search_term, results_count)
-        self.collection.insert_one(search.to_dict())
+        doc = search.to_dict()
+        if self.writer is not None:
+            # Known before the write, so a queued search can be told apart from its stored copy
+            doc['_id'] = ObjectId()
+        if self.live_stats is not None:
+            self.live_stats.add(user_name, search_term)
+        if self.recent is not None:
+            self.recent.add(doc)
+        if self.writer is not None:
+            self.writer.enqueue(doc)
+        else:
+            self.collection.insert_one(doc)
+            if self.rollups is not None:
+                self.rollups.apply([doc])
+            if self.stats_cache is not None:
+                self.stats_cache.bump()
         return search
 
-    def get_history_paginated(self, query=None, page=1, per_page=10, 
-                            sort_field='timestamp', sort_direction=-1):
-        """Get paginated search history with filters and sorting"""
+    def ensure_indexes(self, retention_days=0):
+        """
+        Create the search_history indexes; returns the names of the indexes.
+        With `retention_days` a TTL index on timestamp makes MongoDB expire
+        older records; changing it updates the index in place, and 0
+        removes it.
+        """
+        names = self.collection.create_indexes(HISTORY_INDEXES)
+
+        existing = self.collection.index_information().get(RETENTION_INDEX)
+        expire_after = int(retention_days * 86400)
+        if not expire_after:
+            if existing is not None:
+                self.collection.drop_index(RETENTION_INDEX)
+        elif existing is None:
+            names.append(self.collection.create_index(
+                [('timestamp', ASCENDING)], name=RETENTION_INDEX, expireAfterSeconds=expire_after
+            ))
+        else:
+            if existing.get('expireAfterSeconds') != expire_after:
+                self.db.command('collMod', self.collection.name, index={
+                    'name': RETENTION_INDEX,
+                    'expireAfterSeconds': expire_after
+                })
+            names.append(RETENTION_INDEX)
+        return names
+
+    def missing_indexes(self):
+        """Names of expected indexes that do not exist on the collection"""
+        existing = set(self.collection.index_information())
+        return [
+            index.document['name']
+            for index in HISTORY_INDEXES
+            if index.document['name'] not in existing
+        ]
+
+    def backfill_normalized_fields(self, batch_size=1000):
+        """Add the lowercase fields and keywords to records written before they existed"""
+        cursor = self.collection.find(
+            {'$or': [
+                {'user_name_lower': {'$exists': False}},
+                {'search_term_lower': {'$exists': False}},
+                {'search_keywords': {'$exists': False}}
+            ]},
+            {'user_name': 1, 'search_term': 1}
+        ).batch_size(batch_size)
+
+        updated = 0
+        operations = []
+        for doc in cursor:
+            operations.append(UpdateOne(
+                {'_id': doc['_id']},
+                {'$set': SearchHistory.normalized_fields(doc.get('user_name'), doc.get('search_term'))}
+            ))
+            if len(operations) >= batch_size:
+                updated += self.collection.bulk_write(operations, ordered=False).modified_count
+                operations = []
+        if operations:
+            updated += self.collection.bulk_write(operations, ordered=False).modified_count
+        return updated
+
+    def get_history_page(self, query=None, page=1, after=None, per_page=10,
+                         sort_field='timestamp', sort_direction=-1, count='exact',
+                         search_terms=None):
+        """
+        Get one page of search history and its total.
+
+        The page is addressed by `page` or, for keyset pagination, by
+        `after`, a (value, _id) position from decode_history_cursor. The
+        filter, keyset seek, sort and limit lead the pipeline so the
+        (field, _id) indexes serve them. `count` is 'exact', 'estimate'
+        (collection metadata when unfiltered, else the last known total) or
+        'none'; a total that is not cached costs one count_documents.
+        Sorting by RELEVANCE_SORT ranks items by relevance_score and
+        returns that score as `relevance`.
+
+        Returns a dict with items, total, has_next and next_cursor.
+        """
         if query is None:
             query = {}
 
-        skip = (page - 1) * per_page
-        cursor = self.collection.find(
-            query,
-            {'_id': 0}  # Exclude MongoDB _id
-        ).sort(
-            sort_field, sort_direction
-        ).skip(skip).limit(per_page)
+        count_key = json_util.dumps(query, sort_keys=True)
+        total = None
+        if count == 'exact' and self.counts is not None:
+            total = self.counts.get(count_key)
+        elif count == 'estimate':
+            if not query:
+                total = self.collection.estimated_document_count()
+            elif self.counts is not None:
+                total = self.counts.peek(count_key)
+
+        seek = None
+        if after is not None:
+            value, last_id = after
+            op = '$lt' if sort_direction == -1 else '$gt'
+            seek = {'$or': [
+                {sort_field: {op: value}},
+                {sort_field: value, '_id': {op: last_id}}
+            ]}
+
+        # Fetch one extra item to know whether there is a next page
+        if sort_field == RELEVANCE_SORT:
+            # The score is computed per document, so the seek follows it
+            pipeline = [
+                {'$match': query},
+                {'$addFields': {RELEVANCE_SORT: HistoryService.relevance_score(search_terms or [])}}
+            ]
+            if seek is not None:
+                pipeline.append({'$match': seek})
+        else:
+            match = query
+            if seek is not None:
+                match = {'$and': [query, seek]} if query else seek
+            pipeline = [{'$match': match}]
+        pipeline.append({'$sort': {sort_field: sort_direction, '_id': sort_direction}})
+        if after is None and page > 1:
+            pipeline.append({'$skip': (page - 1) * per_page})
+        pipeline.append({'$limit': per_page + 1})
+        pipeline.append({'$project': {field: 0 for field in HISTORY_INTERNAL_FIELDS}})
+        items = list(self.collection.aggregate(pipeline))
+
+        if count != 'none' and total is None:
+            total = self.collection.count_documents(query)
+            if self.counts is not None:
+                self.counts.set(count_key, total, self.count_ttl)
 
-        return list(cursor)
+        has_next = len(items) > per_page
+        items = items[:per_page]
+        next_cursor = encode_history_cursor(sort_field, sort_direction, items[-1]) if has_next else None
+        for item in items:
+            del item['_id']
 
-    def count_history(self, query=None):
-        """Count total history entries matching query"""
+        return {
+            'items': items,
+            'total': total,
+            'has_next': has_next,
+            'next_cursor': next_cursor
+        }
+
+    def count_history(self, query=None, limit=None):
+        """Count total history entries matching query, stopping at `limit` if given"""
         if query is None:
             query = {}
+        if limit:
+            return self.collection.count_documents(query, limit=limit)
         return self.collection.count_documents(query)
 
-    def get_user_history(self, user_name):
-        """Get all search history for a specific user"""
-        cursor = self.collection.find(
-            {'user_name': user_name},
-            {'_id': 0}
-        ).sort('timestamp', -1)
-        return list(cursor)
+    def iter_user_history(self, user_name, batch_size=500, limit=None, before=None, until=None, with_ids=False):
+        """
+        Iterate over a user's search history, newest first, without loading it all.
+        `limit` caps the number of entries, `before` only returns searches
+        older than that timestamp and `until` those no newer than it; all are
+        served by the user_name_timestamp index. `with_ids` keeps `_id`.
+        """
+        query = {'user_name': user_name}
+        if before is not None:
+            query['timestamp'] = {'$lt': before}
+        elif until is not None:
+            query['timestamp'] = {'$lte': until}
+        projection = {field: 0 for field in HISTORY_INTERNAL_FIELDS} if with_ids else HISTORY_PROJECTION
+        cursor = self.collection.find(query, projection).sort('timestamp', -1)
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor.batch_size(min(batch_size, limit) if limit else batch_size)
+
+    def recent_user_history(self, user_name, limit, before=None, batch_size=500):
+        """
+        A user's last `limit` searches (before `before`), newest first.
+        The newest ones come from the recent-history ring buffer; only the
+        searches older than it holds are read from Mongo.
+        """
+        if self.recent is None or before is not None:
+            return self.iter_user_history(user_name, batch_size=batch_size, limit=limit, before=before)
+
+        recent = self.recent.get(user_name, min(limit, self.recent.size))
+        if recent is None:
+            recent = self.recent.load(user_name, lambda size: self._load_recent(user_name, size))
+        # A buffer that is not full holds the user's whole history: every
+        # stored search plus those still queued, and each one added since
+        if limit <= len(recent) or len(recent) < self.recent.size:
+            return iter(recent[:limit])
+
+        # Continue from Mongo, re-reading every search at the buffer's oldest
+        # timestamp so searches sharing it are neither skipped nor repeated
+        oldest = recent[-1]['timestamp']
+        newer = [entry for entry in recent if entry['timestamp'] > oldest]
+        return chain(newer, self.iter_user_history(
+            user_name, batch_size=batch_size, limit=limit - len(newer), until=oldest
+        ))
+
+    def _load_recent(self, user_name, size):
+        """
+        The user's last `size` searches for a fresh ring buffer, including
+        those still queued in the write-behind writer. The queue is read
+        first, so a search written meanwhile is found in Mongo and dropped
+        from the queued ones by _id.
+        """
+        queued = self.writer.pending(user_name) if self.writer is not None else []
+        stored = list(self.iter_user_history(user_name, limit=size, with_ids=bool(queued)))
+        if not queued:
+            return stored
+        stored_ids = {doc['_id'] for doc in stored}
+        docs = stored + [doc for doc in queued if doc['_id'] not in stored_ids]
+        docs.sort(key=lambda doc: doc['timestamp'], reverse=True)
+        return docs[:size]
+
+    def iter_export(self, query=None, after=None, batch_size=2000):
+        """
+        Iterate over matching entries oldest first, in (timestamp, _id) order.
+
+        `after` is the (timestamp, _id) of the last entry already exported;
+        the export resumes right after it (after the whole timestamp when
+        _id is None). The timestamp_id index serves the
+        sort and the seek, so the server never holds more than one batch.
+        """
+        query = dict(query or {})
+        if after is not None:
+            timestamp, last_id = after
+            seek = {'timestamp': {'$gt': timestamp}}
+            if last_id is not None:
+                seek = {'$or': [seek, {'timestamp': timestamp, '_id': {'$gt': last_id}}]}
+            query = {'$and': [query, seek]} if query else seek
+
+        return self.collection.find(
+            query,
+            HISTORY_EXPORT_PROJECTION
+        ).sort([('timestamp', ASCENDING), ('_id', ASCENDING)]).batch_size(batch_size)
+
+    def get_user_history(self, user_name, limit=None, before=None):
+        """Get search history for a specific user"""
+        return list(self.iter_user_history(user_name, limit=limit, before=before))
 
     def get_statistics(self, days=7):
-        """Get search history statistics"""
-        date_limit = datetime.utcnow() - timedelta(days=days)
-        
-        # Daily searches
-        pipeline = [
-            {
-                '$match': {
-                    'timestamp': {'$gte': date_limit}
-                }
-            },
-            {
-                '$group': {
-                    '_id': {
-                        '$dateToString': {
-                            'format': '%Y-%m-%d',
-                            'date': '$timestamp'
-                        }
-                    },
-                    'count': {'$sum': 1}
-                }
-            },
-            {
-                '$sort': {'_id': 1}
-            }
-        ]
-        daily_searches = list(self.collection.aggregate(pipeline))
+        """
+        Get search history statistics.
+        With rollups they are read from the daily rows, once those cover
+        the whole history. Otherwise every section is computed from one
+        $match on the timestamp index fanned out with $facet, so the window
+        is scanned once.
+        """
+        if self.rollups is not None:
+            if self.rollups.ready():
+                return self.rollups.statistics(days)
+            logger.warning("History rollups are not backfilled yet; run 'flask backfill-rollups'")
 
-        # Popular search terms
-        pipeline = [
-            {
-                '$match': {
-                    'timestamp': {'$gte': date_limit},
-                    'search_term': {'$ne': ''}
-                }
-            },
-            {
-                '$group': {
-                    '_id': '$search_term',
-                    'count': {'$sum': 1}
-                }
-            },
-            {
-                '$sort': {'count': -1}
-            },
-            {
-                '$limit': 10
-            }
-        ]
-        popular_terms = list(self.collection.aggregate(pipeline))
+        date_limit = datetime.utcnow() - timedelta(days=days)
 
-        # Active users
         pipeline = [
             {
                 '$match': {
@@ -102,31 +377,185 @@ class HistoryService:
                 }
             },
             {
-                '$group': {
-                    '_id': '$user_name',
-                    'search_count': {'$sum': 1},
-                    'last_search': {'$max': '$timestamp'}
+                '$facet': {
+                    # Daily searches
+                    'daily_searches': [
+                        {
+                            '$group': {
+                                '_id': {
+                                    '$dateToString': {
+                                        'format': '%Y-%m-%d',
+                                        'date': '$timestamp'
+                                    }
+                                },
+                                'count': {'$sum': 1}
+                            }
+                        },
+                        {
+                            '$sort': {'_id': 1}
+                        }
+                    ],
+                    # Popular search terms
+                    'popular_terms': [
+                        {
+                            '$match': {
+                                'search_term': {'$ne': ''}
+                            }
+                        },
+                        {
+                            '$group': {
+                                '_id': '$search_term',
+                                'count': {'$sum': 1}
+                            }
+                        },
+                        {
+                            '$sort': {'count': -1}
+                        },
+                        {
+                            '$limit': 10
+                        }
+                    ],
+                    # Active users
+                    'active_users': [
+                        {
+                            '$group': {
+                                '_id': '$user_name',
+                                'search_count': {'$sum': 1},
+                                'last_search': {'$max': '$timestamp'}
+                            }
+                        },
+                        {
+                            '$sort': {'search_count': -1}
+                        },
+                        {
+                            '$limit': 10
+                        }
+                    ],
+                    'total': [
+                        {
+                            '$count': 'count'
+                        }
+                    ]
                 }
-            },
-            {
-                '$sort': {'search_count': -1}
-            },
-            {
-                '$limit': 10
             }
         ]
-        active_users = list(self.collection.aggregate(pipeline))
+        result = next(self.collection.aggregate(pipeline))
 
         return {
-            'daily_searches': daily_searches,
-            'popular_terms': popular_terms,
-            'active_users': active_users,
+            'daily_searches': result['daily_searches'],
+            'popular_terms': result['popular_terms'],
+            'active_users': result['active_users'],
             'period_days': days,
-            'total_searches': self.count_history({'timestamp': {'$gte': date_limit}})
+            'total_searches': result['total'][0]['count'] if result['total'] else 0
         }
 
-    def clear_history(self, user_name=None, date_from=None, date_to=None):
-        """Clear search history with optional filters"""
+    @staticmethod
+    def search_terms(search):
+        """The words a text search looks for"""
+        return SearchHistory.keywords(search)
+
+    @staticmethod
+    def relevance_score(terms):
+        """
+        Aggregation expression scoring a record against the words of a text
+        search, highest first:
+        - 4 when the search term is exactly those words
+        - 2 when the search term holds them as a phrase (whole words, in order)
+        - 1 when the search term starts with the first word
+        - 1 per word found whole in the user name or search term
+        - the share of the record's words that were found, so shorter and
+          more focused records break the remaining ties
+        """
+        keywords = {'$ifNull': ['$search_keywords', []]}
+        search_term = {'$ifNull': ['$search_term_lower', {'$toLower': '$search_term'}]}
+        escaped = [re.escape(term) for term in terms]
+        hits = {'$add': [{'$cond': [{'$in': [term, keywords]}, 1, 0]} for term in terms]}
+
+        def contains(regex, score):
+            return {'$cond': [{'$regexMatch': {'input': search_term, 'regex': regex}}, score, 0]}
+
+        return {'$add': [
+            {'$cond': [{'$eq': [search_term, ' '.join(terms)]}, 4, 0]},
+            contains(r'(^|[\W_])' + r'[\W_]+'.join(escaped) + r'($|[\W_])', 2),
+            contains('^' + escaped[0] + r'($|[\W_])', 1),
+            hits,
+            {'$divide': [hits, {'$max': [{'$size': keywords}, 1]}]}
+        ]}
+
+    @staticmethod
+    def _legacy_match(normalized_field, field, pattern):
+        """Case-insensitive match on `field` for records without `normalized_field`"""
+        return {normalized_field: {'$exists': False}, field: {'$regex': pattern, '$options': 'i'}}
+
+    @staticmethod
+    def filter_query(user_filter=None, date_from=None, date_to=None, search=None, search_mode='text'):
+        """
+        Filter for the /api/history filter parameters.
+        Raises ValueError with a client-facing message for malformed dates.
+        """
+        query = {}
+        clauses = []
+
+        # Text filters run on the lowercase fields: an anchored,
+        # case-sensitive regex there is an index range scan. Records written
+        # before those fields existed are matched on the raw fields instead;
+        # `{field: {'$exists': False}}` keeps that branch on the same index
+        if user_filter:
+            pattern = '^' + re.escape(user_filter.lower())
+            clauses.append({'$or': [
+                {'user_name_lower': {'$regex': pattern}},
+                HistoryService._legacy_match('user_name_lower', 'user_name', pattern)
+            ]})
+
+        # Text search: every word must start one of the record's keywords.
+        # Searches without words (punctuation only) can only match as regex
+        terms = HistoryService.search_terms(search) if search and search_mode == 'text' else []
+        if terms:
+            legacy_terms = []
+            for term in terms:
+                word_start = r'(^|[\W_])' + re.escape(term)
+                legacy_terms.append({'$or': [
+                    {'user_name': {'$regex': word_start, '$options': 'i'}},
+                    {'search_term': {'$regex': word_start, '$options': 'i'}}
+                ]})
+            clauses.append({'$or': [
+                {'$and': [{'search_keywords': {'$regex': '^' + re.escape(term)}} for term in terms]},
+                {'search_keywords': {'$exists': False}, '$and': legacy_terms}
+            ]})
+        elif search:
+            pattern = re.escape(search.lower())
+            clauses.append({'$or': [
+                {'user_name_lower': {'$regex': pattern}},
+                {'search_term_lower': {'$regex': pattern}},
+                HistoryService._legacy_match('user_name_lower', 'user_name', pattern),
+                HistoryService._legacy_match('search_term_lower', 'search_term', pattern)
+            ]})
+
+        if len(clauses) == 1:
+            query.update(clauses[0])
+        elif clauses:
+            query['$and'] = clauses
+
+        # Date filtering
+        if date_from or date_to:
+            query['timestamp'] = {}
+            if date_from:
+                try:
+                    query['timestamp']['$gte'] = datetime.strptime(date_from, '%Y-%m-%d')
+                except ValueError:
+                    raise ValueError('Invalid date_from format. Use YYYY-MM-DD')
+
+            if date_to:
+                try:
+                    query['timestamp']['$lt'] = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
+                except ValueError:
+                    raise ValueError('Invalid date_to format. Use YYYY-MM-DD')
+
+        return query
+
+    @staticmethod
+    def clear_query(user_name=None, date_from=None, date_to=None):
+        """Filter selecting the records clear_history removes"""
         query = {}
         
         if user_name:
@@ -139,5 +568,45 @@ class HistoryService:
             if date_to:
                 query['timestamp']['$lt'] = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
 
+        return query
+
+    def clear_history(self, user_name=None, date_from=None, date_to=None):
+        """Clear search history with optional filters"""
+        query = self.clear_query(user_name, date_from, date_to)
+
+        # Rollup rows of the days being cleared are recomputed afterwards
+        affected_days = []
+        if self.rollups is not None and query:
+            affected_days = self.rollups.affected_days(query)
+
         result = self.collection.delete_many(query)
-        return result.deleted_count
\ No newline at end of file
+        self.after_clear(query, affected_days)
+        return result.deleted_count
+
+    def delete_batch(self, query, batch_size=1000):
+        """
+        Delete at most `batch_size` records matching `query`, oldest _id
+        first. Returns (deleted_count, days) where days are the YYYY-MM-DD
+        days the deleted records belonged to.
+        """
+        batch = list(self.collection.find(query, {'_id': 1, 'timestamp': 1}).sort('_id', 1).limit(batch_size))
+        if not batch:
+            return 0, set()
+        result = self.collection.delete_many({'_id': {'$in': [doc['_id'] for doc in batch]}})
+        days = {doc['timestamp'].strftime('%Y-%m-%d') for doc in batch if doc.get('timestamp')}
+        return result.deleted_count, days
+
+    def after_clear(self, query, affected_days=()):
+        """Bring totals, rollups and cached statistics up to date after a delete"""
+        if self.counts is not None:
+            self.counts.clear()
+        if self.recent is not None:
+            self.recent.clear()
+        if self.rollups is not None:
+            if query:
+                for day in sorted(affected_days):
+                    self.rollups.rebuild_day(day)
+            else:
+                self.rollups.clear()
+        if self.stats_cache is not None:
+            self.stats_cache.invalidate()
@@ -0,0 +1,204 @@
+# app/services/history_writer.py
+import logging
+import queue
+import threading
+import time
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+_FLUSH = object()
+DUPLICATE_KEY = 11000
+
+class HistoryWriter:
+    """
+    Write-behind buffer for search history inserts.
+
+    Searches enqueue their document and return immediately; a background
+    thread writes them with unordered insert_many once `batch_size`
+    documents are queued or `flush_interval` seconds have passed. When the
+    queue is full, callers wait up to `enqueue_timeout` and then write
+    their document synchronously, so pressure slows searches down instead
+    of dropping history. A batch that fails as a whole (e.g. AutoReconnect)
+    is retried up to `max_retries` times, waiting `retry_backoff` seconds
+    and doubling each time, before it is dropped and logged.
+    `on_written(docs)`, if given, is called with the documents of each
+    batch that were stored.
+    """
+
+    def __init__(self, get_collection, batch_size=500, flush_interval=1.0,
+                 max_queue_size=10000, enqueue_timeout=0.5, on_written=None,
+                 max_retries=3, retry_backoff=0.5):
+        self.get_collection = get_collection
+        self.on_written = on_written
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        # user_name -> {id(doc): doc} of documents enqueued and not yet written
+        self._pending = {}
+        self._thread = None
+        self._closed = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+        self.sync_writes = 0
+        self.flushes = 0
+        self.total_flush_time = 0.0
+        self.max_flush_time = 0.0
+        self.last_flush_time = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+                self._thread.start()
+
+    def enqueue(self, doc):
+        """Queue `doc` for insertion; returns False if it had to be written synchronously"""
+        with self._lock:
+            self._pending.setdefault(doc.get('user_name'), {})[id(doc)] = doc
+        if self._closed:
+            self._write_now(doc)
+            return False
+
+        self.start()
+        try:
+            self._queue.put(doc, timeout=self.enqueue_timeout)
+        except queue.Full:
+            logger.warning("History write queue full, writing synchronously")
+            self._write_now(doc)
+            return False
+
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def pending(self, user_name):
+        """The user's documents that were enqueued but are not written (or dropped) yet"""
+        with self._lock:
+            return list(self._pending.get(user_name, {}).values())
+
+    def flush(self):
+        """Write any partial batch now and block until the queue is drained"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def close(self):
+        """Flush remaining documents and stop the background thread"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _write_now(self, doc):
+        # The caller is serving a request, so its write is not retried
+        with self._lock:
+            self.sync_writes += 1
+        self._write([doc], retries=0)
+
+    def _collect(self):
+        """Wait for the next batch; returns (batch, stop_requested)"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP or item is _FLUSH:
+                self._queue.task_done()
+                return batch, item is _STOP
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, stop = self._collect()
+            if batch:
+                self._write(batch, retries=self.max_retries)
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _insert(self, docs, retries):
+        """Insert `docs`, retrying whole-batch failures; returns the documents stored"""
+        attempt = 0
+        while True:
+            try:
+                self.get_collection().insert_many(docs, ordered=False)
+                return docs
+            except BulkWriteError as e:
+                # Unordered inserts keep going past bad documents; keep what
+                # landed, including documents stored by an earlier attempt
+                rejected = {
+                    error['index'] for error in e.details.get('writeErrors', [])
+                    if not (attempt and error.get('code') == DUPLICATE_KEY)
+                }
+                if rejected:
+                    logger.error(f"Error writing {len(rejected)} history records: {str(e)}")
+                return [doc for index, doc in enumerate(docs) if index not in rejected]
+            except Exception as e:
+                if attempt >= retries:
+                    logger.error(f"Dropping {len(docs)} history records after {attempt + 1} attempts: {str(e)}")
+                    return []
+                delay = self.retry_backoff * 2 ** attempt
+                logger.warning(f"Error writing {len(docs)} history records, retrying in {delay}s: {str(e)}")
+                with self._lock:
+                    self.retries += 1
+                attempt += 1
+                time.sleep(delay)
+
+    def _write(self, docs, retries=0):
+        start = time.monotonic()
+        stored = self._insert(docs, retries)
+        written, failed = len(stored), len(docs) - len(stored)
+
+        if stored and self.on_written is not None:
+            try:
+                self.on_written(stored)
+            except Exception as e:
+                logger.error(f"Error after writing history records: {str(e)}")
+
+        elapsed = time.monotonic() - start
+        with self._lock:
+            for doc in docs:
+                user_docs = self._pending.get(doc.get('user_name'))
+                if user_docs is not None:
+                    user_docs.pop(id(doc), None)
+                    if not user_docs:
+                        del self._pending[doc.get('user_name')]
+            self.written += written
+            self.failed += failed
+            self.flushes += 1
+            self.total_flush_time += elapsed
+            self.max_flush_time = max(self.max_flush_time, elapsed)
+            self.last_flush_time = elapsed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue_size': self.max_queue_size,
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'failed': self.failed,
+                'retries': self.retries,
+                'sync_writes': self.sync_writes,
+                'flushes': self.flushes,
+                'last_flush_ms': round(self.last_flush_time * 1000, 3),
+                'avg_flush_ms': round(self.total_flush_time / self.flushes * 1000, 3) if self.flushes else 0.0,
+                'max_flush_ms': round(self.max_flush_time * 1000, 3)
+            }
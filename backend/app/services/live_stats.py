@@ -0,0 +1,205 @@
+# app/services/live_stats.py
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from app.services.sketches import CountMinSketch, HyperLogLog, SpaceSaving
+
+logger = logging.getLogger(__name__)
+
+class _Bucket:
+    """Sketches of the searches in one time bucket"""
+
+    def __init__(self, capacity, cms_width, cms_depth, hll_precision):
+        self.searches = 0
+        self.terms = SpaceSaving(capacity)
+        self.term_counts = CountMinSketch(cms_width, cms_depth)
+        self.users = HyperLogLog(hll_precision)
+
+    def merge(self, other):
+        self.searches += other.searches
+        self.terms.merge(other.terms)
+        self.term_counts.merge(other.term_counts)
+        self.users.merge(other.users)
+
+    def copy(self):
+        bucket = _Bucket.__new__(_Bucket)
+        bucket.searches = self.searches
+        bucket.terms = self.terms.copy()
+        bucket.term_counts = self.term_counts.copy()
+        bucket.users = self.users.copy()
+        return bucket
+
+    def to_dict(self):
+        return {
+            'searches': self.searches,
+            'terms': self.terms.to_dict(),
+            'term_counts': self.term_counts.to_dict(),
+            'users': self.users.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        bucket = cls.__new__(cls)
+        bucket.searches = data['searches']
+        bucket.terms = SpaceSaving.from_dict(data['terms'])
+        bucket.term_counts = CountMinSketch.from_dict(data['term_counts'])
+        bucket.users = HyperLogLog.from_dict(data['users'])
+        return bucket
+
+
+class LiveStats:
+    """
+    In-process streaming statistics over the last `buckets` time buckets.
+
+    Every search feeds a Space-Saving summary and a Count-Min sketch of
+    search terms and a HyperLogLog of user names in its bucket. A query
+    merges at most `buckets` fixed-size sketches, so its cost does not grow
+    with search volume. Each worker periodically snapshots its buckets to
+    Mongo and loads the other workers' snapshots, so answers cover every
+    worker up to one snapshot interval behind.
+    """
+
+    def __init__(self, bucket_seconds=3600, buckets=24, capacity=100,
+                 cms_width=2048, cms_depth=5, hll_precision=12, worker_id=None):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self.sketch_args = (capacity, cms_width, cms_depth, hll_precision)
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}'
+        self._local = {}
+        self._remote = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_snapshot = None
+        self.workers = 1
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            bucket_seconds=config['LIVE_STATS_BUCKET_SECONDS'],
+            buckets=config['LIVE_STATS_BUCKETS'],
+            capacity=config['LIVE_STATS_TERM_CAPACITY'],
+            cms_width=config['LIVE_STATS_CMS_WIDTH'],
+            cms_depth=config['LIVE_STATS_CMS_DEPTH'],
+            hll_precision=config['LIVE_STATS_HLL_PRECISION']
+        )
+
+    def _bucket_start(self, timestamp):
+        return int(timestamp // self.bucket_seconds) * self.bucket_seconds
+
+    def _oldest(self, now, buckets):
+        return self._bucket_start(now) - (buckets - 1) * self.bucket_seconds
+
+    def add(self, user_name, search_term, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        start = self._bucket_start(timestamp)
+        with self._lock:
+            bucket = self._local.get(start)
+            if bucket is None:
+                bucket = self._local[start] = _Bucket(*self.sketch_args)
+                oldest = self._oldest(time.time(), self.buckets)
+                for expired in [key for key in self._local if key < oldest]:
+                    del self._local[expired]
+            bucket.searches += 1
+            if search_term:
+                bucket.terms.add(search_term)
+                bucket.term_counts.add(search_term)
+            bucket.users.add(user_name)
+            self._dirty.add(start)
+
+    def query(self, buckets=None, top_k=10):
+        """Approximate statistics for the last `buckets` buckets (default: all kept)"""
+        buckets = min(buckets or self.buckets, self.buckets)
+        oldest = self._oldest(time.time(), buckets)
+
+        # Hold the lock only to copy this worker's buckets, which add() keeps
+        # changing; snapshots replace remote buckets without modifying them
+        with self._lock:
+            parts = [bucket.copy() for start, bucket in self._local.items() if start >= oldest]
+            parts.extend(bucket for start, bucket in self._remote.items() if start >= oldest)
+
+        merged = _Bucket(*self.sketch_args)
+        for bucket in parts:
+            merged.merge(bucket)
+
+        popular_terms = [
+            {
+                '_id': term,
+                # Both sketches only overestimate; the smaller bound is tighter
+                'count': min(count, merged.term_counts.estimate(term)),
+                'max_error': error
+            }
+            for term, count, error in merged.terms.top(top_k)
+        ]
+
+        total = merged.term_counts.total
+        return {
+            'window_seconds': buckets * self.bucket_seconds,
+            'total_searches': merged.searches,
+            'distinct_users': merged.users.count(),
+            'popular_terms': popular_terms,
+            'workers': self.workers,
+            'snapshot_at': self.last_snapshot,
+            'error_bounds': {
+                'distinct_users_relative_std_error': round(merged.users.relative_error, 4),
+                'term_count_max_overestimate': int(merged.terms.max_error()),
+                'term_count_cms_overestimate': int(merged.term_counts.epsilon * total),
+                'term_count_cms_failure_probability': round(merged.term_counts.delta, 4)
+            }
+        }
+
+    def snapshot(self, collection):
+        """Write this worker's changed buckets and load every other worker's"""
+        now = time.time()
+        oldest = self._oldest(now, self.buckets)
+
+        with self._lock:
+            changed = {start: self._local[start].to_dict() for start in self._dirty if start in self._local}
+            self._dirty.clear()
+
+        for start, data in changed.items():
+            collection.replace_one(
+                {'_id': f'{self.worker_id}:{start}'},
+                dict(data, worker=self.worker_id, bucket=start, updated_at=now),
+                upsert=True
+            )
+        collection.delete_many({'bucket': {'$lt': oldest}})
+
+        remote = {}
+        workers = {self.worker_id}
+        for doc in collection.find({'bucket': {'$gte': oldest}, 'worker': {'$ne': self.worker_id}}):
+            workers.add(doc['worker'])
+            bucket = _Bucket.from_dict(doc)
+            if doc['bucket'] in remote:
+                remote[doc['bucket']].merge(bucket)
+            else:
+                remote[doc['bucket']] = bucket
+
+        with self._lock:
+            self._remote = remote
+            self.workers = len(workers)
+            self.last_snapshot = now
+        return len(changed)
+
+    def start(self, get_collection, interval):
+        """Snapshot every `interval` seconds in a daemon thread"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, args=(get_collection, interval), name='live-stats', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, get_collection, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.snapshot(get_collection())
+            except Exception as e:
+                logger.warning(f"Live stats snapshot failed: {str(e)}")
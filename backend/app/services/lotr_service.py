@@ -1,62 +1,299 @@
 # app/services/lotr_service.py
+import logging
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import requests
 from flask import current_app
-import logging
+from app.services.catalog_sync import CATALOG_COLLECTIONS
+
+logger = logging.getLogger(__name__)
+
+# Numeric movie fields that support range filters
+MOVIE_RANGE_FIELDS = [
+    'runtimeInMinutes',
+    'budgetInMillions',
+    'boxOfficeRevenueInMillions',
+    'academyAwardWins',
+    'rottenTomatoesScore'
+]
+MOVIE_SORT_FIELDS = ['name'] + MOVIE_RANGE_FIELDS
+
+# Cached upstream `docs` together with the validators used to revalidate them
+UpstreamDocs = namedtuple('UpstreamDocs', ['docs', 'etag', 'last_modified'])
+
 
 class LotrService:
     def __init__(self):
         self.base_url = current_app.config['LOTR_API_BASE_URL']
-        self.headers = {
-            'Authorization': f"Bearer {current_app.config['LOTR_API_TOKEN']}"
-        }
+        self.db = current_app.db
+        self.mirror_enabled = current_app.config['CATALOG_MIRROR_ENABLED']
+        self.client = current_app.upstream
+        self.cache = current_app.lotr_cache
+        self.flight = current_app.lotr_flight
+        self.indexes = current_app.search_indexes
+        self._catalogs = {}
+        self.cache_ttls = current_app.config['LOTR_CACHE_TTLS']
+        self.default_ttl = current_app.config['LOTR_CACHE_DEFAULT_TTL']
+        self.page_size = current_app.config['LOTR_STREAM_PAGE_SIZE']
+        self.prefetch = current_app.config['LOTR_STREAM_PREFETCH']
+        self.batch_concurrency = current_app.config['LOTR_BATCH_CONCURRENCY']
+
+    def _mirror(self, resource):
+        """Local mirror collection for `resource`, or None when disabled"""
+        if not self.mirror_enabled:
+            return None
+        return self.db[CATALOG_COLLECTIONS[resource]]
+
+    def _mirror_checkpoint(self, resource):
+        """Last successful sync checkpoint for `resource`, if the mirror holds data"""
+        if not self.mirror_enabled:
+            return None
+        checkpoint = self.db.sync_checkpoints.find_one(
+            {'_id': resource},
+            {'last_success_at': 1, 'total': 1}
+        )
+        if checkpoint and checkpoint.get('total'):
+            return checkpoint
+        return None
+
+    def _request_page(self, url):
+        response = self.client.get(url)
+        if response.status_code == 404:
+            return {'docs': []}
+        response.raise_for_status()
+        return response.json()
+
+    def _request_docs(self, url):
+        """
+        Fetch `docs` for `url`. When an earlier copy is cached with an ETag
+        or Last-Modified, the request is conditional and a 304 keeps the
+        cached copy (same object, so dependent indexes are not rebuilt).
+        """
+        previous = self.cache.peek(url)
+        headers = {}
+        if previous is not None:
+            if previous.etag:
+                headers['If-None-Match'] = previous.etag
+            if previous.last_modified:
+                headers['If-Modified-Since'] = previous.last_modified
+
+        response = self.client.get(url, headers=headers)
+        if response.status_code == 304 and previous is not None:
+            self.cache.record_revalidation()
+            return previous
+        if response.status_code == 404:
+            return UpstreamDocs([], None, None)
+        response.raise_for_status()
+        return UpstreamDocs(
+            response.json().get('docs', []),
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified')
+        )
+
+    def _fetch_docs(self, endpoint, path):
+        """
+        Fetch the `docs` list for `path` through the response cache.
+        Concurrent misses for the same URL share a single upstream request.
+        """
+        url = f'{self.base_url}{path}'
+
+        def load():
+            return self.flight.do(url, lambda: self._request_docs(url))
+
+        ttl = self.cache_ttls.get(endpoint, self.default_ttl)
+        return self.cache.get_or_load(url, load, ttl).docs
+
+    def _catalog_index(self, resource, text_field, sort_fields=()):
+        """
+        Text and sort indexes over a catalog resource, rebuilt only when the
+        catalog changes: a new mirror sync or a refreshed upstream response.
+        Resolved once per service instance so a request sees one snapshot.
+        """
+        if resource not in self._catalogs:
+            self._catalogs[resource] = self._load_catalog_index(resource, text_field, sort_fields)
+        return self._catalogs[resource]
+
+    def _load_catalog_index(self, resource, text_field, sort_fields):
+        checkpoint = self._mirror_checkpoint(resource)
+        if checkpoint is not None:
+            mirror = self._mirror(resource)
+            return self.indexes.get(
+                resource,
+                ('mirror', checkpoint['last_success_at']),
+                lambda: list(mirror.find({}, {'_hash': 0})),
+                text_field,
+                sort_fields
+            )
+
+        docs = self._fetch_docs(resource, f'/{resource}')
+        # The cache hands back the same list object until it is refreshed
+        return self.indexes.get(resource, ('upstream', id(docs)), lambda: docs, text_field, sort_fields)
 
     def get_movies(self, name=None):
         try:
-            response = requests.get(
-                f'{self.base_url}/movie',
-                headers=self.headers
-            )
-            response.raise_for_status()
-            
-            movies = response.json().get('docs', [])
-            
-            if name:
-                movies = [
-                    movie for movie in movies
-                    if name.lower() in movie.get('name', '').lower()
-                ]
-            
-            return movies
+            return self._catalog_index('movie', 'name', MOVIE_SORT_FIELDS).search(name)
+        except requests.RequestException as e:
+            logging.error(f"Error fetching movies: {str(e)}")
+            raise
+
+    def movie_catalog_version(self):
+        """Content hash of the movie catalog currently being served"""
+        try:
+            return self._catalog_index('movie', 'name', MOVIE_SORT_FIELDS).etag
+        except requests.RequestException as e:
+            logging.error(f"Error fetching movies: {str(e)}")
+            raise
+
+    def movie_catalog_last_modified(self):
+        """When the movie mirror was last synced, or None while movies come from upstream"""
+        checkpoint = self._mirror_checkpoint('movie')
+        return checkpoint['last_success_at'] if checkpoint is not None else None
+
+    def query_movies(self, name=None, ranges=None, sort_keys=None, page=1, per_page=10):
+        """
+        Filter, sort and paginate the movie catalog using the precomputed
+        indexes. `ranges` is a list of (field, low, high) and `sort_keys` a
+        list of (field, direction). Returns `(movies, total_count)`.
+        """
+        try:
+            index = self._catalog_index('movie', 'name', MOVIE_SORT_FIELDS)
+            positions = index.query(name, ranges, sort_keys)
+            skip = (page - 1) * per_page
+            movies = [index.docs[position] for position in positions[skip:skip + per_page]]
+            return movies, len(positions)
         except requests.RequestException as e:
             logging.error(f"Error fetching movies: {str(e)}")
             raise
 
     def get_movie_by_id(self, movie_id):
         try:
-            response = requests.get(
-                f'{self.base_url}/movie/{movie_id}',
-                headers=self.headers
-            )
-            response.raise_for_status()
-            
-            movies = response.json().get('docs', [])
+            mirror = self._mirror('movie')
+            if mirror is not None:
+                movie = mirror.find_one({'_id': movie_id}, {'_hash': 0})
+                if movie:
+                    return movie
+
+            movies = self._fetch_docs('movie_detail', f'/movie/{movie_id}')
             return movies[0] if movies else None
         except requests.RequestException as e:
             logging.error(f"Error fetching movie {movie_id}: {str(e)}")
             raise
 
-# app/services/history_service.py
-from app.models.search_history import SearchHistory
+    def get_movies_by_ids(self, movie_ids):
+        """
+        Resolve several movies at once.
+
+        Mirror hits are read in a single query; the rest are fetched from
+        upstream concurrently, at most `batch_concurrency` at a time.
+        Returns `(movies, errors)`, both keyed by movie id.
+        """
+        movies = {}
+        errors = {}
+
+        mirror = self._mirror('movie')
+        if mirror is not None:
+            for movie in mirror.find({'_id': {'$in': list(movie_ids)}}, {'_hash': 0}):
+                movies[movie['_id']] = movie
+
+        missing = [movie_id for movie_id in movie_ids if movie_id not in movies]
+        if not missing:
+            return movies, errors
+
+        def fetch(movie_id):
+            docs = self._fetch_docs('movie_detail', f'/movie/{movie_id}')
+            return docs[0] if docs else None
+
+        with ThreadPoolExecutor(max_workers=min(self.batch_concurrency, len(missing))) as executor:
+            futures = {executor.submit(fetch, movie_id): movie_id for movie_id in missing}
+            for future in as_completed(futures):
+                movie_id = futures[future]
+                try:
+                    movie = future.result()
+                except Exception as e:
+                    logging.error(f"Error fetching movie {movie_id}: {str(e)}")
+                    errors[movie_id] = str(e)
+                    continue
+                if movie:
+                    movies[movie_id] = movie
+                else:
+                    errors[movie_id] = 'Movie not found'
+
+        return movies, errors
+
+    def _iter_upstream(self, path):
+        """
+        Yield documents from a paginated upstream endpoint.
+
+        Pages are fetched lazily; once the page count is known, up to
+        `prefetch` following pages are requested in the background while
+        the current one is being consumed.
+        """
+        url = f'{self.base_url}{path}'
+
+        def fetch(page):
+            page_url = f'{url}?limit={self.page_size}&page={page}'
+            return self.flight.do(page_url, lambda: self._request_page(page_url))
+
+        first = fetch(1)
+        pages = first.get('pages', 1)
+        if pages <= 1:
+            yield from first.get('docs', [])
+            return
+
+        workers = max(1, self.prefetch)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        pending = deque()
+        next_page = 2
+        docs = first.get('docs', [])
+        try:
+            while True:
+                while next_page <= pages and len(pending) < workers:
+                    pending.append(executor.submit(fetch, next_page))
+                    next_page += 1
+                yield from docs
+                if not pending:
+                    break
+                docs = pending.popleft().result().get('docs', [])
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def iter_documents(self, resource, path=None, mirror_query=None):
+        """
+        Stream every document of a catalog resource.
+        Reads a cursor over the local mirror when it has been synced,
+        otherwise pages through `path` upstream.
+        """
+        if self._mirror_checkpoint(resource) is not None:
+            cursor = self._mirror(resource).find(mirror_query or {}, {'_hash': 0})
+            yield from cursor.batch_size(self.page_size)
+            return
+
+        try:
+            yield from self._iter_upstream(path or f'/{resource}')
+        except requests.RequestException as e:
+            logging.error(f"Error streaming {path or resource}: {str(e)}")
+            raise
+
+    def iter_books(self):
+        return self.iter_documents('book')
+
+    def iter_book_chapters(self, book_id):
+        return self.iter_documents('chapter', f'/book/{book_id}/chapter', {'book': book_id})
+
+    def iter_chapters(self):
+        return self.iter_documents('chapter')
+
+    def iter_characters(self):
+        return self.iter_documents('character')
 
-class HistoryService:
-    def __init__(self, db):
-        self.db = db
+    def iter_quotes(self):
+        return self.iter_documents('quote')
 
-    def add_search(self, user_name, search_term, results_count):
-        search = SearchHistory(user_name, search_term, results_count)
-        self.db.search_history.insert_one(search.to_dict())
-        return search
+    def iter_character_quotes(self, character_id):
+        return self.iter_documents('quote', f'/character/{character_id}/quote', {'character': character_id})
 
-    def get_history(self):
-        history = self.db.search_history.find().sort('timestamp', -1)
-        return [SearchHistory.from_dict(h).to_dict() for h in history]
\ No newline at end of file
+    def iter_movie_quotes(self, movie_id):
+        return self.iter_documents('quote', f'/movie/{movie_id}/quote', {'movie': movie_id})
@@ -0,0 +1,136 @@
+# app/services/rate_limiter.py
+import heapq
+import itertools
+import math
+import threading
+import time
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+class UpstreamRateLimited(Exception):
+    """Raised when an upstream call cannot be scheduled before its deadline"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+class RateLimitScheduler:
+    """
+    Process-wide token bucket in front of every upstream call.
+
+    Callers queue by priority (interactive before background) and wait for
+    a token until their deadline. The bucket is reconciled with the
+    upstream X-RateLimit-* and Retry-After headers, since the real quota
+    is shared with every other worker using the same token.
+    """
+
+    def __init__(self, capacity=100, period=600):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.granted = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _time_until_token(self, now):
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE, timeout=None):
+        """Block until a token is granted; return the time spent waiting"""
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+
+        with self._cond:
+            entry = [priority, next(self._seq)]
+            heapq.heappush(self._queue, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = self._time_until_token(now)
+
+                    if self._queue[0] is entry and wait <= 0:
+                        heapq.heappop(self._queue)
+                        self.tokens -= 1
+                        waited = now - start
+                        self.granted += 1
+                        self.total_wait += waited
+                        self.max_wait = max(self.max_wait, waited)
+                        self._cond.notify_all()
+                        return waited
+
+                    if deadline is not None and now >= deadline:
+                        self.rejected += 1
+                        raise UpstreamRateLimited(
+                            'Upstream rate limit reached, retry later',
+                            retry_after=wait
+                        )
+
+                    # Only the head of the queue sleeps on the refill; the
+                    # others wait to be notified when it is granted
+                    timeout_left = wait if self._queue[0] is entry else None
+                    if deadline is not None:
+                        remaining = deadline - now
+                        timeout_left = remaining if timeout_left is None else min(timeout_left, remaining)
+                    self._cond.wait(timeout_left)
+            except BaseException:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                raise
+
+    def observe(self, response):
+        """Reconcile the bucket with the rate-limit headers of an upstream response"""
+        headers = response.headers
+        now = time.monotonic()
+
+        with self._cond:
+            self._refill(now)
+
+            remaining = headers.get('X-RateLimit-Remaining')
+            if remaining is not None and remaining.isdigit():
+                self.tokens = min(self.tokens, float(remaining))
+                reset = headers.get('X-RateLimit-Reset')
+                if int(remaining) == 0 and reset and reset.isdigit():
+                    self.blocked_until = max(self.blocked_until, now + max(0, int(reset) - time.time()))
+
+            if response.status_code == 429:
+                self.throttled += 1
+                self.tokens = 0.0
+                retry_after = headers.get('Retry-After')
+                delay = int(retry_after) if retry_after and retry_after.isdigit() else 1 / self.rate
+                self.blocked_until = max(self.blocked_until, now + delay)
+
+            self._cond.notify_all()
+            return max(0.0, self.blocked_until - now)
+
+    def stats(self):
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                'capacity': self.capacity,
+                'tokens': round(self.tokens, 2),
+                'queue_depth': len(self._queue),
+                'granted': self.granted,
+                'rejected': self.rejected,
+                'throttled': self.throttled,
+                'avg_wait_seconds': round(self.total_wait / self.granted, 4) if self.granted else 0.0,
+                'max_wait_seconds': round(self.max_wait, 4)
+            }
@@ -0,0 +1,96 @@
+# app/services/recent_history.py
+import threading
+import time
+from collections import OrderedDict, deque
+
+class RecentHistory:
+    """
+    In-process ring buffers of each user's last `size` searches, newest first.
+
+    A user's buffer is loaded from Mongo on first read and then kept up to
+    date by add_search, so "my recent searches" is served from memory.
+    Writes made by other workers are picked up when a buffer is reloaded,
+    `ttl` seconds after it was loaded. At most `max_users` buffers are
+    kept, least recently used first out.
+    """
+
+    def __init__(self, size=20, max_users=10000, ttl=60):
+        self.size = size
+        self.max_users = max_users
+        self.ttl = ttl
+        self._buffers = OrderedDict()
+        # Users with a load in flight -> whether a search was added meanwhile
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def entry(doc):
+        """The public fields of a search_history document, as stored by Mongo (millisecond timestamps)"""
+        timestamp = doc.get('timestamp')
+        if timestamp is not None:
+            timestamp = timestamp.replace(microsecond=timestamp.microsecond // 1000 * 1000)
+        return {
+            'user_name': doc.get('user_name'),
+            'search_term': doc.get('search_term'),
+            'results_count': doc.get('results_count'),
+            'timestamp': timestamp
+        }
+
+    def add(self, doc):
+        """Record a new search; users without a loaded buffer are left to the next load"""
+        user_name = doc['user_name']
+        with self._lock:
+            if user_name in self._loading:
+                self._loading[user_name] = True
+            buffer = self._buffers.get(user_name)
+            if buffer is not None:
+                buffer[0].appendleft(self.entry(doc))
+
+    def get(self, user_name, limit):
+        """The user's last `limit` searches, or None if they must be read from Mongo"""
+        if limit > self.size:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            buffer = self._buffers.get(user_name)
+            if buffer is None or now - buffer[1] >= self.ttl:
+                self.misses += 1
+                return None
+            self._buffers.move_to_end(user_name)
+            self.hits += 1
+            return list(buffer[0])[:limit]
+
+    def load(self, user_name, loader):
+        """
+        Fill the user's buffer from `loader(size)` (newest first) and return it.
+        If a search is added while loading, the result is returned but not kept.
+        """
+        with self._lock:
+            self._loading.setdefault(user_name, False)
+        docs = [self.entry(doc) for doc in loader(self.size)]
+        with self._lock:
+            changed = self._loading.pop(user_name, True)
+            if not changed:
+                self._buffers[user_name] = (deque(docs, maxlen=self.size), time.monotonic())
+                self._buffers.move_to_end(user_name)
+                while len(self._buffers) > self.max_users:
+                    self._buffers.popitem(last=False)
+        return docs
+
+    def clear(self):
+        with self._lock:
+            self._buffers.clear()
+            for user_name in self._loading:
+                self._loading[user_name] = True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': len(self._buffers),
+                'max_users': self.max_users,
+                'size': self.size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
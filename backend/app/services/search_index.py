@@ -0,0 +1,221 @@
+# app/services/search_index.py
+import threading
+from bisect import bisect_left, bisect_right
+from app.services.catalog_sync import document_hash
+
+class NgramIndex:
+    """
+    Inverted n-gram index for case-insensitive substring search.
+
+    Built once over a list of documents, it answers `query in doc[field]`
+    by intersecting the posting sets of the query's n-grams and verifying
+    only the surviving candidates, instead of scanning every document.
+    Queries shorter than `n` fall back to a scan over the pre-lowered keys.
+    """
+
+    def __init__(self, docs, field, n=3):
+        self.docs = docs
+        self.field = field
+        self.n = n
+        self.keys = [str(doc.get(field) or '').lower() for doc in docs]
+        self.postings = {}
+
+        for position, key in enumerate(self.keys):
+            for gram in self._grams(key):
+                self.postings.setdefault(gram, set()).add(position)
+
+    def _grams(self, text):
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def search_positions(self, query):
+        """Return the sorted positions of documents whose field contains `query`"""
+        query = (query or '').lower()
+        if not query:
+            return list(range(len(self.docs)))
+
+        if len(query) < self.n:
+            return [position for position, key in enumerate(self.keys) if query in key]
+
+        postings = []
+        for gram in self._grams(query):
+            posting = self.postings.get(gram)
+            if not posting:
+                return []
+            postings.append(posting)
+
+        postings.sort(key=len)
+        candidates = postings[0].intersection(*postings[1:])
+
+        return [
+            position
+            for position in sorted(candidates)
+            if query in self.keys[position]
+        ]
+
+    def search(self, query):
+        """Return documents whose field contains `query`, in original order"""
+        return [self.docs[position] for position in self.search_positions(query)]
+
+    def __len__(self):
+        return len(self.docs)
+
+def _sort_key(value):
+    """Numbers before strings, so documents of mixed types still sort"""
+    return (1 if isinstance(value, str) else 0, value)
+
+class SortIndex:
+    """
+    Precomputed orderings over a fixed list of documents.
+
+    For every field it keeps the document positions sorted by value (in
+    both directions, ties in catalog order), the matching sorted value
+    array for range lookups by binary search, and a dense rank per
+    position so multi-key sorts compare small integers. Documents missing
+    a field sort last and never match a range. Numbers sort before
+    strings, and a range only matches values of its bounds' type.
+    """
+
+    def __init__(self, docs, fields):
+        self.docs = docs
+        self.fields = fields
+        self.ascending = {}
+        self.descending = {}
+        self.values = {}
+        self.ranks = {}
+
+        for field in fields:
+            present = [
+                (_sort_key(doc[field]), position)
+                for position, doc in enumerate(docs)
+                if isinstance(doc.get(field), (int, float, str)) and not isinstance(doc.get(field), bool)
+            ]
+            present.sort()
+            missing = sorted(set(range(len(docs))) - {position for _, position in present})
+
+            ranks = [len(present)] * len(docs)
+            rank = -1
+            previous = object()
+            for value, position in present:
+                if value != previous:
+                    rank += 1
+                    previous = value
+                ranks[position] = rank
+
+            self.values[field] = [value for value, _ in present]
+            self.ascending[field] = [position for _, position in present] + missing
+            self.descending[field] = sorted(
+                (position for _, position in present),
+                key=lambda position: (-ranks[position], position)
+            ) + missing
+            self.ranks[field] = ranks
+
+    def range_positions(self, field, low=None, high=None):
+        """Positions whose `field` lies in [low, high], via binary search"""
+        values = self.values[field]
+        if low is None and high is None:
+            return self.ascending[field][:len(values)]
+        # An open end stops at the other bound's type
+        type_rank = _sort_key(low if low is not None else high)[0]
+        start = bisect_left(values, (type_rank,) if low is None else _sort_key(low))
+        end = bisect_left(values, (type_rank + 1,)) if high is None else bisect_right(values, _sort_key(high))
+        return self.ascending[field][start:end]
+
+    def order(self, positions, keys):
+        """
+        Order `positions` (None for every document) by `keys`, a list of
+        (field, direction) pairs with direction 1 or -1.
+        """
+        if not keys:
+            return list(range(len(self.docs))) if positions is None else sorted(positions)
+
+        if len(keys) == 1:
+            field, direction = keys[0]
+            ordered = self.ascending[field] if direction == 1 else self.descending[field]
+            if positions is None:
+                return ordered
+            wanted = set(positions)
+            return [position for position in ordered if position in wanted]
+
+        missing_rank = {field: len(self.values[field]) for field, _ in keys}
+
+        def sort_key(position):
+            key = []
+            for field, direction in keys:
+                rank = self.ranks[field][position]
+                key.append(rank == missing_rank[field])
+                key.append(rank * direction)
+            key.append(position)
+            return key
+
+        candidates = range(len(self.docs)) if positions is None else positions
+        return sorted(candidates, key=sort_key)
+
+class CatalogIndex:
+    """
+    Text and sort indexes over one loaded catalog collection, plus a
+    content hash of the documents usable as an HTTP validator.
+    """
+
+    def __init__(self, docs, text_field, sort_fields=(), n=3, version=None):
+        self.docs = docs
+        self.version = version
+        self.etag = document_hash(docs)
+        self.text = NgramIndex(docs, text_field, n=n)
+        self.sort = SortIndex(docs, sort_fields)
+
+    def query(self, text=None, ranges=None, sort_keys=None):
+        """
+        Return the ordered document positions matching a substring `text`
+        and every (field, low, high) in `ranges`.
+        """
+        positions = self.text.search_positions(text) if text else None
+        for field, low, high in ranges or []:
+            matches = self.sort.range_positions(field, low, high)
+            if positions is None:
+                positions = matches
+            else:
+                wanted = set(matches)
+                positions = [position for position in positions if position in wanted]
+        return self.sort.order(positions, sort_keys or [])
+
+    def search(self, query):
+        return self.text.search(query)
+
+    def __len__(self):
+        return len(self.docs)
+
+class SearchIndexRegistry:
+    """
+    App-scoped set of CatalogIndex objects, one per catalog collection.
+
+    An index is rebuilt only when the caller presents a new catalog
+    version (e.g. after a mirror sync or an upstream cache refresh).
+    """
+
+    def __init__(self, n=3):
+        self.n = n
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self, name, version, load_docs, text_field, sort_fields=()):
+        with self._lock:
+            index = self._indexes.get(name)
+        if index is not None and index.version == version:
+            return index
+
+        index = CatalogIndex(load_docs(), text_field, sort_fields, n=self.n, version=version)
+        with self._lock:
+            self._indexes[name] = index
+            self.builds += 1
+        return index
+
+    def stats(self):
+        with self._lock:
+            return {
+                'builds': self.builds,
+                'indexes': {
+                    name: {'documents': len(index), 'grams': len(index.text.postings)}
+                    for name, index in self._indexes.items()
+                }
+            }
@@ -0,0 +1,204 @@
+# app/services/sketches.py
+import hashlib
+import heapq
+import math
+from array import array
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big')
+
+class CountMinSketch:
+    """
+    Count-Min sketch of item frequencies.
+
+    Estimates never undercount. With width w = ceil(e / epsilon) and depth
+    d = ceil(ln(1 / delta)), an estimate exceeds the true count by more
+    than epsilon * total with probability at most delta. Sketches with the
+    same shape merge by adding their tables.
+    """
+
+    def __init__(self, width=2048, depth=5):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.table = array('Q', bytes(8 * width * depth))
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def delta(self):
+        return math.exp(-self.depth)
+
+    def _cells(self, item):
+        # Kirsch-Mitzenmacher: d hash functions from two halves of one hash
+        h = _hash64(item)
+        h1, h2 = h & 0xFFFFFFFF, h >> 32
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, item, count=1):
+        for cell in self._cells(item):
+            self.table[cell] += count
+        self.total += count
+
+    def estimate(self, item):
+        return min(self.table[cell] for cell in self._cells(item))
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError('Cannot merge Count-Min sketches of different shapes')
+        table = self.table
+        for index, value in enumerate(other.table):
+            if value:
+                table[index] += value
+        self.total += other.total
+        return self
+
+    def copy(self):
+        sketch = CountMinSketch.__new__(CountMinSketch)
+        sketch.width, sketch.depth, sketch.total = self.width, self.depth, self.total
+        sketch.table = array('Q', self.table)
+        return sketch
+
+    def to_dict(self):
+        return {'width': self.width, 'depth': self.depth, 'total': self.total, 'table': self.table.tobytes()}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['width'], data['depth'])
+        sketch.total = data['total']
+        sketch.table = array('Q', bytes(data['table']))
+        return sketch
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter summary with `capacity` counters.
+
+    Every item seen more than total / capacity times is tracked. A tracked
+    count overestimates the true count by at most its recorded error,
+    which is itself at most total / capacity. Merging adds the counters
+    and keeps the `capacity` largest, which preserves the bound for the
+    combined stream.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.total = 0
+        self.counters = {}
+
+    def add(self, item, count=1):
+        self.total += count
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += count
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [count, 0]
+        else:
+            # Replace the smallest counter; its count becomes the new item's error
+            victim = min(self.counters, key=lambda key: self.counters[key][0])
+            floor = self.counters.pop(victim)[0]
+            self.counters[item] = [floor + count, floor]
+
+    def max_error(self):
+        return self.total / self.capacity
+
+    def top(self, k):
+        """[(item, count, error)] for the k largest counters"""
+        return [
+            (item, counter[0], counter[1])
+            for item, counter in heapq.nlargest(k, self.counters.items(), key=lambda entry: entry[1][0])
+        ]
+
+    def merge(self, other):
+        # Items missing from a full summary may have been seen up to its minimum count
+        own_floor = min((c[0] for c in self.counters.values()), default=0) if len(self.counters) >= self.capacity else 0
+        other_floor = min((c[0] for c in other.counters.values()), default=0) if len(other.counters) >= other.capacity else 0
+
+        merged = {}
+        for item in set(self.counters) | set(other.counters):
+            mine = self.counters.get(item, [own_floor, own_floor])
+            theirs = other.counters.get(item, [other_floor, other_floor])
+            merged[item] = [mine[0] + theirs[0], mine[1] + theirs[1]]
+
+        self.counters = dict(heapq.nlargest(self.capacity, merged.items(), key=lambda entry: entry[1][0]))
+        self.total += other.total
+        return self
+
+    def copy(self):
+        summary = SpaceSaving(self.capacity)
+        summary.total = self.total
+        summary.counters = {item: counter[:] for item, counter in self.counters.items()}
+        return summary
+
+    def to_dict(self):
+        return {
+            'capacity': self.capacity,
+            'total': self.total,
+            'counters': [[item, count, error] for item, (count, error) in self.counters.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data['capacity'])
+        summary.total = data['total']
+        summary.counters = {item: [count, error] for item, count, error in data['counters']}
+        return summary
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter with 2^precision registers.
+
+    The relative standard error is about 1.04 / sqrt(2^precision), i.e.
+    1.6% at the default precision of 12 (4 KiB). Sketches with the same
+    precision merge by taking the register-wise maximum.
+    """
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, item):
+        h = _hash64(item)
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError('Cannot merge HyperLogLogs of different precision')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def copy(self):
+        sketch = HyperLogLog(self.precision)
+        sketch.registers = bytearray(self.registers)
+        return sketch
+
+    def to_dict(self):
+        return {'precision': self.precision, 'registers': bytes(self.registers)}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['precision'])
+        sketch.registers = bytearray(data['registers'])
+        return sketch
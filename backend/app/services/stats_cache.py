@@ -0,0 +1,139 @@
+# app/services/stats_cache.py
+import logging
+import threading
+import time
+from datetime import datetime
+from app.utils.concurrency import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+class _StatsEntry:
+    __slots__ = ('value', 'generation', 'computed_at', 'modified')
+
+    def __init__(self, value, generation, computed_at):
+        self.value = value
+        self.generation = generation
+        self.computed_at = computed_at
+        # Wall-clock time of the computation, for Last-Modified
+        self.modified = datetime.utcnow()
+
+
+class StatsCache:
+    """
+    Cache of /api/history/stats results keyed by `days`.
+
+    Writers bump a generation counter. An entry computed at an older
+    generation, or older than `ttl`, is soft-expired: it is still served
+    while one background recompute runs, at most once per
+    `min_refresh_interval`. Only a cold miss makes the caller wait, and
+    concurrent misses for the same `days` share one recompute.
+    """
+
+    def __init__(self, loader, ttl=60, min_refresh_interval=2.0):
+        self.loader = loader
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.generation = 0
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._stop = threading.Event()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.refreshes = 0
+
+    def get(self, days):
+        return self.get_entry(days).value
+
+    def get_entry(self, days):
+        """The cached entry for `days`: its `value` and when it was computed (`modified`)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(days)
+            if entry is None:
+                self.misses += 1
+            elif entry.generation == self.generation and now - entry.computed_at < self.ttl:
+                self.hits += 1
+                return entry
+            else:
+                self.stale += 1
+                refresh = (
+                    days not in self._refreshing
+                    and now - entry.computed_at >= self.min_refresh_interval
+                )
+                if refresh:
+                    self._refreshing.add(days)
+
+        if entry is None:
+            return self._flight.do(days, lambda: self._recompute(days))
+
+        if refresh:
+            threading.Thread(target=self._refresh, args=(days,), daemon=True).start()
+        return entry
+
+    def bump(self):
+        """Mark every entry as outdated; it is recomputed on its next read"""
+        with self._lock:
+            self.generation += 1
+
+    def invalidate(self):
+        """Drop every entry, e.g. after history was deleted"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def refresh_all(self):
+        """Recompute every cached window (used by the scheduled refresh)"""
+        with self._lock:
+            keys = list(self._entries)
+        for days in keys:
+            self._refresh(days)
+
+    def start(self, interval):
+        """Refresh every cached window every `interval` seconds in a daemon thread"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(interval,), name='history-stats', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'generation': self.generation,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'refreshes': self.refreshes,
+                'coalescing': self._flight.stats()
+            }
+
+    def _recompute(self, days):
+        # Read the generation first so writes during the load mark it stale
+        with self._lock:
+            generation = self.generation
+        entry = _StatsEntry(self.loader(days), generation, time.monotonic())
+        with self._lock:
+            self._entries[days] = entry
+            self.refreshes += 1
+        return entry
+
+    def _refresh(self, days):
+        try:
+            self._flight.do(days, lambda: self._recompute(days))
+        except Exception as e:
+            # Keep serving the previous result; the next stale read retries
+            logger.warning(f"Refreshing history stats for {days} days failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(days)
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            self.refresh_all()
@@ -0,0 +1,80 @@
+# app/services/upstream_client.py
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.services.rate_limiter import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RateLimitScheduler, UpstreamRateLimited
+)
+
+class UpstreamClient:
+    """
+    App-scoped HTTP client for the LOTR API.
+
+    Wraps a single requests.Session so every request and gunicorn thread
+    reuses the same keep-alive connection pool instead of opening a new
+    TCP/TLS connection per call. When a limiter is given, every request
+    first waits for a token from it.
+    """
+
+    def __init__(self, base_url, token=None, pool_size=20, connect_timeout=3.05,
+                 read_timeout=10, max_retries=3, backoff_factor=0.5, limiter=None,
+                 interactive_max_wait=5, background_max_wait=600):
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.limiter = limiter
+        self.interactive_max_wait = interactive_max_wait
+        self.background_max_wait = background_max_wait
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=retry
+        )
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if token:
+            self.session.headers['Authorization'] = f'Bearer {token}'
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            base_url=config['LOTR_API_BASE_URL'],
+            token=config['LOTR_API_TOKEN'],
+            pool_size=config['LOTR_HTTP_POOL_SIZE'],
+            connect_timeout=config['LOTR_HTTP_CONNECT_TIMEOUT'],
+            read_timeout=config['LOTR_HTTP_READ_TIMEOUT'],
+            max_retries=config['LOTR_HTTP_MAX_RETRIES'],
+            backoff_factor=config['LOTR_HTTP_RETRY_BACKOFF'],
+            limiter=RateLimitScheduler(
+                capacity=config['LOTR_RATE_LIMIT_REQUESTS'],
+                period=config['LOTR_RATE_LIMIT_PERIOD']
+            ),
+            interactive_max_wait=config['LOTR_RATE_LIMIT_MAX_WAIT'],
+            background_max_wait=config['LOTR_RATE_LIMIT_BACKGROUND_MAX_WAIT']
+        )
+
+    def get(self, url, priority=PRIORITY_INTERACTIVE, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        if self.limiter is None:
+            return self.session.get(url, **kwargs)
+
+        max_wait = self.background_max_wait if priority >= PRIORITY_BACKGROUND else self.interactive_max_wait
+        self.limiter.acquire(priority, timeout=max_wait)
+        response = self.session.get(url, **kwargs)
+
+        retry_after = self.limiter.observe(response)
+        if response.status_code == 429:
+            raise UpstreamRateLimited('Upstream rate limit reached, retry later', retry_after)
+        return response
+
+    def close(self):
+        self.session.close()
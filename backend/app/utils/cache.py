@@ -0,0 +1,123 @@
+# app/utils/cache.py
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class _CacheEntry:
+    __slots__ = ('value', 'expires_at', 'stale_until')
+
+    def __init__(self, value, expires_at, stale_until):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class ResponseCache:
+    """
+    Bounded in-process LRU cache for upstream responses.
+
+    Entries are fresh until their TTL expires. After that they are served
+    stale for up to `stale_ttl` seconds while a background thread refreshes
+    them; past that window a lookup is treated as a miss.
+    """
+
+    def __init__(self, max_entries=256, stale_ttl=86400):
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.revalidated = 0
+
+    def get_or_load(self, key, loader, ttl):
+        """Return the cached value for `key`, calling `loader()` on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.stale_until:
+                self._entries.move_to_end(key)
+                if now < entry.expires_at:
+                    self.hits += 1
+                    return entry.value
+                self.stale += 1
+                refresh = key not in self._refreshing
+                if refresh:
+                    self._refreshing.add(key)
+            else:
+                self.misses += 1
+                entry = None
+
+        if entry is None:
+            value = loader()
+            self.set(key, value, ttl)
+            return value
+
+        if refresh:
+            threading.Thread(
+                target=self._refresh,
+                args=(key, loader, ttl),
+                daemon=True
+            ).start()
+        return entry.value
+
+    def get(self, key):
+        """Return the fresh value for `key`, or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl):
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = _CacheEntry(value, now + ttl, now + ttl + self.stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def peek(self, key):
+        """Return the stored value for `key` even if expired, without counting a lookup"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    def record_revalidation(self):
+        with self._lock:
+            self.revalidated += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'revalidated': self.revalidated
+            }
+
+    def _refresh(self, key, loader, ttl):
+        try:
+            self.set(key, loader(), ttl)
+        except Exception as e:
+            # Keep serving the stale copy; the next stale hit retries
+            logger.warning(f"Background refresh failed for {key}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
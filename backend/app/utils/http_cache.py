@@ -0,0 +1,33 @@
+# app/utils/http_cache.py
+import hashlib
+from flask import request, jsonify, make_response
+
+def compute_etag(*parts):
+    """Strong ETag value from the given str/bytes parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:32]
+
+def not_modified(etag):
+    """
+    Return a 304 response when the request's If-None-Match already holds
+    `etag`, so the caller can skip building and serializing the payload.
+    """
+    if request.if_none_match and request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        return response
+    return None
+
+def conditional_json(payload, etag=None, last_modified=None):
+    """
+    jsonify `payload` with a strong ETag (a hash of the body unless given)
+    and answer If-None-Match / If-Modified-Since with 304 when they match.
+    """
+    response = jsonify(payload)
+    response.set_etag(etag or compute_etag(response.get_data()))
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response.make_conditional(request)
@@ -0,0 +1,93 @@
+# app/utils/json_encoding.py
+import json
+from datetime import date, datetime, timedelta
+from bson.objectid import ObjectId
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library encoder is the fallback
+    orjson = None
+
+try:
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:  # Flask < 2.2 configures JSON through app.json_encoder
+    DefaultJSONProvider = None
+    from flask.json import JSONEncoder as FlaskJSONEncoder
+
+def encode_default(value):
+    """
+    Encode the types Mongo documents carry: datetimes as ISO 8601 (naive
+    ones are UTC, as Mongo stores them, and UTC is written as Z) and
+    ObjectIds as hex strings. Raises TypeError for anything else.
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is None or value.utcoffset() == timedelta(0):
+            return value.replace(tzinfo=None).isoformat() + 'Z'
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+_ORJSON_OPTIONS = (orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+def dumps(obj, sort_keys=False, indent=None, default=encode_default, fast=True):
+    """
+    Serialize `obj` to a JSON string, with orjson when it is installed and
+    `fast` is set. Both paths write datetimes and ObjectIds the same way.
+    """
+    if fast and orjson is not None and indent in (None, 2):
+        options = _ORJSON_OPTIONS
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=options).decode('utf-8')
+    separators = (',', ':') if indent is None else None
+    return json.dumps(obj, default=default, sort_keys=sort_keys, indent=indent, separators=separators)
+
+if DefaultJSONProvider is not None:
+    class FastJSONProvider(DefaultJSONProvider):
+        """JSON provider encoding responses with dumps(); other types fall back to Flask's encoder"""
+
+        fast = True
+
+        @staticmethod
+        def default(value):
+            try:
+                return encode_default(value)
+            except TypeError:
+                return DefaultJSONProvider.default(value)
+
+        def dumps(self, obj, **kwargs):
+            sort_keys = kwargs.pop('sort_keys', self.sort_keys)
+            indent = kwargs.pop('indent', None)
+            kwargs.pop('separators', None)
+            if kwargs:
+                return super().dumps(obj, sort_keys=sort_keys, indent=indent, **kwargs)
+            return dumps(obj, sort_keys=sort_keys, indent=indent, default=self.default, fast=self.fast)
+else:
+    class FastJSONEncoder(FlaskJSONEncoder):
+        """JSON encoder for Flask < 2.2 that writes with dumps() when it can"""
+
+        fast = True
+
+        def default(self, value):
+            try:
+                return encode_default(value)
+            except TypeError:
+                return super().default(value)
+
+        def encode(self, obj):
+            if self.skipkeys or not self.check_circular or self.indent not in (None, 2):
+                return super().encode(obj)
+            return dumps(obj, sort_keys=self.sort_keys, indent=self.indent, default=self.default, fast=self.fast)
+
+def init_json(app):
+    """Install the fast encoder for jsonify and flask.json (JSON_FAST_ENCODER=False keeps it on the standard library)"""
+    if DefaultJSONProvider is not None:
+        app.json = FastJSONProvider(app)
+        app.json.fast = app.config['JSON_FAST_ENCODER']
+    else:
+        app.json_encoder = type('FastJSONEncoder', (FastJSONEncoder,), {'fast': app.config['JSON_FAST_ENCODER']})
@@ -0,0 +1,116 @@
+# app/utils/streaming.py
+import logging
+import zlib
+from flask import current_app, json, request, stream_with_context
+
+try:
+    import brotli
+except ImportError:  # in requirements.txt; gzip remains the fallback
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+def choose_encoding():
+    """Pick the best content coding the client accepts (br, then gzip)"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+class _Encoder:
+    """Incremental compressor that flushes after every chunk so bytes reach the client early"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=5)
+        elif encoding == 'gzip':
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        else:
+            self._compressor = None
+
+    def encode(self, text):
+        data = text.encode('utf-8')
+        if self._compressor is None:
+            return data
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self._compressor is None:
+            return b''
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+def _json_array_chunks(key, items):
+    yield '{' + json.dumps(key) + ':['
+    for position, item in enumerate(items):
+        yield (',' if position else '') + json.dumps(item)
+    yield ']}'
+
+def stream_json_array(key, items):
+    """
+    Respond with `{key: [...]}`, serializing `items` (a Mongo cursor or any
+    iterator) one at a time instead of building the body in memory.
+    See stream_text for buffering and compression.
+    """
+    return stream_text(_json_array_chunks(key, items), 'application/json', key)
+
+def stream_text(chunks, mimetype, label='response'):
+    """
+    Respond with the concatenation of the text `chunks` (any iterator).
+
+    Output is buffered until STREAM_COMPRESSION_MIN_SIZE bytes: bodies that
+    end below it are sent plain in one piece, larger ones are streamed in
+    STREAM_CHUNK_SIZE chunks, compressed with gzip or brotli when the client
+    accepts it. Errors raised while filling that first buffer propagate to
+    the caller, so they can still become a proper error response.
+    """
+    min_size = current_app.config['STREAM_COMPRESSION_MIN_SIZE']
+    chunk_size = current_app.config['STREAM_CHUNK_SIZE']
+    chunks = iter(chunks)
+
+    head = []
+    head_size = 0
+    for chunk in chunks:
+        head.append(chunk)
+        head_size += len(chunk)
+        if head_size >= min_size:
+            break
+    else:
+        response = current_app.response_class(''.join(head), mimetype=mimetype)
+        response.vary.add('Accept-Encoding')
+        return response
+
+    encoder = _Encoder(choose_encoding())
+
+    def generate():
+        batch = head
+        batch_size = head_size
+        try:
+            for chunk in chunks:
+                batch.append(chunk)
+                batch_size += len(chunk)
+                if batch_size >= chunk_size:
+                    yield encoder.encode(''.join(batch))
+                    batch = []
+                    batch_size = 0
+        except Exception as e:
+            logger.error(f"Error while streaming {label}: {str(e)}")
+            raise
+        if batch:
+            yield encoder.encode(''.join(batch))
+        yield encoder.finish()
+
+    response = current_app.response_class(
+        stream_with_context(generate()),
+        mimetype=mimetype
+    )
+    response.vary.add('Accept-Encoding')
+    if encoder.encoding:
+        response.headers['Content-Encoding'] = encoder.encoding
+    return response
@@ -0,0 +1,9 @@
+# app/utils/timestamps.py
+from datetime import datetime, timezone
+
+def parse_iso_timestamp(value):
+    """ISO 8601 timestamp (as the API writes them) as the naive UTC datetime Mongo stores"""
+    timestamp = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
@@ -0,0 +1,8 @@
+# gunicorn.conf.py
+
+def post_worker_init(worker):
+    """Start the background jobs in each serving worker, never in `flask` CLI commands"""
+    from app import start_background_jobs
+    from run import app
+
+    start_background_jobs(app)
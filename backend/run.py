@@ -1,9 +1,10 @@
 # run.py
-from app import create_app, setup_logger
+from app import create_app, setup_logger, start_background_jobs
 
 logger = setup_logger()
 app = create_app()
 
 if __name__ == '__main__':
     logger.info('Starting The Red Book Project backend server...')
+    start_background_jobs(app)
     app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
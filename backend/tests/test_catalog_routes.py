@@ -0,0 +1,118 @@
+# tests/test_catalog_routes.py
+
+import json
+import threading
+import pytest
+from urllib.parse import urlparse, parse_qs
+
+@pytest.fixture
+def upstream_quotes():
+    return [
+        {'_id': f'quote{i}', 'dialog': f'Line {i}',
+         'movie': 'movie1' if i % 2 else 'movie2', 'character': 'gandalf'}
+        for i in range(25)
+    ]
+
+@pytest.fixture
+def mock_paged_api(app, monkeypatch, upstream_quotes):
+    """Serve upstream quotes in pages, recording every requested page"""
+    app.config['LOTR_STREAM_PAGE_SIZE'] = 10
+    requested = []
+    lock = threading.Lock()
+
+    class MockResponse:
+        def __init__(self, json_data, status_code=200):
+            self.json_data = json_data
+            self.status_code = status_code
+            self.headers = {}
+
+        def json(self):
+            return self.json_data
+
+        def raise_for_status(self):
+            if self.status_code != 200:
+                raise Exception("API Error")
+
+    def mock_get(session, url, **kwargs):
+        parsed = urlparse(url)
+        params = parse_qs(parsed.query)
+        limit, page = int(params['limit'][0]), int(params['page'][0])
+        with lock:
+            requested.append((parsed.path, page))
+
+        docs = upstream_quotes
+        if parsed.path.startswith('/v2/movie/'):
+            movie_id = parsed.path.split('/')[3]
+            docs = [quote for quote in docs if quote['movie'] == movie_id]
+        elif not parsed.path.endswith('/quote'):
+            return MockResponse({'error': 'Not found'}, 500)
+
+        pages = max(1, (len(docs) + limit - 1) // limit)
+        return MockResponse({
+            'docs': docs[(page - 1) * limit:page * limit],
+            'total': len(docs), 'limit': limit, 'page': page, 'pages': pages
+        })
+
+    monkeypatch.setattr('requests.Session.get', mock_get)
+    return requested
+
+class TestCatalogRoutes:
+    """Test suite for streamed catalog routes"""
+
+    def test_stream_all_quotes(self, client, mock_paged_api, upstream_quotes):
+        """Test that every upstream page is streamed in order"""
+        response = client.get('/api/quotes')
+
+        assert response.status_code == 200
+        assert response.is_streamed
+        data = json.loads(response.data)
+        assert [quote['_id'] for quote in data['quotes']] == [q['_id'] for q in upstream_quotes]
+        assert sorted(page for _, page in mock_paged_api) == [1, 2, 3]
+
+    def test_stream_movie_quotes(self, client, mock_paged_api):
+        """Test the nested movie quotes route"""
+        response = client.get('/api/movies/movie1/quotes')
+
+        data = json.loads(response.data)
+        assert len(data['quotes']) == 12
+        assert all(quote['movie'] == 'movie1' for quote in data['quotes'])
+
+    def test_stream_empty_collection(self, client, mock_paged_api):
+        """Test that an empty collection returns an empty list"""
+        response = client.get('/api/movies/unknown/quotes')
+
+        assert response.status_code == 200
+        assert json.loads(response.data) == {'quotes': []}
+
+    def test_upstream_error(self, client, mock_paged_api):
+        """Test that a failing first page produces an error status"""
+        response = client.get('/api/books')
+
+        assert response.status_code == 500
+        assert 'error' in json.loads(response.data)
+
+    def test_stream_from_mirror(self, app, client, monkeypatch, upstream_quotes):
+        """Test that a synced mirror is streamed without calling upstream"""
+        app.db.catalog_quotes.insert_many([dict(q) for q in upstream_quotes])
+        app.db.sync_checkpoints.insert_one({'_id': 'quote', 'total': 25, 'last_success_at': 1})
+
+        def fail_get(*args, **kwargs):
+            raise AssertionError('upstream should not be called')
+
+        monkeypatch.setattr('requests.Session.get', fail_get)
+
+        response = client.get('/api/characters/gandalf/quotes')
+        assert len(json.loads(response.data)['quotes']) == 25
+
+    def test_pages_fetched_lazily(self, app, mock_paged_api):
+        """Test that closing the stream early stops paging upstream"""
+        from app.services.lotr_service import LotrService
+
+        app.config['LOTR_STREAM_PREFETCH'] = 1
+        with app.test_request_context():
+            quotes = LotrService().iter_quotes()
+            first = next(quotes)
+            quotes.close()
+
+        assert first['_id'] == 'quote0'
+        assert max(page for _, page in mock_paged_api) <= 2
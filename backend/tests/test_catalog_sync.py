@@ -0,0 +1,161 @@
+# tests/test_catalog_sync.py
+
+import json
+import pytest
+from app import create_app, start_background_jobs
+from app.config import TestConfig
+from app.services.catalog_sync import CatalogSyncScheduler, CatalogSyncService
+
+class FakeResponse:
+    def __init__(self, json_data, status_code=200):
+        self.json_data = json_data
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self.json_data
+
+    def raise_for_status(self):
+        if self.status_code != 200:
+            raise Exception("API Error")
+
+class FakeClient:
+    """Serves upstream documents in pages of `limit`"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+
+    def get(self, url, params=None, **kwargs):
+        self.calls.append((url, params))
+        limit, page = params['limit'], params['page']
+        docs = self.docs[(page - 1) * limit:page * limit]
+        pages = max(1, (len(self.docs) + limit - 1) // limit)
+        return FakeResponse({'docs': docs, 'page': page, 'pages': pages, 'total': len(self.docs)})
+
+@pytest.fixture
+def upstream_movies():
+    return [
+        {'_id': f'movie{i}', 'name': f'Movie {i}', 'runtimeInMinutes': 100 + i}
+        for i in range(5)
+    ]
+
+@pytest.fixture
+def sync_service(app, upstream_movies):
+    return CatalogSyncService(app.db, FakeClient(upstream_movies), 'https://api.test/v2', page_size=2)
+
+class TestCatalogSync:
+    """Test suite for the local catalog mirror"""
+
+    def test_initial_sync_pages_through_upstream(self, app, sync_service):
+        """Test that every page is fetched and stored"""
+        result = sync_service.sync_collection('movie')
+
+        assert len(sync_service.client.calls) == 3
+        assert result['total'] == 5
+        assert result['written'] == 5
+        assert app.db.catalog_movies.count_documents({}) == 5
+
+        checkpoint = app.db.sync_checkpoints.find_one({'_id': 'movie'})
+        assert checkpoint['status'] == 'ok'
+        assert checkpoint['total'] == 5
+
+    def test_resync_writes_only_changes(self, app, sync_service, upstream_movies):
+        """Test that unchanged documents are skipped and removed ones deleted"""
+        sync_service.sync_collection('movie')
+
+        upstream_movies[0]['runtimeInMinutes'] = 999
+        upstream_movies.pop()
+        result = sync_service.sync_collection('movie')
+
+        assert result['written'] == 1
+        assert result['unchanged'] == 3
+        assert result['deleted'] == 1
+        assert app.db.catalog_movies.find_one({'_id': 'movie0'})['runtimeInMinutes'] == 999
+        assert app.db.catalog_movies.count_documents({}) == 4
+
+    def test_failed_sync_records_checkpoint(self, app):
+        """Test that an upstream failure is recorded and keeps existing data"""
+        class FailingClient:
+            def get(self, url, **kwargs):
+                return FakeResponse({}, 500)
+
+        service = CatalogSyncService(app.db, FailingClient(), 'https://api.test/v2')
+        results = service.sync_all(['movie'])
+
+        assert results[0]['status'] == 'error'
+        assert app.db.sync_checkpoints.find_one({'_id': 'movie'})['status'] == 'error'
+
+    def test_movies_served_from_mirror(self, app, client, sync_service, monkeypatch):
+        """Test that movie lookups read the mirror without calling upstream"""
+        sync_service.sync_collection('movie')
+
+        def fail_get(*args, **kwargs):
+            raise AssertionError('upstream should not be called')
+
+        monkeypatch.setattr('requests.Session.get', fail_get)
+
+        response = client.get('/api/movies?name=movie 3')
+        assert response.status_code == 200
+        movies = json.loads(response.data)['movies']
+        assert [movie['_id'] for movie in movies] == ['movie3']
+        assert '_hash' not in movies[0]
+
+        response = client.get('/api/movies/movie1')
+        assert json.loads(response.data)['movie']['name'] == 'Movie 1'
+
+    @pytest.mark.parametrize('path', ['/api/movies?name=movie', '/api/movies/movie1'])
+    def test_mirror_revalidated_by_last_sync(self, app, client, sync_service, path):
+        """Test that If-Modified-Since the last successful sync gets a 304"""
+        sync_service.sync_collection('movie')
+
+        response = client.get(path)
+        last_modified = response.headers['Last-Modified']
+        assert response.last_modified.replace(tzinfo=None) == \
+            app.db.sync_checkpoints.find_one({'_id': 'movie'})['last_success_at'].replace(microsecond=0)
+
+        response = client.get(path, headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 304
+
+    def test_sync_catalog_command(self, app, runner, monkeypatch, upstream_movies):
+        """Test the sync-catalog CLI command"""
+        fake = FakeClient(upstream_movies)
+        monkeypatch.setattr(app, 'upstream', fake)
+
+        result = runner.invoke(args=['sync-catalog', '--resource', 'movie'])
+
+        assert result.exit_code == 0
+        assert 'movie: 5 docs, 5 written' in result.output
+        assert app.db.catalog_movies.count_documents({}) == 5
+
+class TestBackgroundJobs:
+    """Test suite for starting the schedulers only in the serving process"""
+
+    class ServingConfig(TestConfig):
+        TESTING = False
+
+    def test_create_app_starts_no_jobs(self, mocker):
+        """Test that building the app (as every `flask` command does) starts no scheduler"""
+        start = mocker.patch.object(CatalogSyncScheduler, 'start')
+        app = create_app(self.ServingConfig)
+
+        assert app.catalog_sync is None
+        assert app.history_stats._thread is None
+        assert app.live_stats._thread is None
+        start.assert_not_called()
+
+    def test_start_background_jobs(self, mocker):
+        """Test that the serving process starts each scheduler once"""
+        start = mocker.patch.object(CatalogSyncScheduler, 'start')
+        app = create_app(self.ServingConfig)
+
+        start_background_jobs(app)
+        start_background_jobs(app)
+        try:
+            assert app.history_stats._thread.name == 'history-stats'
+            assert app.live_stats._thread.name == 'live-stats'
+            assert isinstance(app.catalog_sync, CatalogSyncScheduler)
+            start.assert_called_once()
+        finally:
+            app.history_stats.stop()
+            app.live_stats.stop()
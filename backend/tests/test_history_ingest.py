@@ -0,0 +1,162 @@
+# tests/test_history_ingest.py
+
+import gzip
+import json
+from datetime import datetime
+import pytest
+from bson.objectid import ObjectId
+from app.services.history_ingest import HistoryIngestor, validate_records
+from app.services.history_rollups import HistoryRollups
+from app.services.history_service import HistoryService
+
+def ndjson(records):
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+def make_records(count):
+    return [
+        {'user_name': f'user_{i % 50}', 'search_term': f'term {i % 200}', 'results_count': i % 7,
+         'timestamp': f'2024-01-{i % 28 + 1:02d}T12:00:00Z'}
+        for i in range(count)
+    ]
+
+class TestValidateRecords:
+    """Test suite for chunk validation"""
+
+    def test_valid_records(self):
+        """Test that valid records become search_history documents"""
+        record_id = ObjectId()
+        docs, positions, rejects = validate_records([
+            {'user_name': 'Frodo', 'search_term': 'Ring', 'results_count': 2,
+             'timestamp': '2024-01-01T10:00:00+02:00', 'id': str(record_id)},
+            {'user_name': 'Sam', 'search_term': '', 'timestamp': {'$date': 1704067200000}}
+        ])
+
+        assert rejects == []
+        assert positions == [0, 1]
+        assert docs[0]['_id'] == record_id
+        assert docs[0]['timestamp'] == datetime(2024, 1, 1, 8)
+        assert docs[0]['user_name_lower'] == 'frodo'
+        assert docs[1]['timestamp'] == datetime(2024, 1, 1)
+        assert docs[1]['results_count'] == 0
+
+    @pytest.mark.parametrize('record', [
+        [], {'search_term': 'Ring'}, {'user_name': 'Frodo', 'search_term': 3},
+        {'user_name': 'Frodo', 'search_term': 'Ring', 'results_count': -1},
+        {'user_name': 'Frodo', 'search_term': 'Ring', 'results_count': True},
+        {'user_name': 'Frodo', 'search_term': 'Ring', 'timestamp': 'yesterday'},
+        {'user_name': 'Frodo', 'search_term': 'Ring', 'timestamp': 1e20},
+        {'user_name': 'Frodo', 'search_term': 'Ring', 'timestamp': {'$date': {'$numberLong': '-99999999999999999'}}},
+        {'user_name': 'Frodo', 'search_term': 'Ring', 'id': 'abc'}
+    ])
+    def test_invalid_records(self, record):
+        """Test that invalid records are rejected with their position"""
+        docs, positions, rejects = validate_records([{'user_name': 'Sam', 'search_term': 'Ring'}, record])
+
+        assert len(docs) == 1
+        assert positions == [0]
+        assert [position for position, _ in rejects] == [1]
+
+class TestHistoryIngestor:
+    """Test suite for bulk history ingestion"""
+
+    def test_ingest_in_parallel_chunks(self, app):
+        """Test that every record is written across chunks and writers"""
+        with app.app_context():
+            ingestor = HistoryIngestor(HistoryService(app.db), chunk_size=100, workers=3)
+            report = ingestor.ingest(ndjson(make_records(1050)).splitlines())
+
+        assert report['received'] == 1050
+        assert report['inserted'] == 1050
+        assert report['rejected'] == 0
+        assert report['chunks'] == 11
+        assert report['rows_per_second'] > 0
+        assert app.db.search_history.count_documents({'user_name_lower': 'user_7'}) == 21
+
+    def test_rejects_report_line_numbers(self, app):
+        """Test that decode, validation and duplicate-key rejects report their line"""
+        existing = app.db.search_history.insert_one({'user_name': 'Frodo', 'search_term': 'Ring'}).inserted_id
+        lines = [
+            json.dumps({'user_name': 'Sam', 'search_term': 'Ring'}),
+            '{not json',
+            '',
+            json.dumps({'user_name': 'Sam', 'search_term': 'Ring', 'results_count': 'many'}),
+            json.dumps({'user_name': 'Frodo', 'search_term': 'Ring', 'id': str(existing)})
+        ]
+
+        report = HistoryIngestor(HistoryService(app.db), chunk_size=2, max_rejects=2).ingest(lines)
+
+        assert report['received'] == 4
+        assert report['inserted'] == 1
+        assert report['rejected'] == 3
+        assert [reject['line'] for reject in report['rejects']] == [2, 4]
+
+    def test_updates_rollups_and_caches(self, app):
+        """Test that statistics include ingested history"""
+        app.config['HISTORY_STATS_ROLLUPS'] = True
+        with app.app_context():
+            assert HistoryService.from_app(app).get_statistics(3650)['total_searches'] == 0
+            HistoryIngestor.from_app(app).ingest(ndjson(make_records(30)).splitlines())
+
+        assert HistoryRollups(app.db).statistics(3650)['total_searches'] == 30
+        assert app.history_stats.get(3650)['total_searches'] == 30
+
+class TestIngestRoutes:
+    """Test suite for /api/history/ingest and the ingest-history command"""
+
+    def test_ingest_route(self, app, client):
+        """Test loading an NDJSON body, including an export round trip"""
+        response = client.post('/api/history/ingest', data=ndjson(make_records(20)),
+                               content_type='application/x-ndjson')
+        assert response.status_code == 200
+        assert json.loads(response.data)['inserted'] == 20
+
+        exported = client.get('/api/history/export').get_data()
+        app.db.search_history.delete_many({})
+        response = client.post('/api/history/ingest', data=gzip.compress(exported),
+                               headers={'Content-Encoding': 'gzip'})
+        assert json.loads(response.data)['inserted'] == 20
+        assert client.get('/api/history/export').get_data() == exported
+
+    def test_ingest_route_errors(self, client):
+        """Test empty and corrupt bodies"""
+        assert client.post('/api/history/ingest', data='').status_code == 400
+        response = client.post('/api/history/ingest', data=b'not gzip',
+                               headers={'Content-Encoding': 'gzip'})
+        assert response.status_code == 400
+        response = client.post('/api/history/ingest', data=gzip.compress(ndjson(make_records(5)).encode())[:-10],
+                               headers={'Content-Encoding': 'gzip'})
+        assert response.status_code == 400
+
+    def test_ingest_route_rejects_out_of_range_timestamps(self, client):
+        """Test that an unrepresentable timestamp rejects its line, not the whole gzip body"""
+        body = ndjson(make_records(3)) + '{"user_name": "Frodo", "search_term": "Ring", "timestamp": 1e20}\n'
+        response = client.post('/api/history/ingest', data=gzip.compress(body.encode()),
+                               headers={'Content-Encoding': 'gzip'})
+
+        assert response.status_code == 200
+        report = json.loads(response.data)
+        assert report['inserted'] == 3
+        assert report['rejects'] == [{'line': 4, 'error': 'timestamp is out of range'}]
+
+    def test_ingest_command(self, app, runner, tmp_path):
+        """Test the CLI loader and its exit status"""
+        source = tmp_path / 'history.ndjson'
+        source.write_text(ndjson(make_records(10)) + '{"user_name": ""}\n')
+
+        result = runner.invoke(args=['ingest-history', str(source), '--chunk-size', '4', '--workers', '2'])
+
+        assert result.exit_code == 1
+        assert '10 inserted, 1 rejected' in result.output
+        assert 'line 11: user_name is required' in result.output
+        assert app.db.search_history.count_documents({}) == 10
+
+@pytest.mark.benchmark(group='history-ingest')
+def test_ingest_performance(app, benchmark):
+    """Benchmark bulk ingestion throughput"""
+    lines = ndjson(make_records(5000)).splitlines()
+
+    def ingest():
+        app.db.search_history.delete_many({})
+        return HistoryIngestor(HistoryService(app.db), chunk_size=1000, workers=4).ingest(lines)
+
+    assert benchmark(ingest)['inserted'] == 5000
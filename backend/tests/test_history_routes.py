@@ -1,9 +1,17 @@
 # tests/test_history_routes.py
 
+import csv
+import gzip
+import io
+import time
 import pytest
 from datetime import datetime, timedelta
 import json
 from bson import json_util
+from app import create_app
+from app.config import TestConfig
+from app.services.history_service import HistoryService
+from app.services.history_rollups import HistoryRollups
 
 @pytest.fixture
 def sample_history_data():
@@ -37,6 +45,7 @@ def setup_test_data(app, sample_history_data):
         app.db.search_history.delete_many({})
         # Insert sample data
         app.db.search_history.insert_many(sample_history_data)
+        HistoryService(app.db).backfill_normalized_fields()
     yield
     with app.app_context():
         app.db.search_history.delete_many({})
@@ -140,6 +149,29 @@ class TestHistoryRoutes:
         assert response.status_code == 200
         assert all(item['user_name'] == 'john_doe' for item in data['history'])
 
+    def test_get_user_history_not_found(self, client, setup_test_data):
+        """Test getting history for a user without searches"""
+        response = client.get('/api/history/nobody')
+        assert response.status_code == 404
+
+    def test_get_user_history_streamed(self, app, client):
+        """Test that large user histories are streamed and compressed"""
+        import gzip
+        with app.app_context():
+            app.db.search_history.insert_many([
+                {'user_name': 'heavy_user', 'search_term': f'term {i}',
+                 'results_count': i, 'timestamp': datetime.utcnow() - timedelta(minutes=i)}
+                for i in range(500)
+            ])
+
+        response = client.get('/api/history/heavy_user', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        data = json.loads(gzip.decompress(response.data))
+        assert len(data['history']) == 500
+        assert data['history'][0]['search_term'] == 'term 0'
+
     def test_get_history_stats(self, client, setup_test_data):
         """Test getting history statistics"""
         response = client.get('/api/history/stats')
@@ -151,6 +183,53 @@ class TestHistoryRoutes:
         assert 'active_users' in data
         assert 'total_searches' in data
 
+    def test_get_history_stats_long_window(self, app, client, setup_test_data):
+        """Test that backfilled rollups allow windows beyond 30 days"""
+        with app.app_context():
+            HistoryRollups(app.db).rebuild()
+
+        response = client.get('/api/history/stats?days=90')
+        data = json.loads(response.data)
+
+        assert response.status_code == 200
+        assert data['period_days'] == 90
+
+    def test_get_history_stats_long_window_before_backfill(self, client, setup_test_data):
+        """Test that windows beyond 30 days fall back to the default until rollups are backfilled"""
+        response = client.get('/api/history/stats?days=90')
+        data = json.loads(response.data)
+
+        assert response.status_code == 200
+        assert data['period_days'] == 7
+
+    def test_backfill_rollups_command(self, app, runner, setup_test_data):
+        """Test that the backfill command rebuilds the stats from raw history"""
+        result = runner.invoke(args=['backfill-rollups'])
+
+        assert result.exit_code == 0
+        assert 'rebuilt' in result.output
+        with app.app_context():
+            data = json.loads(app.test_client().get('/api/history/stats').data)
+        assert data['total_searches'] == 3
+
+    def test_get_history_stats_conditional(self, client, setup_test_data):
+        """Test that unchanged statistics are revalidated with a 304"""
+        response = client.get('/api/history/stats')
+        etag = response.headers['ETag']
+
+        response = client.get('/api/history/stats', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+
+    def test_get_history_stats_if_modified_since(self, app, client, setup_test_data):
+        """Test that statistics computed before If-Modified-Since are answered with a 304"""
+        response = client.get('/api/history/stats')
+        last_modified = response.headers['Last-Modified']
+        assert response.last_modified.replace(tzinfo=None) == \
+            app.history_stats.get_entry(7).modified.replace(microsecond=0)
+
+        response = client.get('/api/history/stats', headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 304
+
     def test_clear_history(self, client, setup_test_data):
         """Test clearing history"""
         # Test without confirmation
@@ -187,6 +266,503 @@ class TestHistoryRoutes:
         assert len(data['history']) == 1
         assert data['history'][0]['user_name'] == 'jane_doe'
 
+    def test_get_history_user_prefix_case_insensitive(self, client, setup_test_data):
+        """Test that the user filter is a case-insensitive prefix match"""
+        response = client.get('/api/history?user=JOHN')
+        data = json.loads(response.data)
+
+        assert len(data['history']) == 2
+        assert all(item['user_name'] == 'john_doe' for item in data['history'])
+
+        response = client.get('/api/history?user=doe')
+        data = json.loads(response.data)
+        assert len(data['history']) == 0
+
+    def test_get_history_filters_escape_regex(self, client, setup_test_data):
+        """Test that filter values are matched literally"""
+        response = client.get('/api/history?search=.*')
+        assert response.status_code == 200
+        assert json.loads(response.data)['history'] == []
+
+    def test_history_hides_normalized_fields(self, client, setup_test_data):
+        """Test that the lowercase index fields are not returned"""
+        data = json.loads(client.get('/api/history').data)
+        assert all('user_name_lower' not in item for item in data['history'])
+
+        data = json.loads(client.get('/api/history/john_doe').data)
+        assert all('search_term_lower' not in item for item in data['history'])
+
+class TestHistoryCursorPagination:
+    """Test suite for keyset (cursor) pagination of /api/history"""
+
+    @pytest.fixture
+    def many_searches(self, app):
+        """25 searches with repeated sort values, so ties must be broken by _id"""
+        now = datetime.utcnow()
+        app.db.search_history.insert_many([
+            {'user_name': f'user_{i % 3}', 'search_term': f'term {i % 4}',
+             'results_count': i % 5, 'timestamp': now - timedelta(minutes=i % 7)}
+            for i in range(25)
+        ])
+        HistoryService(app.db).backfill_normalized_fields()
+
+    def walk(self, client, params):
+        items, cursor, pages = [], '', 0
+        while cursor is not None:
+            response = client.get(f'/api/history?per_page=4&cursor={cursor}&{params}')
+            assert response.status_code == 200
+            data = json.loads(response.data)
+            items.extend(data['history'])
+            cursor = data['pagination']['next_cursor']
+            assert data['pagination']['has_next'] == (cursor is not None)
+            pages += 1
+        return items, pages
+
+    @pytest.mark.parametrize('sort_field', ['timestamp', 'user_name', 'search_term', 'results_count'])
+    @pytest.mark.parametrize('order', ['asc', 'desc'])
+    def test_walk_matches_page_mode(self, client, many_searches, sort_field, order):
+        """Test that walking the cursors returns exactly the page-mode ordering"""
+        params = f'sort={sort_field}&order={order}'
+        items, pages = self.walk(client, params)
+
+        expected = []
+        for page in range(1, 8):
+            data = json.loads(client.get(f'/api/history?per_page=4&page={page}&{params}').data)
+            expected.extend(data['history'])
+
+        assert pages == 7
+        assert len(items) == 25
+        assert items == expected
+
+    def test_cursor_with_filters(self, client, many_searches):
+        """Test that the seek predicate is combined with the filters"""
+        items, _ = self.walk(client, 'user=user_1&search=term')
+        assert len(items) == 8
+        assert all(item['user_name'] == 'user_1' for item in items)
+
+    def test_pages_do_not_shift(self, app, client, many_searches):
+        """Test that new searches do not shift the pages after a cursor"""
+        data = json.loads(client.get('/api/history?per_page=4&cursor=').data)
+        next_cursor = data['pagination']['next_cursor']
+        second_page = json.loads(client.get(f'/api/history?per_page=4&cursor={next_cursor}').data)
+
+        HistoryService(app.db).add_search('newcomer', 'Fellowship', 1)
+
+        data = json.loads(client.get(f'/api/history?per_page=4&cursor={next_cursor}').data)
+        assert data['history'] == second_page['history']
+
+    @pytest.mark.parametrize('cursor', ['not-a-cursor', 'eyJmIjogMX0='])
+    def test_invalid_cursor(self, client, many_searches, cursor):
+        """Test that malformed cursors are rejected"""
+        response = client.get(f'/api/history?cursor={cursor}')
+        assert response.status_code == 400
+
+    def test_cursor_from_other_sort(self, client, many_searches):
+        """Test that a cursor cannot be reused with a different sort"""
+        data = json.loads(client.get('/api/history?per_page=4&cursor=').data)
+        next_cursor = data['pagination']['next_cursor']
+
+        response = client.get(f'/api/history?per_page=4&sort=user_name&cursor={next_cursor}')
+        assert response.status_code == 400
+
+class TestHistoryCounts:
+    """Test suite for /api/history totals"""
+
+    def test_items_query_leads_with_filter_and_seek(self, app, client, setup_test_data, mocker):
+        """Test that the page is read by one indexable pipeline, without $facet, and the total counted once"""
+        count_documents = mocker.spy(type(app.db.search_history), 'count_documents')
+        aggregate = mocker.spy(type(app.db.search_history), 'aggregate')
+
+        data = json.loads(client.get('/api/history?user=john&per_page=1&cursor=').data)
+        next_cursor = data['pagination']['next_cursor']
+        data = json.loads(client.get(f'/api/history?user=john&per_page=1&cursor={next_cursor}').data)
+
+        assert data['pagination']['total_items'] == 2
+        assert len(data['history']) == 1
+
+        assert count_documents.call_count == 1
+        pipeline = aggregate.call_args[0][1]
+        assert [list(stage) for stage in pipeline] == [['$match'], ['$sort'], ['$limit'], ['$project']]
+        seek = pipeline[0]['$match']['$and'][1]
+        assert set(seek) == {'$or'}
+        assert pipeline[2]['$limit'] == 2
+
+    def test_totals_are_cached_per_filter(self, app, client, setup_test_data):
+        """Test that totals are reused for the same filter until invalidated"""
+        client.get('/api/history?user=john')
+        client.get('/api/history?user=john&page=2&per_page=1')
+        client.get('/api/history?user=jane')
+
+        stats = app.history_counts.stats()
+        assert stats['entries'] == 2
+        assert stats['hits'] == 1
+
+        client.post('/api/history/clear', json={'confirm': True, 'user_name': 'john_doe'})
+        data = json.loads(client.get('/api/history?user=john').data)
+        assert data['pagination']['total_items'] == 0
+
+    def test_count_estimate(self, app, client, setup_test_data, mocker):
+        """Test that an unfiltered estimate uses collection metadata"""
+        estimate = mocker.patch.object(
+            type(app.db.search_history), 'estimated_document_count', return_value=1000
+        )
+
+        data = json.loads(client.get('/api/history?count=estimate').data)
+
+        assert estimate.called
+        assert data['pagination']['total_items'] == 1000
+        assert data['pagination']['count'] == 'estimate'
+
+    def test_count_estimate_filtered_uses_last_total(self, app, client, setup_test_data):
+        """Test that a filtered estimate falls back to an exact count once, then reuses it"""
+        data = json.loads(client.get('/api/history?user=john&count=estimate').data)
+        assert data['pagination']['total_items'] == 2
+
+        app.db.search_history.delete_many({'user_name': 'john_doe'})
+        data = json.loads(client.get('/api/history?user=john&count=estimate').data)
+        assert data['pagination']['total_items'] == 2
+        assert data['history'] == []
+
+    def test_count_none(self, client, setup_test_data):
+        """Test that totals can be skipped while has_next stays accurate"""
+        data = json.loads(client.get('/api/history?count=none&per_page=2').data)
+        assert data['pagination']['total_items'] is None
+        assert data['pagination']['total_pages'] is None
+        assert data['pagination']['has_next'] is True
+
+        data = json.loads(client.get('/api/history?count=none&per_page=2&page=2').data)
+        assert data['pagination']['has_next'] is False
+        assert len(data['history']) == 1
+
+class TestHistoryIndexes:
+    """Test suite for search_history index management"""
+
+    def test_ensure_indexes(self, app):
+        """Test that every expected index is created and reported"""
+        history_service = HistoryService(app.db)
+        assert 'user_name_timestamp' in history_service.missing_indexes()
+
+        history_service.ensure_indexes()
+
+        info = app.db.search_history.index_information()
+        assert history_service.missing_indexes() == []
+        assert info['user_name_timestamp']['key'] == [('user_name', 1), ('timestamp', -1)]
+        assert info['timestamp_id']['key'] == [('timestamp', -1), ('_id', -1)]
+        assert 'results_count_id' in info
+
+    def test_new_searches_store_normalized_fields(self, app):
+        """Test that add_search writes lowercase copies of the text fields"""
+        HistoryService(app.db).add_search('Frodo', 'The Two Towers', 1)
+
+        doc = app.db.search_history.find_one()
+        assert doc['user_name_lower'] == 'frodo'
+        assert doc['search_term_lower'] == 'the two towers'
+
+    def test_backfill_normalized_fields(self, app, sample_history_data):
+        """Test that legacy records get their normalized fields once"""
+        app.db.search_history.insert_many(sample_history_data)
+        history_service = HistoryService(app.db)
+
+        assert history_service.backfill_normalized_fields(batch_size=2) == 3
+        assert history_service.backfill_normalized_fields() == 0
+        assert app.db.search_history.count_documents({'user_name_lower': 'john_doe'}) == 2
+
+    def test_startup_not_blocked_by_index_build(self):
+        """Test that an unreachable MongoDB does not hold up create_app"""
+        class UnreachableConfig(TestConfig):
+            MONGODB_URI = 'mongodb://127.0.0.1:1/redbook_test'
+            HISTORY_ENSURE_INDEXES = True
+            HISTORY_INDEX_TIMEOUT_MS = 200
+
+        start = time.monotonic()
+        app = create_app(UnreachableConfig)
+
+        assert time.monotonic() - start < 1
+        app.history_index_build.join(timeout=5)
+        assert not app.history_index_build.is_alive()
+
+    def test_ensure_indexes_command(self, app, runner, sample_history_data):
+        """Test the ensure-indexes CLI command"""
+        app.db.search_history.insert_many(sample_history_data)
+
+        result = runner.invoke(args=['ensure-indexes'])
+
+        assert result.exit_code == 0
+        assert 'index user_name_timestamp: ok' in result.output
+        assert 'normalized fields added to 3 records' in result.output
+
+class TestLegacyHistoryRecords:
+    """Test suite for records written before the normalized fields existed"""
+
+    @pytest.fixture
+    def legacy_row(self, app):
+        app.db.search_history.insert_one({
+            'user_name': 'Legolas_Greenleaf', 'search_term': 'The Ring of Power',
+            'results_count': 1, 'timestamp': datetime.utcnow()
+        })
+
+    @pytest.mark.parametrize('params', [
+        'user=leg', 'user=LEGOLAS_G', 'search=ring', 'search=greenleaf power',
+        'search=ing of&search_mode=regex', 'search=OLAS&search_mode=regex',
+        'user=leg&search=ring&date_from=2000-01-01'
+    ])
+    def test_filters_match_legacy_records(self, client, legacy_row, params):
+        """Test that filters find a record without lowercase fields or keywords"""
+        data = json.loads(client.get(f'/api/history?{params}').data)
+        assert [item['user_name'] for item in data['history']] == ['Legolas_Greenleaf']
+
+    @pytest.mark.parametrize('params', ['user=gol', 'search=olas', 'search=rings'])
+    def test_legacy_records_keep_match_semantics(self, client, legacy_row, params):
+        """Test that legacy records follow the same prefix rules as new ones"""
+        assert json.loads(client.get(f'/api/history?{params}').data)['history'] == []
+
+class TestHistoryTextSearch:
+    """Test suite for keyword search of /api/history"""
+
+    @pytest.fixture
+    def searches(self, app):
+        with app.app_context():
+            history_service = HistoryService(app.db)
+            for results_count, (user_name, search_term) in enumerate([
+                ('frodo_baggins', 'The Ring goes south'),
+                ('sam', 'Ring'),
+                ('sam', 'Ringwraiths'),
+                ('bilbo_baggins', 'There and Back Again'),
+                ('merry', 'The Hobbit')
+            ]):
+                history_service.add_search(user_name, search_term, results_count)
+
+    def terms(self, client, params):
+        data = json.loads(client.get(f'/api/history?{params}').data)
+        return [item['search_term'] for item in data['history']]
+
+    def test_keywords_stored(self, app):
+        """Test that add_search stores the lowercase words of both text fields"""
+        HistoryService(app.db).add_search('Frodo_Baggins', 'The Two-Towers', 1)
+
+        doc = app.db.search_history.find_one()
+        assert doc['search_keywords'] == ['frodo', 'baggins', 'the', 'two', 'towers']
+
+    def test_word_prefix_match(self, client, searches):
+        """Test that text search matches word prefixes in either field, every word required"""
+        assert set(self.terms(client, 'search=hob')) == {'The Hobbit'}
+        assert set(self.terms(client, 'search=BAGGINS')) == {'The Ring goes south', 'There and Back Again'}
+        assert set(self.terms(client, 'search=the ring')) == {'The Ring goes south'}
+        assert self.terms(client, 'search=obbit') == []
+
+    def test_regex_fallback(self, client, searches):
+        """Test that search_mode=regex keeps substring matching"""
+        assert self.terms(client, 'search=obbit&search_mode=regex') == ['The Hobbit']
+
+        data = json.loads(client.get('/api/history?search=obbit&search_mode=regex').data)
+        assert data['sort']['field'] == 'timestamp'
+        assert data['filters']['search_mode'] == 'regex'
+
+    def test_ranked_by_relevance(self, client, searches):
+        """Test that exact and whole-word matches rank above prefix matches, unlike newest first"""
+        data = json.loads(client.get('/api/history?search=ring').data)
+
+        assert data['sort']['field'] == 'relevance'
+        assert [item['search_term'] for item in data['history']] == ['Ring', 'The Ring goes south', 'Ringwraiths']
+        scores = [item['relevance'] for item in data['history']]
+        assert scores == sorted(set(scores), reverse=True)
+        assert all('search_keywords' not in item for item in data['history'])
+
+        assert self.terms(client, 'search=ring&sort=timestamp') == [
+            'Ringwraiths', 'Ring', 'The Ring goes south'
+        ]
+
+    def test_ranked_by_phrase(self, app, client):
+        """Test that records holding every word rank by exact match, then phrase, then word order"""
+        with app.app_context():
+            history_service = HistoryService(app.db)
+            for search_term in ['The ring', 'The Ring goes south', 'Ring of the king', 'Kings of the ring']:
+                history_service.add_search('sam', search_term, 1)
+
+        assert self.terms(client, 'search=the ring') == [
+            'The ring', 'The Ring goes south', 'Kings of the ring', 'Ring of the king'
+        ]
+        assert self.terms(client, 'search=the ring&sort=timestamp') == [
+            'Kings of the ring', 'Ring of the king', 'The Ring goes south', 'The ring'
+        ]
+
+    def test_relevance_cursor_pagination(self, client, searches):
+        """Test walking relevance-ranked results with cursors"""
+        expected = self.terms(client, 'search=ring&per_page=10')
+        items, cursor = [], ''
+        while cursor is not None:
+            data = json.loads(client.get(f'/api/history?search=ring&per_page=1&cursor={cursor}').data)
+            items.extend(item['search_term'] for item in data['history'])
+            cursor = data['pagination']['next_cursor']
+
+        assert items == expected
+
+    def test_relevance_needs_text_search(self, client, searches):
+        """Test that relevance falls back to timestamp without search words"""
+        data = json.loads(client.get('/api/history?sort=relevance').data)
+        assert data['sort']['field'] == 'timestamp'
+
+class TestHistoryRetention:
+    """Test suite for retention and background clears"""
+
+    def wait_for_job(self, client, status_url):
+        deadline = time.monotonic() + 5
+        while True:
+            job = json.loads(client.get(status_url).data)
+            if job['status'] in ('done', 'failed'):
+                return job
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+    def test_retention_ttl_index(self, app, mocker):
+        """Test that the TTL index follows HISTORY_RETENTION_DAYS"""
+        history_service = HistoryService(app.db)
+
+        history_service.ensure_indexes(retention_days=30)
+        info = app.db.search_history.index_information()
+        assert info['timestamp_ttl']['expireAfterSeconds'] == 30 * 86400
+
+        command = mocker.patch.object(type(app.db), 'command')
+        history_service.ensure_indexes(retention_days=7)
+        command.assert_called_once_with('collMod', 'search_history', index={
+            'name': 'timestamp_ttl', 'expireAfterSeconds': 7 * 86400
+        })
+
+        history_service.ensure_indexes(retention_days=0)
+        assert 'timestamp_ttl' not in app.db.search_history.index_information()
+
+    def test_async_clear_job(self, app, client, setup_test_data):
+        """Test that a clear can run as a batched background job"""
+        app.history_jobs.batch_size = 1
+        app.history_jobs.batch_pause = 0
+
+        response = client.post('/api/history/clear', json={'confirm': True, 'async': True})
+        assert response.status_code == 202
+        data = json.loads(response.data)
+
+        job = self.wait_for_job(client, data['status_url'])
+        assert job['job_id'] == data['job_id']
+        assert job['status'] == 'done'
+        assert job['total'] == 3
+        assert job['deleted_count'] == 3
+        assert job['batches'] == 3
+        assert app.db.search_history.count_documents({}) == 0
+
+    def test_large_clear_runs_async(self, app, client, setup_test_data):
+        """Test that clears above the sync limit become jobs and keep rollups exact"""
+        app.config['HISTORY_CLEAR_SYNC_LIMIT'] = 1
+        app.history_jobs.batch_pause = 0
+        HistoryRollups(app.db).rebuild()
+
+        response = client.post('/api/history/clear', json={'confirm': True, 'user_name': 'john_doe'})
+        assert response.status_code == 202
+
+        job = self.wait_for_job(client, json.loads(response.data)['status_url'])
+        assert job['deleted_count'] == 2
+        assert app.db.search_history.count_documents({}) == 1
+        assert app.db.search_stats_daily.count_documents({'kind': 'user', 'key': 'john_doe'}) == 0
+
+    def test_sync_limit_count_stops_early(self, app, client, setup_test_data, mocker):
+        """Test that the sync limit check counts through the service, no further than the limit"""
+        app.config['HISTORY_CLEAR_SYNC_LIMIT'] = 1
+        count_history = mocker.spy(HistoryService, 'count_history')
+
+        response = client.post('/api/history/clear', json={'confirm': True, 'async': False})
+
+        assert response.status_code == 202
+        assert count_history.call_args_list[0].kwargs['limit'] == 2
+        assert self.wait_for_job(client, json.loads(response.data)['status_url'])['deleted_count'] == 3
+
+    def test_small_clear_stays_synchronous(self, client, setup_test_data):
+        """Test that clears under the limit still answer with deleted_count"""
+        response = client.post('/api/history/clear', json={'confirm': True, 'user_name': 'jane_doe'})
+        assert response.status_code == 200
+        assert json.loads(response.data)['deleted_count'] == 1
+
+    def test_unknown_job(self, client):
+        """Test the status endpoint for a job that does not exist"""
+        assert client.get('/api/history/jobs/unknown').status_code == 404
+
+class TestHistoryExport:
+    """Test suite for /api/history/export"""
+
+    def read_ndjson(self, response):
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    def test_export_ndjson(self, client, setup_test_data):
+        """Test the default NDJSON export, oldest first"""
+        response = client.get('/api/history/export')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert 'attachment' in response.headers['Content-Disposition']
+        rows = self.read_ndjson(response)
+        assert [row['search_term'] for row in rows] == ['Return of the King', 'The Hobbit', 'Lord of the Rings']
+        assert set(rows[0]) == {'id', 'user_name', 'search_term', 'results_count', 'timestamp'}
+
+    def test_export_csv_with_filters(self, client, setup_test_data):
+        """Test the CSV export with the same filters as /api/history"""
+        response = client.get('/api/history/export?format=csv&user=JOHN')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        assert [row['search_term'] for row in rows] == ['Return of the King', 'Lord of the Rings']
+        assert rows[0]['results_count'] == '1'
+
+    def test_export_resume(self, app, client):
+        """Test resuming from the last exported row, including timestamp ties"""
+        timestamp = datetime(2024, 1, 1)
+        app.db.search_history.insert_many([
+            {'user_name': f'user_{i}', 'search_term': 'Ring', 'results_count': i,
+             'timestamp': timestamp + timedelta(seconds=i // 2)}
+            for i in range(6)
+        ])
+
+        rows = self.read_ndjson(client.get('/api/history/export'))
+        last = rows[2]
+        resumed = self.read_ndjson(client.get(
+            f"/api/history/export?after_timestamp={last['timestamp']}&after_id={last['id']}"
+        ))
+        assert resumed == rows[3:]
+
+        after_second = self.read_ndjson(client.get(f"/api/history/export?after_timestamp={last['timestamp']}"))
+        assert after_second == rows[4:]
+
+    def test_export_streams_large_history(self, app, client):
+        """Test that large exports are streamed and compressed"""
+        app.db.search_history.insert_many([
+            {'user_name': f'user_{i}', 'search_term': f'term {i}', 'results_count': i,
+             'timestamp': datetime(2024, 1, 1) + timedelta(seconds=i)}
+            for i in range(2000)
+        ])
+
+        response = client.get('/api/history/export', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.is_streamed
+        assert response.headers['Content-Encoding'] == 'gzip'
+        lines = gzip.decompress(response.get_data()).decode('utf-8').splitlines()
+        assert len(lines) == 2000
+        assert json.loads(lines[-1])['search_term'] == 'term 1999'
+
+    def test_export_search_mode_as_history(self, client, setup_test_data):
+        """Test that the export validates search_mode like /api/history"""
+        for mode in ('text', 'bogus'):
+            history = json.loads(client.get(f'/api/history?search=obbit&search_mode={mode}').data)['history']
+            exported = self.read_ndjson(client.get(f'/api/history/export?search=obbit&search_mode={mode}'))
+            assert history == exported == []
+
+        exported = self.read_ndjson(client.get('/api/history/export?search=obbit&search_mode=regex'))
+        assert [row['search_term'] for row in exported] == ['The Hobbit']
+
+    @pytest.mark.parametrize('query', [
+        'format=xml', 'date_from=2024/01/01', 'after_timestamp=yesterday',
+        'after_id=abc', 'after_timestamp=2024-01-01T00:00:00&after_id=abc'
+    ])
+    def test_export_invalid_params(self, client, query):
+        """Test parameter validation"""
+        assert client.get(f'/api/history/export?{query}').status_code == 400
+
 class TestHistoryRoutesError:
     """Test suite for error handling in history routes"""
 
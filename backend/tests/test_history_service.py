@@ -0,0 +1,253 @@
+# tests/test_history_service.py
+
+import os
+import random
+import uuid
+import pytest
+import mongomock
+from datetime import datetime, timedelta
+from pymongo import MongoClient
+from app.services.history_service import HistoryService
+from app.services.history_rollups import HistoryRollups
+
+# Set HISTORY_BENCHMARK_URI to a real MongoDB to benchmark at production
+# scale (e.g. HISTORY_BENCHMARK_DOCS=1000000); mongomock is only a smoke run.
+# The benchmark fills and then drops a uniquely named database on that server
+BENCHMARK_URI = os.getenv('HISTORY_BENCHMARK_URI')
+BENCHMARK_DOCS = int(os.getenv('HISTORY_BENCHMARK_DOCS', 2000))
+
+def legacy_statistics(collection, days=7):
+    """The previous implementation: three aggregations and a count over the same window"""
+    date_limit = datetime.utcnow() - timedelta(days=days)
+    window = {'timestamp': {'$gte': date_limit}}
+    daily_searches = list(collection.aggregate([
+        {'$match': window},
+        {'$group': {'_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$timestamp'}}, 'count': {'$sum': 1}}},
+        {'$sort': {'_id': 1}}
+    ]))
+    popular_terms = list(collection.aggregate([
+        {'$match': dict(window, search_term={'$ne': ''})},
+        {'$group': {'_id': '$search_term', 'count': {'$sum': 1}}},
+        {'$sort': {'count': -1}},
+        {'$limit': 10}
+    ]))
+    active_users = list(collection.aggregate([
+        {'$match': window},
+        {'$group': {'_id': '$user_name', 'search_count': {'$sum': 1}, 'last_search': {'$max': '$timestamp'}}},
+        {'$sort': {'search_count': -1}},
+        {'$limit': 10}
+    ]))
+    return {
+        'daily_searches': daily_searches,
+        'popular_terms': popular_terms,
+        'active_users': active_users,
+        'period_days': days,
+        'total_searches': collection.count_documents(window)
+    }
+
+def make_history(count, seed=7):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    return [
+        {
+            'user_name': f'user_{rng.randrange(200)}',
+            'search_term': '' if i % 10 == 0 else f'term {int(rng.paretovariate(1.2)) % 500}',
+            'results_count': rng.randrange(10),
+            'timestamp': now - timedelta(minutes=rng.randrange(60 * 24 * 30))
+        }
+        for i in range(count)
+    ]
+
+@pytest.fixture
+def history_db():
+    db = mongomock.MongoClient().db
+    db.search_history.insert_many(make_history(300))
+    return db
+
+@pytest.fixture(scope='module')
+def benchmark_db():
+    """A throwaway database of its own, so the benchmark never touches real history"""
+    client = MongoClient(BENCHMARK_URI) if BENCHMARK_URI else mongomock.MongoClient()
+    name = f'history_benchmark_{uuid.uuid4().hex[:12]}'
+    db = client[name]
+    db.search_history.insert_many(make_history(BENCHMARK_DOCS))
+    HistoryService(db).ensure_indexes()
+    yield db
+    client.drop_database(name)
+    client.close()
+
+class TestHistoryStatistics:
+    """Test suite for the single-pass statistics aggregation"""
+
+    @pytest.mark.parametrize('days', [1, 7, 30])
+    def test_matches_previous_pipelines(self, history_db, days):
+        """Test that the $facet pass returns the same sections as the separate queries"""
+        stats = HistoryService(history_db).get_statistics(days)
+        expected = legacy_statistics(history_db.search_history, days)
+
+        assert stats['total_searches'] == expected['total_searches']
+        assert stats['daily_searches'] == expected['daily_searches']
+        assert [t['count'] for t in stats['popular_terms']] == [t['count'] for t in expected['popular_terms']]
+        assert [u['search_count'] for u in stats['active_users']] == \
+            [u['search_count'] for u in expected['active_users']]
+        assert stats['period_days'] == days
+
+    def test_single_aggregation(self, history_db, mocker):
+        """Test that statistics cost one aggregation and no count"""
+        collection_type = type(history_db.search_history)
+        aggregate = mocker.spy(collection_type, 'aggregate')
+        count_documents = mocker.spy(collection_type, 'count_documents')
+
+        HistoryService(history_db).get_statistics(7)
+
+        assert aggregate.call_count == 1
+        assert count_documents.call_count == 0
+
+    def test_empty_window(self):
+        """Test statistics over an empty collection"""
+        stats = HistoryService(mongomock.MongoClient().db).get_statistics(7)
+
+        assert stats['total_searches'] == 0
+        assert stats['daily_searches'] == []
+        assert stats['popular_terms'] == []
+
+def rollup_rows(db):
+    return sorted(
+        (row['day'], row['kind'], row['key'], row['count'])
+        for row in db.search_stats_daily.find()
+    )
+
+class TestHistoryRollups:
+    """Test suite for the daily statistics rollups"""
+
+    def test_incremental_matches_rebuild(self, history_db):
+        """Test that $inc upserts and a backfill produce the same rows"""
+        rollups = HistoryRollups(history_db)
+        docs = list(history_db.search_history.find())
+        for start in range(0, len(docs), 37):
+            rollups.apply(docs[start:start + 37])
+        incremental = rollup_rows(history_db)
+
+        history_db.search_stats_daily.delete_many({})
+        days, _ = rollups.rebuild()
+
+        assert days >= 30
+        assert rollup_rows(history_db) == incremental
+
+    def test_statistics_match_raw_whole_days(self, history_db):
+        """Test that rollup statistics equal the raw counts over whole days"""
+        rollups = HistoryRollups(history_db)
+        rollups.rebuild()
+
+        stats = rollups.statistics(7)
+
+        first_day = datetime.strptime((datetime.utcnow() - timedelta(days=7)).strftime('%Y-%m-%d'), '%Y-%m-%d')
+        window = {'timestamp': {'$gte': first_day}}
+        assert stats['total_searches'] == history_db.search_history.count_documents(window)
+        assert sum(day['count'] for day in stats['daily_searches']) == stats['total_searches']
+        top_user = stats['active_users'][0]
+        assert top_user['search_count'] == history_db.search_history.count_documents(
+            dict(window, user_name=top_user['_id'])
+        )
+        assert len(stats['popular_terms']) == 10
+
+    def test_add_search_updates_rollups(self):
+        """Test that each search bumps its day, term and user rows"""
+        db = mongomock.MongoClient().db
+        history_service = HistoryService(db, rollups=HistoryRollups(db))
+
+        history_service.add_search('frodo', 'Ring', 1)
+        history_service.add_search('frodo', 'Ring', 1)
+        history_service.add_search('sam', '', 0)
+
+        stats = history_service.get_statistics(1)
+        assert stats['total_searches'] == 3
+        assert stats['popular_terms'] == [{'_id': 'Ring', 'count': 2}]
+        assert stats['active_users'][0]['_id'] == 'frodo'
+        assert stats['active_users'][0]['search_count'] == 2
+
+    def test_statistics_fall_back_until_backfilled(self, history_db):
+        """Test that rollups over existing history are not trusted before a backfill"""
+        rollups = HistoryRollups(history_db)
+        history_service = HistoryService(history_db, rollups=rollups)
+        expected = HistoryService(history_db).get_statistics(7)['total_searches']
+        rollups.apply([{'user_name': 'frodo', 'search_term': 'Ring', 'timestamp': datetime.utcnow()}])
+
+        assert not rollups.ready()
+        assert history_service.get_statistics(7)['total_searches'] == expected
+
+        rollups.rebuild()
+
+        assert rollups.ready()
+        assert history_service.get_statistics(7)['total_searches'] == rollups.statistics(7)['total_searches']
+
+    def test_rebuild_overwrites_rows_in_place(self, history_db):
+        """Test that a rebuild keeps current rows and drops only rows without searches"""
+        rollups = HistoryRollups(history_db)
+        rollups.rebuild()
+        day = datetime.utcnow().strftime('%Y-%m-%d')
+        total = history_db.search_stats_daily.find_one({'day': day, 'kind': 'total'})
+        history_db.search_stats_daily.update_one({'_id': total['_id']}, {'$inc': {'count': 5}})
+        history_db.search_stats_daily.insert_one({'day': day, 'kind': 'term', 'key': 'gone', 'count': 1})
+
+        rollups.rebuild_day(day)
+
+        rebuilt = history_db.search_stats_daily.find_one({'day': day, 'kind': 'total'})
+        assert rebuilt['_id'] == total['_id']
+        assert rebuilt['count'] == total['count']
+        assert history_db.search_stats_daily.count_documents({'key': 'gone'}) == 0
+
+    def test_rebuild_keeps_rows_written_meanwhile(self, history_db, mocker):
+        """Test that a row created by a concurrent search during a rebuild is kept"""
+        rollups = HistoryRollups(history_db)
+        day = datetime.utcnow().strftime('%Y-%m-%d')
+        aggregate = history_db.search_history.aggregate
+        searched = []
+
+        def aggregate_then_search(*args, **kwargs):
+            result = list(aggregate(*args, **kwargs))
+            if not searched:
+                searched.append(True)
+                rollups.apply([{'user_name': 'new_user', 'search_term': 'Ring', 'timestamp': datetime.utcnow()}])
+            return result
+
+        mocker.patch.object(history_db.search_history, 'aggregate', aggregate_then_search)
+        rollups.rebuild_day(day)
+
+        assert history_db.search_stats_daily.find_one({'day': day, 'kind': 'user', 'key': 'new_user'})['count'] == 1
+
+    def test_clear_history_rebuilds_affected_days(self, history_db):
+        """Test that clearing one user's history keeps the rollups exact"""
+        rollups = HistoryRollups(history_db)
+        rollups.rebuild()
+        history_service = HistoryService(history_db, rollups=rollups)
+
+        history_service.clear_history(user_name='user_1')
+
+        assert history_db.search_stats_daily.count_documents({'kind': 'user', 'key': 'user_1'}) == 0
+        cleared = rollup_rows(history_db)
+        rollups.rebuild()
+        assert rollup_rows(history_db) == cleared
+
+        history_service.clear_history()
+        assert history_db.search_stats_daily.count_documents({}) == 0
+
+@pytest.mark.benchmark(group='history-stats')
+def test_legacy_statistics_performance(benchmark_db, benchmark):
+    """Benchmark four separate passes over the window"""
+    result = benchmark(legacy_statistics, benchmark_db.search_history, 30)
+    assert result['total_searches'] > 0
+
+@pytest.mark.benchmark(group='history-stats')
+def test_facet_statistics_performance(benchmark_db, benchmark):
+    """Benchmark the single $match + $facet pass over the same window"""
+    result = benchmark(HistoryService(benchmark_db).get_statistics, 30)
+    assert result['total_searches'] == legacy_statistics(benchmark_db.search_history, 30)['total_searches']
+
+@pytest.mark.benchmark(group='history-stats')
+def test_rollup_statistics_performance(benchmark_db, benchmark):
+    """Benchmark reading the same window from the daily rollups"""
+    rollups = HistoryRollups(benchmark_db)
+    rollups.rebuild()
+    result = benchmark(rollups.statistics, 30)
+    assert result['total_searches'] > 0
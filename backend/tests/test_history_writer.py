@@ -0,0 +1,165 @@
+# tests/test_history_writer.py
+
+import json
+import threading
+import time
+import mongomock
+import pytest
+from pymongo.errors import AutoReconnect
+from app.services.history_writer import HistoryWriter
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient().db.search_history
+
+def make_doc(i):
+    return {'user_name': f'user{i % 3}', 'search_term': f'term {i}', 'results_count': i}
+
+class TestHistoryWriter:
+    """Test suite for write-behind history batching"""
+
+    def test_batches_by_size(self, collection):
+        """Test that queued searches are written in batches"""
+        writer = HistoryWriter(lambda: collection, batch_size=10, flush_interval=5)
+        for i in range(25):
+            assert writer.enqueue(make_doc(i))
+
+        writer.flush()
+
+        assert collection.count_documents({}) == 25
+        stats = writer.stats()
+        assert stats['written'] == 25
+        assert stats['queue_depth'] == 0
+        assert stats['flushes'] == 3
+        writer.close()
+
+    def test_on_written_receives_stored_batch(self, collection):
+        """Test that the post-write hook sees every stored document once"""
+        seen = []
+        writer = HistoryWriter(lambda: collection, batch_size=10, flush_interval=5,
+                               on_written=seen.extend)
+        for i in range(15):
+            writer.enqueue(make_doc(i))
+
+        writer.flush()
+
+        assert sorted(doc['results_count'] for doc in seen) == list(range(15))
+        writer.close()
+
+    def test_flushes_on_interval(self, collection):
+        """Test that a partial batch is written once the interval elapses"""
+        writer = HistoryWriter(lambda: collection, batch_size=100, flush_interval=0.05)
+        writer.enqueue(make_doc(1))
+
+        deadline = time.monotonic() + 2
+        while collection.count_documents({}) == 0:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        writer.close()
+
+    def test_close_flushes_pending(self, collection):
+        """Test that shutting down writes everything still queued"""
+        writer = HistoryWriter(lambda: collection, batch_size=1000, flush_interval=60)
+        for i in range(50):
+            writer.enqueue(make_doc(i))
+
+        writer.close()
+
+        assert collection.count_documents({}) == 50
+        assert not writer.enqueue(make_doc(51))
+        assert collection.count_documents({}) == 51
+
+    def test_backpressure_writes_synchronously(self, collection):
+        """Test that a full queue makes callers write their own document"""
+        release = threading.Event()
+
+        class SlowCollection:
+            def insert_many(self, docs, ordered=True):
+                release.wait(2)
+                collection.insert_many(docs, ordered=ordered)
+
+        writer = HistoryWriter(lambda: SlowCollection(), batch_size=1, flush_interval=0,
+                               max_queue_size=1, enqueue_timeout=0.01)
+        writer.get_collection = lambda: SlowCollection()
+        writer.enqueue(make_doc(0))
+        time.sleep(0.05)
+        writer.enqueue(make_doc(1))
+
+        writer.get_collection = lambda: collection
+        assert not writer.enqueue(make_doc(2))
+        assert writer.stats()['sync_writes'] == 1
+
+        release.set()
+        writer.close()
+        assert collection.count_documents({}) == 3
+
+    def test_transient_error_retried(self, collection):
+        """Test that a batch survives an AutoReconnect, including documents that landed before it"""
+        attempts = []
+
+        class FlakyCollection:
+            def insert_many(self, docs, ordered=True):
+                attempts.append(len(docs))
+                if len(attempts) == 1:
+                    collection.insert_many(docs[:2], ordered=ordered)
+                    raise AutoReconnect('connection reset')
+                collection.insert_many(docs, ordered=ordered)
+
+        seen = []
+        writer = HistoryWriter(lambda: FlakyCollection(), batch_size=5, flush_interval=5,
+                               on_written=seen.extend, retry_backoff=0)
+        for i in range(5):
+            writer.enqueue(make_doc(i))
+
+        writer.flush()
+
+        assert attempts == [5, 5]
+        assert collection.count_documents({}) == 5
+        assert len(seen) == 5
+        stats = writer.stats()
+        assert (stats['written'], stats['failed'], stats['retries']) == (5, 0, 1)
+        writer.close()
+
+    def test_batch_dropped_after_retries(self, collection, caplog):
+        """Test that a batch failing every attempt is dropped and logged"""
+        class DownCollection:
+            def insert_many(self, docs, ordered=True):
+                raise AutoReconnect('connection refused')
+
+        writer = HistoryWriter(lambda: DownCollection(), batch_size=3, flush_interval=5,
+                               max_retries=2, retry_backoff=0)
+        for i in range(3):
+            writer.enqueue(make_doc(i))
+
+        writer.flush()
+
+        stats = writer.stats()
+        assert (stats['written'], stats['failed'], stats['retries']) == (0, 3, 2)
+        assert 'Dropping 3 history records after 3 attempts' in caplog.text
+        writer.close()
+
+    def test_search_enqueued_from_route(self, app, client, monkeypatch):
+        """Test that movie searches go through the writer when enabled"""
+        writer = HistoryWriter(lambda: app.db.search_history, batch_size=10, flush_interval=5)
+        monkeypatch.setattr(app, 'history_writer', writer)
+
+        class MockResponse:
+            status_code = 200
+            headers = {}
+
+            def json(self):
+                return {'docs': [{'_id': '1', 'name': 'The Two Towers'}]}
+
+            def raise_for_status(self):
+                pass
+
+        monkeypatch.setattr('requests.Session.get', lambda session, url, **kwargs: MockResponse())
+
+        client.get('/api/movies?name=two&user=frodo')
+        writer.flush()
+
+        assert app.db.search_history.find_one({'user_name': 'frodo'})['results_count'] == 1
+        stats = json.loads(client.get('/api/history/writer/stats').data)
+        assert stats['enabled'] is True
+        assert stats['written'] == 1
+        writer.close()
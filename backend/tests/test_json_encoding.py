@@ -0,0 +1,99 @@
+# tests/test_json_encoding.py
+
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+import pytest
+from bson.objectid import ObjectId
+from flask import Flask, json as flask_json
+from app.models.search_history import SearchHistory
+from app.utils import json_encoding
+from app.utils.json_encoding import dumps, encode_default
+
+def history_rows(count, with_id=True):
+    """Rows as Mongo returns them; /api/history drops _id"""
+    start = datetime(2024, 1, 1, 12)
+    return [
+        {**({'_id': ObjectId()} if with_id else {}), 'user_name': f'user_{i % 50}', 'search_term': f'term {i % 200}',
+         'results_count': i % 7, 'timestamp': start + timedelta(seconds=i, milliseconds=i % 1000)}
+        for i in range(count)
+    ]
+
+class TestJSONEncoding:
+    """Test suite for the JSON encoder"""
+
+    def test_mongo_types(self):
+        """Test that datetimes are ISO 8601 UTC and ObjectIds are hex"""
+        object_id = ObjectId()
+        aware = datetime(2024, 1, 1, 14, tzinfo=timezone(timedelta(hours=2)))
+        utc = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+
+        assert json.loads(dumps({'id': object_id, 'at': datetime(2024, 1, 1, 12), 'aware': aware, 'utc': utc})) == {
+            'id': str(object_id), 'at': '2024-01-01T12:00:00Z', 'aware': '2024-01-01T14:00:00+02:00',
+            'utc': '2024-01-01T12:00:00Z'
+        }
+        assert dumps(aware, fast=False) == dumps(aware)
+        assert encode_default(datetime(2024, 1, 1, 12, 0, 0, 5000)) == '2024-01-01T12:00:00.005000Z'
+        with pytest.raises(TypeError):
+            encode_default(object())
+
+    def test_fast_and_standard_paths_agree(self):
+        """Test that orjson and the standard library produce the same documents"""
+        rows = history_rows(50)
+        fast = dumps(rows, sort_keys=True)
+        standard = dumps(rows, sort_keys=True, fast=False)
+
+        assert json.loads(fast) == json.loads(standard)
+        if json_encoding.orjson is not None:
+            assert fast == standard
+
+    def test_model_has_slots(self):
+        """Test that SearchHistory instances carry no per-instance dict"""
+        search = SearchHistory('frodo', 'Ring', 1)
+        assert not hasattr(search, '__dict__')
+        with pytest.raises(AttributeError):
+            search.extra = True
+
+class TestJSONResponses:
+    """Test suite for JSON responses through the app"""
+
+    def test_history_timestamps_iso(self, app, client):
+        """Test that API responses carry ISO timestamps that sort chronologically"""
+        app.db.search_history.insert_many(history_rows(5))
+
+        data = json.loads(client.get('/api/history?sort=timestamp&order=asc').data)
+
+        timestamps = [item['timestamp'] for item in data['history']]
+        assert timestamps[0] == '2024-01-01T12:00:00Z'
+        assert timestamps == sorted(timestamps)
+
+    def test_flask_fallback_types(self, app):
+        """Test that types only Flask knows are still encoded"""
+        value = uuid.uuid4()
+        with app.app_context():
+            assert json.loads(flask_json.dumps({'id': value})) == {'id': str(value)}
+
+    def test_fast_encoder_disabled(self, app):
+        """Test that JSON_FAST_ENCODER=False keeps the same output"""
+        rows = history_rows(3)
+        with app.app_context():
+            fast = flask_json.dumps(rows)
+        app.config['JSON_FAST_ENCODER'] = False
+        json_encoding.init_json(app)
+        with app.app_context():
+            assert json.loads(flask_json.dumps(rows)) == json.loads(fast)
+
+@pytest.mark.parametrize('count', [100, 10000])
+@pytest.mark.parametrize('encoder', ['flask_default', 'fast'])
+def test_serialization_performance(app, benchmark, count, encoder):
+    """Benchmark serializing history rows with Flask's own encoder (before) and the fast one"""
+    rows = history_rows(count, with_id=False)
+    # A bare app keeps Flask's default JSON setup
+    target = Flask(__name__) if encoder == 'flask_default' else app
+
+    def serialize():
+        with target.app_context():
+            return flask_json.dumps(rows)
+
+    benchmark.group = f'json-{count}-rows'
+    assert len(json.loads(benchmark(serialize))) == count
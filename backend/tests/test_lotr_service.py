@@ -0,0 +1,177 @@
+# tests/test_lotr_service.py
+
+import json
+import threading
+import time
+import pytest
+from app.utils.cache import ResponseCache
+from app.utils.concurrency import SingleFlight
+
+class TestResponseCache:
+    """Test suite for the upstream response cache"""
+
+    def test_miss_then_hit(self):
+        """Test that a fresh entry is served without calling the loader"""
+        cache = ResponseCache()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return ['movie']
+
+        assert cache.get_or_load('key', loader, ttl=60) == ['movie']
+        assert cache.get_or_load('key', loader, ttl=60) == ['movie']
+        assert len(calls) == 1
+        assert cache.stats()['misses'] == 1
+        assert cache.stats()['hits'] == 1
+
+    def test_stale_while_revalidate(self):
+        """Test that an expired entry is served stale and refreshed in the background"""
+        cache = ResponseCache(stale_ttl=60)
+        values = iter(['old', 'new'])
+        cache.get_or_load('key', lambda: next(values), ttl=0)
+
+        assert cache.get_or_load('key', lambda: next(values), ttl=60) == 'old'
+        assert cache.stats()['stale'] == 1
+
+        deadline = time.monotonic() + 2
+        while cache.get_or_load('key', lambda: 'unused', ttl=60) != 'new':
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+    def test_expired_past_stale_window_is_miss(self):
+        """Test that entries past the stale window are reloaded synchronously"""
+        cache = ResponseCache(stale_ttl=0)
+        cache.get_or_load('key', lambda: 'old', ttl=0)
+
+        assert cache.get_or_load('key', lambda: 'new', ttl=60) == 'new'
+        assert cache.stats()['misses'] == 2
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted when full"""
+        cache = ResponseCache(max_entries=2)
+        cache.get_or_load('a', lambda: 'a', ttl=60)
+        cache.get_or_load('b', lambda: 'b', ttl=60)
+        cache.get_or_load('a', lambda: 'a', ttl=60)
+        cache.get_or_load('c', lambda: 'c', ttl=60)
+
+        assert cache.get_or_load('b', lambda: 'reloaded', ttl=60) == 'reloaded'
+        assert cache.stats()['entries'] == 2
+
+    def test_loader_error_not_cached(self):
+        """Test that a failing load propagates and is retried next time"""
+        cache = ResponseCache()
+
+        def failing():
+            raise RuntimeError('upstream down')
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_load('key', failing, ttl=60)
+        assert cache.get_or_load('key', lambda: 'ok', ttl=60) == 'ok'
+
+class TestLotrServiceCaching:
+    """Test suite for caching of movie lookups"""
+
+    def test_movie_list_cached_across_requests(self, client, monkeypatch):
+        """Test that repeated searches reuse one upstream response"""
+        calls = []
+
+        class MockResponse:
+            status_code = 200
+            headers = {}
+
+            def json(self):
+                return {'docs': [{'_id': '1', 'name': 'The Two Towers'}]}
+
+            def raise_for_status(self):
+                pass
+
+        def mock_get(session, url, **kwargs):
+            calls.append(url)
+            return MockResponse()
+
+        monkeypatch.setattr('requests.Session.get', mock_get)
+
+        assert client.get('/api/movies?name=tower').status_code == 200
+        assert client.get('/api/movies?name=two').status_code == 200
+        assert len(calls) == 1
+
+        stats = json.loads(client.get('/api/upstream/stats').data)
+        assert stats['cache']['hits'] == 1
+        assert stats['cache']['misses'] == 1
+
+class TestSingleFlight:
+    """Test suite for upstream request coalescing"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test that concurrent callers for one key wait on a single call"""
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(2)
+            return ['movie']
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do('key', fetch)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+
+        deadline = time.monotonic() + 2
+        while flight.stats()['collapsed'] < 4:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == [['movie']] * 5
+        assert flight.stats() == {'in_flight': 0, 'executed': 1, 'collapsed': 4}
+
+    def test_error_shared_and_not_remembered(self):
+        """Test that a failure is raised to the caller and the key is released"""
+        flight = SingleFlight()
+
+        def failing():
+            raise RuntimeError('upstream down')
+
+        with pytest.raises(RuntimeError):
+            flight.do('key', failing)
+        assert flight.do('key', lambda: 'ok') == 'ok'
+
+    def test_upstream_revalidated_with_etag(self, app, client, monkeypatch):
+        """Test that an expired entry is revalidated with If-None-Match"""
+        app.config['LOTR_CACHE_TTLS'] = {'movie': 0}
+        app.lotr_cache.stale_ttl = 0
+        sent = []
+
+        class MockResponse:
+            def __init__(self, status_code):
+                self.status_code = status_code
+                self.headers = {'ETag': 'W/"abc"'}
+
+            def json(self):
+                return {'docs': [{'_id': '1', 'name': 'The Two Towers'}]}
+
+            def raise_for_status(self):
+                pass
+
+        def mock_get(session, url, headers=None, **kwargs):
+            sent.append(dict(headers or {}))
+            return MockResponse(304 if headers else 200)
+
+        monkeypatch.setattr('requests.Session.get', mock_get)
+
+        assert client.get('/api/movies').status_code == 200
+        response = client.get('/api/movies')
+
+        assert len(json.loads(response.data)['movies']) == 1
+        assert sent[1] == {'If-None-Match': 'W/"abc"'}
+        assert app.lotr_cache.stats()['revalidated'] == 1
+        assert app.search_indexes.stats()['builds'] == 1
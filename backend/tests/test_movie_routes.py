@@ -45,6 +45,7 @@ def mock_lotr_api(monkeypatch, sample_movies):
         def __init__(self, json_data, status_code=200):
             self.json_data = json_data
             self.status_code = status_code
+            self.headers = {}
 
         def json(self):
             return self.json_data
@@ -55,7 +56,7 @@ def mock_lotr_api(monkeypatch, sample_movies):
 
     def mock_get(*args, **kwargs):
         if "movie" in args[0]:
-            if len(args[0].split("/")) > 4:  # Specific movie endpoint
+            if not args[0].endswith("/movie"):  # Specific movie endpoint
                 movie_id = args[0].split("/")[-1]
                 for movie in sample_movies["docs"]:
                     if movie["_id"] == movie_id:
@@ -64,7 +65,8 @@ def mock_lotr_api(monkeypatch, sample_movies):
             return MockResponse(sample_movies)
         return MockResponse({"error": "Not found"}, 404)
 
-    monkeypatch.setattr("requests.get", mock_get)
+    monkeypatch.setattr("requests.Session.get",
+                        lambda self, *args, **kwargs: mock_get(*args, **kwargs))
     return mock_get
 
 class TestMovieRoutes:
@@ -135,7 +137,7 @@ class TestMovieRoutes:
         data = json.loads(response.data)
         assert 'error' in data
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_api_error_handling(self, mock_get, client):
         """Test handling of LOTR API errors"""
         # Simulate API error
@@ -166,6 +168,89 @@ class TestMovieRoutes:
         assert any(entry['user_name'] == 'user1' for entry in data['history'])
         assert any(entry['user_name'] == 'user2' for entry in data['history'])
 
+    def test_get_movies_range_filter(self, client, mock_lotr_api):
+        """Test filtering movies by numeric ranges"""
+        response = client.get('/api/movies?runtimeInMinutes_min=179&rottenTomatoesScore_max=100')
+
+        data = json.loads(response.data)
+        assert [movie['name'] for movie in data['movies']] == ['The Two Towers']
+        assert data['filters']['ranges']['runtimeInMinutes'] == {'min': 179, 'max': None}
+
+        response = client.get('/api/movies?budgetInMillions_min=abc')
+        assert response.status_code == 400
+
+    def test_get_movies_sorting(self, client, mock_lotr_api):
+        """Test multi-key movie sorting"""
+        response = client.get('/api/movies?sort=academyAwardWins,name&order=asc,desc')
+
+        data = json.loads(response.data)
+        assert [movie['academyAwardWins'] for movie in data['movies']] == [2, 4]
+        assert data['sort'] == [
+            {'field': 'academyAwardWins', 'order': 'asc'},
+            {'field': 'name', 'order': 'desc'}
+        ]
+
+    def test_get_movies_pagination(self, client, mock_lotr_api):
+        """Test movie pagination metadata"""
+        response = client.get('/api/movies?page=2&per_page=1&sort=boxOfficeRevenueInMillions&order=desc')
+
+        data = json.loads(response.data)
+        assert [movie['name'] for movie in data['movies']] == ['The Fellowship of the Ring']
+        assert data['pagination']['total_items'] == 2
+        assert data['pagination']['has_prev'] == True
+        assert data['pagination']['has_next'] == False
+
+    def test_movies_conditional_get(self, client, mock_lotr_api):
+        """Test that repeat reads with a matching ETag get a 304"""
+        response = client.get('/api/movies?name=Ring')
+        etag = response.headers['ETag']
+        assert not etag.startswith('W/')
+
+        response = client.get('/api/movies?name=Ring', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+
+        response = client.get('/api/movies?name=Tower', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+
+    def test_conditional_get_still_logs_search(self, client, mock_lotr_api):
+        """Test that a 304 for a user search is still recorded in history"""
+        etag = client.get('/api/movies?name=Ring').headers['ETag']
+
+        response = client.get('/api/movies?name=Ring&user=test_user', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+
+        history = json.loads(client.get('/api/history').data)['history']
+        assert history[0]['results_count'] == 1
+
+    def test_movie_detail_conditional_get(self, client, mock_lotr_api):
+        """Test ETag revalidation on the movie detail route"""
+        response = client.get('/api/movies/5cd95395de30eff6ebccde5c')
+        etag = response.headers['ETag']
+
+        response = client.get('/api/movies/5cd95395de30eff6ebccde5c', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+
+    def test_get_movies_batch(self, client, mock_lotr_api):
+        """Test resolving several movie IDs in one call"""
+        response = client.get('/api/movies/batch?ids=5cd95395de30eff6ebccde5d,missing,5cd95395de30eff6ebccde5c')
+
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert [movie['_id'] for movie in data['movies']] == [
+            '5cd95395de30eff6ebccde5d', '5cd95395de30eff6ebccde5c'
+        ]
+        assert data['errors'] == {'missing': 'Movie not found'}
+
+    def test_get_movies_batch_validation(self, client, mock_lotr_api):
+        """Test batch parameter validation"""
+        assert client.get('/api/movies/batch').status_code == 400
+
+        ids = ','.join(f'id{i}' for i in range(51))
+        response = client.get(f'/api/movies/batch?ids={ids}')
+        assert response.status_code == 400
+        assert 'error' in json.loads(response.data)
+
     @pytest.mark.parametrize('invalid_input', [
         '"><script>alert(1)</script>',  # XSS attempt
         "'; DROP TABLE movies; --",     # SQL injection attempt
@@ -207,6 +292,47 @@ class TestMoviePerformance:
 
         assert all(r.status_code == 200 for r in results)
 
+    def test_batch_lookups_run_concurrently(self, app, client, monkeypatch):
+        """Test that batch latency tracks the slowest fetch, within the concurrency limit"""
+        import threading
+        import time
+
+        app.config['LOTR_BATCH_CONCURRENCY'] = 4
+        lock = threading.Lock()
+        active = {'now': 0, 'max': 0}
+
+        class MockResponse:
+            status_code = 200
+            headers = {}
+
+            def __init__(self, movie_id):
+                self.movie_id = movie_id
+
+            def json(self):
+                return {'docs': [{'_id': self.movie_id, 'name': self.movie_id}]}
+
+            def raise_for_status(self):
+                pass
+
+        def slow_get(session, url, **kwargs):
+            with lock:
+                active['now'] += 1
+                active['max'] = max(active['max'], active['now'])
+            time.sleep(0.1)
+            with lock:
+                active['now'] -= 1
+            return MockResponse(url.split('/')[-1])
+
+        monkeypatch.setattr('requests.Session.get', slow_get)
+
+        start = time.monotonic()
+        response = client.get('/api/movies/batch?ids=' + ','.join(f'id{i}' for i in range(8)))
+        elapsed = time.monotonic() - start
+
+        assert len(json.loads(response.data)['movies']) == 8
+        assert active['max'] == 4
+        assert elapsed < 0.5
+
 class TestMovieRoutesIntegration:
     """Integration tests for movie routes"""
 
@@ -0,0 +1,115 @@
+# tests/test_rate_limiter.py
+
+import json
+import threading
+import time
+import pytest
+from app.services.rate_limiter import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RateLimitScheduler, UpstreamRateLimited
+)
+
+class MockResponse:
+    def __init__(self, status_code=200, headers=None, json_data=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.json_data = json_data or {'docs': []}
+
+    def json(self):
+        return self.json_data
+
+    def raise_for_status(self):
+        if self.status_code != 200:
+            raise Exception("API Error")
+
+class TestRateLimitScheduler:
+    """Test suite for the upstream token bucket scheduler"""
+
+    def test_grants_within_capacity(self):
+        """Test that requests within the bucket are granted immediately"""
+        limiter = RateLimitScheduler(capacity=3, period=600)
+
+        for _ in range(3):
+            assert limiter.acquire(timeout=0) < 0.01
+        assert limiter.stats()['granted'] == 3
+
+    def test_deadline_exceeded(self):
+        """Test that a request is rejected once its deadline passes"""
+        limiter = RateLimitScheduler(capacity=1, period=600)
+        limiter.acquire()
+
+        with pytest.raises(UpstreamRateLimited) as exc_info:
+            limiter.acquire(timeout=0.05)
+
+        assert exc_info.value.retry_after >= 1
+        stats = limiter.stats()
+        assert stats['rejected'] == 1
+        assert stats['queue_depth'] == 0
+
+    def test_interactive_served_before_background(self):
+        """Test that queued interactive requests jump ahead of background ones"""
+        limiter = RateLimitScheduler(capacity=1, period=0.2)
+        limiter.acquire()
+        order = []
+
+        def request(priority, label):
+            limiter.acquire(priority, timeout=2)
+            order.append(label)
+
+        background = threading.Thread(target=request, args=(PRIORITY_BACKGROUND, 'background'))
+        interactive = threading.Thread(target=request, args=(PRIORITY_INTERACTIVE, 'interactive'))
+        background.start()
+        time.sleep(0.02)
+        interactive.start()
+        background.join()
+        interactive.join()
+
+        assert order == ['interactive', 'background']
+        assert limiter.stats()['max_wait_seconds'] > 0
+
+    def test_observe_remaining_and_reset(self):
+        """Test that exhausted upstream quota blocks until the reset time"""
+        limiter = RateLimitScheduler(capacity=100, period=600)
+        reset = str(int(time.time()) + 60)
+
+        blocked_for = limiter.observe(MockResponse(headers={
+            'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': reset
+        }))
+
+        assert blocked_for > 50
+        with pytest.raises(UpstreamRateLimited):
+            limiter.acquire(timeout=0)
+
+    def test_observe_too_many_requests(self):
+        """Test that a 429 honours Retry-After"""
+        limiter = RateLimitScheduler(capacity=100, period=600)
+
+        blocked_for = limiter.observe(MockResponse(429, headers={'Retry-After': '30'}))
+
+        assert 29 < blocked_for <= 30
+        assert limiter.stats()['throttled'] == 1
+
+class TestRateLimitedRoutes:
+    """Test suite for rate limit handling in routes"""
+
+    def test_upstream_429_returns_503(self, client, monkeypatch):
+        """Test that an upstream 429 is surfaced as 503 with Retry-After"""
+        def mock_get(session, url, **kwargs):
+            return MockResponse(429, headers={'Retry-After': '12'})
+
+        monkeypatch.setattr('requests.Session.get', mock_get)
+
+        response = client.get('/api/movies')
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '12'
+        assert 'error' in json.loads(response.data)
+
+    def test_rate_limit_metrics_exposed(self, client, monkeypatch):
+        """Test that queue depth and wait times are reported"""
+        monkeypatch.setattr('requests.Session.get', lambda session, url, **kwargs: MockResponse())
+
+        client.get('/api/movies')
+        stats = json.loads(client.get('/api/upstream/stats').data)['rate_limit']
+
+        assert stats['granted'] == 1
+        assert stats['queue_depth'] == 0
+        assert 'avg_wait_seconds' in stats
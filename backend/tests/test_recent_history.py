@@ -0,0 +1,180 @@
+# tests/test_recent_history.py
+
+import json
+import time
+from datetime import datetime, timedelta
+import mongomock
+import pytest
+from app import create_app
+from app.config import TestConfig
+from app.services.history_service import HistoryService
+from app.services.recent_history import RecentHistory
+
+def search(user_name, search_term, minutes_ago=0):
+    return {'user_name': user_name, 'search_term': search_term, 'results_count': 1,
+            'timestamp': datetime(2024, 1, 1, 12) - timedelta(minutes=minutes_ago)}
+
+class TestRecentHistory:
+    """Test suite for the per-user recent history ring buffers"""
+
+    def test_load_then_add(self):
+        """Test that a loaded buffer follows new searches and keeps only the last `size`"""
+        recent = RecentHistory(size=3)
+        assert recent.get('frodo', 3) is None
+
+        loaded = recent.load('frodo', lambda size: [search('frodo', f'old {i}', i) for i in range(size)])
+        assert [entry['search_term'] for entry in loaded] == ['old 0', 'old 1', 'old 2']
+
+        recent.add(search('frodo', 'Ring'))
+        recent.add(search('sam', 'Hobbit'))
+
+        assert [entry['search_term'] for entry in recent.get('frodo', 3)] == ['Ring', 'old 0', 'old 1']
+        assert recent.get('frodo', 4) is None
+        assert recent.get('sam', 1) is None
+        assert recent.stats()['hits'] == 1
+
+    def test_add_during_load_not_cached(self):
+        """Test that a load racing a new search is not kept"""
+        recent = RecentHistory(size=3)
+
+        def loader(size):
+            recent.add(search('frodo', 'Ring'))
+            return []
+
+        assert recent.load('frodo', loader) == []
+        assert recent.get('frodo', 1) is None
+
+    def test_ttl_and_eviction(self):
+        """Test that buffers expire and the least recently used user is evicted"""
+        recent = RecentHistory(size=2, max_users=2, ttl=0.05)
+        for user_name in ('frodo', 'sam', 'merry'):
+            recent.load(user_name, lambda size: [])
+
+        assert recent.get('frodo', 1) is None
+        assert recent.get('merry', 1) == []
+        time.sleep(0.06)
+        assert recent.get('merry', 1) is None
+
+    def test_timestamps_match_mongo(self):
+        """Test that buffered timestamps have Mongo's millisecond precision"""
+        entry = RecentHistory.entry(dict(search('frodo', 'Ring'), timestamp=datetime(2024, 1, 1, 12, 0, 0, 123456)))
+        assert entry['timestamp'] == datetime(2024, 1, 1, 12, 0, 0, 123000)
+
+class TestUserHistoryRoute:
+    """Test suite for bounded /api/history/<user_name>"""
+
+    @pytest.fixture
+    def heavy_user(self, app):
+        app.db.search_history.insert_many([search('heavy_user', f'term {i}', i) for i in range(50)])
+
+    def test_limit_and_before(self, client, heavy_user):
+        """Test paging back through a user's history"""
+        first = json.loads(client.get('/api/history/heavy_user?limit=30').data)['history']
+        assert [item['search_term'] for item in first] == [f'term {i}' for i in range(30)]
+
+        before = (datetime(2024, 1, 1, 12) - timedelta(minutes=29)).isoformat()
+        second = json.loads(client.get(f'/api/history/heavy_user?limit=30&before={before}').data)['history']
+        assert [item['search_term'] for item in second] == [f'term {i}' for i in range(30, 50)]
+
+    def test_limit_bounds(self, app, client, heavy_user):
+        """Test that limits are clamped to HISTORY_USER_MAX_LIMIT"""
+        app.config['HISTORY_USER_MAX_LIMIT'] = 40
+        assert len(json.loads(client.get('/api/history/heavy_user').data)['history']) == 40
+        assert len(json.loads(client.get('/api/history/heavy_user?limit=0').data)['history']) == 1
+        assert client.get('/api/history/heavy_user?before=yesterday').status_code == 400
+
+    def test_recent_searches_served_from_memory(self, app, client, heavy_user, mocker):
+        """Test that recent searches skip Mongo once loaded and include new searches"""
+        assert len(json.loads(client.get('/api/history/heavy_user?limit=5').data)['history']) == 5
+
+        with app.app_context():
+            HistoryService.from_app(app).add_search('heavy_user', 'Ring', 3)
+        find = mocker.spy(app.db.search_history, 'find')
+
+        history = json.loads(client.get('/api/history/heavy_user?limit=5').data)['history']
+
+        assert find.call_count == 0
+        assert [item['search_term'] for item in history] == ['Ring', 'term 0', 'term 1', 'term 2', 'term 3']
+
+    def test_default_request_served_from_memory(self, app, client, mocker):
+        """Test that the default page of a user with few searches is a buffer hit"""
+        app.db.search_history.insert_many([search('frodo', f'term {i}', i) for i in range(5)])
+        client.get('/api/history/frodo')
+        find = mocker.spy(app.db.search_history, 'find')
+
+        history = json.loads(client.get('/api/history/frodo').data)['history']
+
+        assert find.call_count == 0
+        assert len(history) == 5
+        assert app.recent_history.stats()['hits'] == 1
+
+    def test_default_request_continues_past_buffer(self, app, client, heavy_user, mocker):
+        """Test that only searches older than the buffer are read from Mongo, ties included"""
+        app.db.search_history.insert_many([search('heavy_user', f'tie {i}', 19) for i in range(3)])
+        uncached = json.loads(client.get('/api/history/heavy_user?before=2100-01-01T00:00:00').data)['history']
+        client.get('/api/history/heavy_user')
+        find = mocker.spy(app.db.search_history, 'find')
+
+        history = json.loads(client.get('/api/history/heavy_user').data)['history']
+
+        assert find.call_args[0][0]['timestamp'] == {'$lte': datetime(2024, 1, 1, 12) - timedelta(minutes=19)}
+        assert len(history) == 53
+        assert sorted(item['search_term'] for item in history) == sorted(item['search_term'] for item in uncached)
+        assert [item['timestamp'] for item in history] == [item['timestamp'] for item in uncached]
+
+    def test_clear_resets_recent_searches(self, app, client, heavy_user):
+        """Test that cleared history is not served from memory"""
+        client.get('/api/history/heavy_user?limit=5')
+
+        client.post('/api/history/clear', json={'confirm': True, 'user_name': 'heavy_user'})
+
+        assert client.get('/api/history/heavy_user?limit=5').status_code == 404
+
+class TestUserHistoryWriteBehind:
+    """Test suite for /api/history/<user_name> while searches are still queued"""
+
+    class WriteBehindConfig(TestConfig):
+        HISTORY_WRITE_BEHIND = True
+        HISTORY_FLUSH_INTERVAL = 60
+
+    @pytest.fixture
+    def app(self):
+        app = create_app(self.WriteBehindConfig)
+        app.db = mongomock.MongoClient().db
+        yield app
+        app.history_writer.close()
+
+    def search(self, app, search_term):
+        with app.app_context():
+            HistoryService.from_app(app).add_search('frodo', search_term, 1)
+
+    def terms(self, client, query=''):
+        response = client.get(f'/api/history/frodo{query}')
+        assert response.status_code == 200
+        return [item['search_term'] for item in json.loads(response.data)['history']]
+
+    def test_queued_search_is_returned(self, app, client):
+        """Test that a search not yet flushed is returned, and does not hide later ones"""
+        self.search(app, 'ring')
+        assert app.db.search_history.count_documents({}) == 0
+
+        assert self.terms(client) == ['ring']
+
+        app.history_writer.flush()
+        self.search(app, 'tower')
+
+        assert self.terms(client) == ['tower', 'ring']
+        app.history_writer.flush()
+        assert self.terms(client, '?before=2100-01-01T00:00:00') == ['tower', 'ring']
+
+    def test_buffer_loaded_after_flush(self, app, client):
+        """Test that searches flushed between loads are returned once each"""
+        self.search(app, 'ring')
+        app.history_writer.flush()
+        self.search(app, 'tower')
+
+        assert self.terms(client) == ['tower', 'ring']
+        app.history_writer.flush()
+        app.recent_history.clear()
+        assert self.terms(client) == ['tower', 'ring']
+        assert app.history_writer.pending('frodo') == []
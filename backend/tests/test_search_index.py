@@ -0,0 +1,156 @@
+# tests/test_search_index.py
+
+import random
+import string
+import pytest
+from app.services.search_index import CatalogIndex, NgramIndex, SearchIndexRegistry, SortIndex
+
+@pytest.fixture
+def sample_docs():
+    return [
+        {'_id': '1', 'name': 'The Fellowship of the Ring'},
+        {'_id': '2', 'name': 'The Two Towers'},
+        {'_id': '3', 'name': 'The Return of the King'},
+        {'_id': '4', 'name': None},
+        {'_id': '5'}
+    ]
+
+@pytest.fixture(scope='module')
+def quote_corpus():
+    """Synthetic corpus roughly the size of the upstream quote collection"""
+    rng = random.Random(42)
+    words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(600)]
+    return [
+        {'_id': str(i), 'dialog': ' '.join(rng.choices(words, k=rng.randint(4, 14))).capitalize()}
+        for i in range(2400)
+    ]
+
+def linear_search(docs, field, query):
+    """The list comprehension the index replaces"""
+    return [doc for doc in docs if query.lower() in (doc.get(field) or '').lower()]
+
+class TestNgramIndex:
+    """Test suite for the n-gram substring index"""
+
+    def test_case_insensitive_substring(self, sample_docs):
+        """Test that matches ignore case and keep original order"""
+        index = NgramIndex(sample_docs, 'name')
+
+        assert [d['_id'] for d in index.search('THE')] == ['1', '2', '3']
+        assert [d['_id'] for d in index.search('tower')] == ['2']
+        assert index.search('hobbit') == []
+
+    def test_short_and_empty_queries(self, sample_docs):
+        """Test queries shorter than n and the empty query"""
+        index = NgramIndex(sample_docs, 'name')
+
+        assert [d['_id'] for d in index.search('tw')] == ['2']
+        assert len(index.search('')) == 5
+        assert len(index.search(None)) == 5
+
+    def test_grams_present_but_not_contiguous(self):
+        """Test that candidate verification rejects non-substring matches"""
+        index = NgramIndex([{'name': 'abcd xbcy'}, {'name': 'zabcy'}], 'name')
+
+        assert index.search('abcy') == [{'name': 'zabcy'}]
+
+    def test_matches_linear_scan(self, quote_corpus):
+        """Test that the index agrees with the linear scan on a large corpus"""
+        index = NgramIndex(quote_corpus, 'dialog')
+        rng = random.Random(7)
+
+        for doc in rng.sample(quote_corpus, 50):
+            text = doc['dialog']
+            start = rng.randint(0, max(0, len(text) - 6))
+            query = text[start:start + rng.randint(1, 8)].upper()
+            assert index.search(query) == linear_search(quote_corpus, 'dialog', query)
+
+class TestSortIndex:
+    """Test suite for precomputed sort orderings"""
+
+    @pytest.fixture
+    def movies(self):
+        return [
+            {'name': 'B', 'runtimeInMinutes': 180, 'academyAwardWins': 4},
+            {'name': 'A', 'runtimeInMinutes': 120, 'academyAwardWins': 0},
+            {'name': 'D', 'academyAwardWins': 4},
+            {'name': 'C', 'runtimeInMinutes': 150, 'academyAwardWins': 11}
+        ]
+
+    def test_range_positions(self, movies):
+        """Test inclusive range lookups and exclusion of missing values"""
+        index = SortIndex(movies, ['runtimeInMinutes'])
+
+        assert index.range_positions('runtimeInMinutes', 120, 150) == [1, 3]
+        assert index.range_positions('runtimeInMinutes', low=151) == [0]
+        assert index.range_positions('runtimeInMinutes') == [1, 3, 0]
+
+    def test_single_key_order(self, movies):
+        """Test precomputed ascending/descending orders with missing values last"""
+        index = SortIndex(movies, ['runtimeInMinutes'])
+
+        assert index.order(None, [('runtimeInMinutes', 1)]) == [1, 3, 0, 2]
+        assert index.order(None, [('runtimeInMinutes', -1)]) == [0, 3, 1, 2]
+        assert index.order([2, 0, 1], [('runtimeInMinutes', 1)]) == [1, 0, 2]
+
+    def test_multi_key_order(self, movies):
+        """Test that ties on the first key are broken by the second"""
+        index = SortIndex(movies, ['academyAwardWins', 'name'])
+
+        assert index.order(None, [('academyAwardWins', -1), ('name', -1)]) == [3, 2, 0, 1]
+        assert index.order(None, [('academyAwardWins', 1), ('name', 1)]) == [1, 0, 2, 3]
+
+    def test_mixed_types(self):
+        """Test that numbers sort before strings and ranges stay within their type"""
+        docs = [
+            {'budgetInMillions': '94'},
+            {'budgetInMillions': 281},
+            {'budgetInMillions': 'unknown'},
+            {'budgetInMillions': 93.5},
+            {}
+        ]
+        index = SortIndex(docs, ['budgetInMillions'])
+
+        assert index.order(None, [('budgetInMillions', 1)]) == [3, 1, 0, 2, 4]
+        assert index.order(None, [('budgetInMillions', -1)]) == [2, 0, 1, 3, 4]
+        assert index.range_positions('budgetInMillions', low=100) == [1]
+        assert index.range_positions('budgetInMillions', high='a') == [0]
+        assert index.range_positions('budgetInMillions') == [3, 1, 0, 2]
+
+    def test_catalog_query(self, movies):
+        """Test combining substring, range and sort"""
+        index = CatalogIndex(movies, 'name', ['runtimeInMinutes'])
+
+        assert index.query('a') == [1]
+        assert index.query(None, [('runtimeInMinutes', 100, 170)], [('runtimeInMinutes', -1)]) == [3, 1]
+
+class TestSearchIndexRegistry:
+    """Test suite for per-catalog index reuse"""
+
+    def test_rebuild_only_on_new_version(self, sample_docs):
+        """Test that an index is reused until the catalog version changes"""
+        registry = SearchIndexRegistry()
+        loads = []
+
+        def load():
+            loads.append(1)
+            return sample_docs
+
+        first = registry.get('movie', 'v1', load, 'name')
+        assert registry.get('movie', 'v1', load, 'name') is first
+        assert registry.get('movie', 'v2', load, 'name') is not first
+        assert len(loads) == 2
+        assert registry.stats()['builds'] == 2
+
+@pytest.mark.benchmark(group='substring-search')
+def test_linear_scan_performance(quote_corpus, benchmark):
+    """Benchmark the per-request list comprehension over ~2400 quotes"""
+    result = benchmark(linear_search, quote_corpus, 'dialog', 'ring')
+    assert result == NgramIndex(quote_corpus, 'dialog').search('ring')
+
+@pytest.mark.benchmark(group='substring-search')
+def test_ngram_index_performance(quote_corpus, benchmark):
+    """Benchmark the n-gram index over the same corpus and query"""
+    index = NgramIndex(quote_corpus, 'dialog')
+    result = benchmark(index.search, 'ring')
+    assert result == linear_search(quote_corpus, 'dialog', 'ring')
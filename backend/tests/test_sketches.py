@@ -0,0 +1,208 @@
+# tests/test_sketches.py
+
+import json
+import random
+import time
+from collections import Counter
+import mongomock
+import pytest
+from app.services.history_service import HistoryService
+from app.services.live_stats import LiveStats
+from app.services.sketches import CountMinSketch, HyperLogLog, SpaceSaving
+
+@pytest.fixture
+def zipf_stream():
+    """Skewed stream of 20,000 search terms"""
+    rng = random.Random(11)
+    return [f'term {int(rng.paretovariate(1.1)) % 2000}' for _ in range(20000)]
+
+class TestCountMinSketch:
+    """Test suite for the Count-Min sketch"""
+
+    def test_estimates_within_bound(self, zipf_stream):
+        """Test that estimates never undercount and stay within epsilon * total"""
+        sketch = CountMinSketch(width=512, depth=5)
+        for term in zipf_stream:
+            sketch.add(term)
+
+        bound = sketch.epsilon * sketch.total
+        for term, count in Counter(zipf_stream).items():
+            estimate = sketch.estimate(term)
+            assert count <= estimate <= count + bound
+
+    def test_merge_equals_single_stream(self, zipf_stream):
+        """Test that merged sketches equal one sketch over the whole stream"""
+        whole, left, right = CountMinSketch(256, 4), CountMinSketch(256, 4), CountMinSketch(256, 4)
+        for i, term in enumerate(zipf_stream):
+            whole.add(term)
+            (left if i % 2 else right).add(term)
+
+        merged = CountMinSketch.from_dict(left.to_dict()).merge(right)
+
+        assert merged.table == whole.table
+        assert merged.total == whole.total
+        with pytest.raises(ValueError):
+            merged.merge(CountMinSketch(128, 4))
+
+class TestSpaceSaving:
+    """Test suite for the Space-Saving heavy hitters summary"""
+
+    def test_finds_heavy_hitters(self, zipf_stream):
+        """Test that every item above total / capacity is tracked within its error"""
+        summary = SpaceSaving(capacity=50)
+        for term in zipf_stream:
+            summary.add(term)
+
+        exact = Counter(zipf_stream)
+        tracked = {item: (count, error) for item, count, error in summary.top(50)}
+        for item, count in exact.items():
+            if count > summary.max_error():
+                assert item in tracked
+        for item, (count, error) in tracked.items():
+            assert exact[item] <= count <= exact[item] + error
+            assert error <= summary.max_error()
+
+        assert [item for item, _, _ in summary.top(3)] == [item for item, _ in exact.most_common(3)]
+
+    def test_merge_keeps_top_items(self, zipf_stream):
+        """Test that merged summaries from two workers still rank the top terms"""
+        left, right = SpaceSaving(50), SpaceSaving(50)
+        for i, term in enumerate(zipf_stream):
+            (left if i % 3 else right).add(term)
+
+        merged = SpaceSaving.from_dict(left.to_dict()).merge(right)
+
+        exact = Counter(zipf_stream)
+        assert merged.total == len(zipf_stream)
+        assert [item for item, _, _ in merged.top(3)] == [item for item, _ in exact.most_common(3)]
+        for item, count, _ in merged.top(10):
+            assert count >= exact[item]
+
+class TestHyperLogLog:
+    """Test suite for the HyperLogLog distinct counter"""
+
+    @pytest.mark.parametrize('distinct', [10, 1000, 50000])
+    def test_count_within_error(self, distinct):
+        """Test that estimates stay within four standard errors"""
+        sketch = HyperLogLog(precision=12)
+        for i in range(distinct):
+            sketch.add(f'user_{i}')
+            sketch.add(f'user_{i}')
+
+        assert abs(sketch.count() - distinct) <= max(2, 4 * sketch.relative_error * distinct)
+
+    def test_merge_is_union(self):
+        """Test that merging counts the union of both streams"""
+        left, right = HyperLogLog(10), HyperLogLog(10)
+        for i in range(3000):
+            left.add(f'user_{i}')
+        for i in range(2000, 5000):
+            right.add(f'user_{i}')
+
+        merged = HyperLogLog.from_dict(left.to_dict()).merge(right)
+
+        assert abs(merged.count() - 5000) <= 4 * merged.relative_error * 5000
+
+class TestLiveStats:
+    """Test suite for windowed live statistics"""
+
+    def test_query(self):
+        """Test the live view of recent searches"""
+        live = LiveStats(bucket_seconds=60, buckets=10, capacity=20)
+        for i in range(300):
+            live.add(f'user_{i % 40}', 'Ring' if i % 3 else f'term {i}')
+        live.add('user_0', '')
+
+        stats = live.query(top_k=3)
+
+        assert stats['total_searches'] == 301
+        assert abs(stats['distinct_users'] - 40) <= 2
+        assert stats['popular_terms'][0]['_id'] == 'Ring'
+        assert stats['popular_terms'][0]['count'] == 200
+        assert stats['window_seconds'] == 600
+        assert set(stats['error_bounds']) == {
+            'distinct_users_relative_std_error', 'term_count_max_overestimate',
+            'term_count_cms_overestimate', 'term_count_cms_failure_probability'
+        }
+
+    def test_query_merges_outside_lock(self, mocker):
+        """Test that searches are not blocked while a query merges sketches"""
+        live = LiveStats(bucket_seconds=60, buckets=10)
+        live.add('frodo', 'Ring')
+        locked = []
+        mocker.patch('app.services.live_stats._Bucket.merge', lambda bucket, other: locked.append(live._lock.locked()))
+
+        live.query()
+
+        assert locked == [False]
+
+    def test_query_copies_local_buckets(self):
+        """Test that a query result does not change with later searches"""
+        live = LiveStats(bucket_seconds=60, buckets=10)
+        live.add('frodo', 'Ring')
+        stats = live.query()
+
+        live.add('sam', 'Ring')
+
+        assert stats['total_searches'] == 1
+        assert stats['popular_terms'][0]['count'] == 1
+        assert live.query()['total_searches'] == 2
+
+    def test_window_excludes_old_buckets(self):
+        """Test that searches outside the window are not counted"""
+        live = LiveStats(bucket_seconds=60, buckets=10)
+        now = time.time()
+        live.add('frodo', 'Ring', timestamp=now - 300)
+        live.add('sam', 'Ring', timestamp=now)
+
+        assert live.query(buckets=1)['total_searches'] == 1
+        assert live.query()['total_searches'] == 2
+
+    def test_snapshots_merge_workers(self):
+        """Test that workers see each other's searches after a snapshot"""
+        collection = mongomock.MongoClient().db.search_stats_sketches
+        first = LiveStats(bucket_seconds=60, buckets=5, worker_id='a')
+        second = LiveStats(bucket_seconds=60, buckets=5, worker_id='b')
+        for i in range(50):
+            first.add(f'user_{i}', 'Ring')
+            second.add(f'user_{i + 25}', 'Hobbit')
+
+        assert first.snapshot(collection) == 1
+        second.snapshot(collection)
+        first.snapshot(collection)
+
+        for live in (first, second):
+            stats = live.query()
+            assert stats['workers'] == 2
+            assert stats['total_searches'] == 100
+            assert abs(stats['distinct_users'] - 75) <= 3
+            assert {term['_id'] for term in stats['popular_terms']} == {'Ring', 'Hobbit'}
+
+        # Unchanged buckets are not rewritten
+        assert first.snapshot(collection) == 0
+
+class TestLiveStatsRoute:
+    """Test suite for /api/history/stats/live"""
+
+    def test_live_stats(self, app, client):
+        """Test that searches show up immediately in the live view"""
+        with app.app_context():
+            history_service = HistoryService.from_app(app)
+            history_service.add_search('frodo', 'Ring', 1)
+            history_service.add_search('sam', 'Ring', 1)
+            history_service.add_search('sam', 'Hobbit', 1)
+
+        response = client.get('/api/history/stats/live?hours=1&limit=1')
+        data = json.loads(response.data)
+
+        assert response.status_code == 200
+        assert data['total_searches'] == 3
+        assert data['distinct_users'] == 2
+        assert data['popular_terms'] == [{'_id': 'Ring', 'count': 2, 'max_error': 0}]
+        assert data['window_seconds'] == 3600
+
+    def test_live_stats_invalid_params(self, client):
+        """Test parameter validation"""
+        assert client.get('/api/history/stats/live?hours=abc').status_code == 400
+        data = json.loads(client.get('/api/history/stats/live?hours=1000').data)
+        assert data['window_seconds'] == 24 * 3600
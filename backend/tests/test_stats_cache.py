@@ -0,0 +1,152 @@
+# tests/test_stats_cache.py
+
+import json
+import threading
+import time
+import pytest
+from app.services.history_service import HistoryService
+from app.services.stats_cache import StatsCache
+
+class CountingLoader:
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, days):
+        time.sleep(self.delay)
+        with self._lock:
+            self.calls += 1
+            return {'period_days': days, 'version': self.calls}
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+class TestStatsCache:
+    """Test suite for the history statistics cache"""
+
+    def test_hit_after_miss(self):
+        """Test that a window is computed once and then served from memory"""
+        loader = CountingLoader()
+        cache = StatsCache(loader, ttl=60)
+
+        assert cache.get(7) == {'period_days': 7, 'version': 1}
+        assert cache.get(7) == {'period_days': 7, 'version': 1}
+        assert cache.get(30)['period_days'] == 30
+
+        assert loader.calls == 2
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 2
+
+    def test_concurrent_misses_coalesced(self):
+        """Test that simultaneous cold requests share one recompute"""
+        loader = CountingLoader(delay=0.1)
+        cache = StatsCache(loader)
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(cache.get(7))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert loader.calls == 1
+        assert all(result == results[0] for result in results)
+        assert cache.stats()['coalescing']['collapsed'] == 7
+
+    def test_bump_serves_stale_and_refreshes(self):
+        """Test that a write soft-expires entries instead of blocking readers"""
+        loader = CountingLoader(delay=0.05)
+        cache = StatsCache(loader, ttl=60, min_refresh_interval=0)
+        cache.get(7)
+
+        cache.bump()
+
+        assert cache.get(7)['version'] == 1
+        wait_for(lambda: cache.get(7)['version'] == 2)
+        assert loader.calls == 2
+        assert cache.stats()['stale'] >= 1
+
+    def test_min_refresh_interval(self):
+        """Test that a steady stream of writes does not trigger back-to-back recomputes"""
+        loader = CountingLoader()
+        cache = StatsCache(loader, ttl=60, min_refresh_interval=60)
+        cache.get(7)
+
+        for _ in range(5):
+            cache.bump()
+            assert cache.get(7)['version'] == 1
+
+        assert loader.calls == 1
+
+    def test_ttl_soft_expiry(self):
+        """Test that old entries are refreshed even without writes"""
+        loader = CountingLoader()
+        cache = StatsCache(loader, ttl=0.05, min_refresh_interval=0)
+        cache.get(7)
+
+        time.sleep(0.06)
+
+        assert cache.get(7)['version'] == 1
+        wait_for(lambda: cache.get(7)['version'] == 2)
+
+    def test_invalidate(self):
+        """Test that invalidation forces the next read to recompute"""
+        loader = CountingLoader()
+        cache = StatsCache(loader, ttl=60)
+        cache.get(7)
+
+        cache.invalidate()
+
+        assert cache.get(7)['version'] == 2
+        assert cache.stats()['entries'] == 1
+
+    def test_refresh_all(self):
+        """Test the scheduled refresh of every cached window"""
+        loader = CountingLoader()
+        cache = StatsCache(loader, ttl=60)
+        cache.get(7)
+        cache.get(30)
+
+        cache.refresh_all()
+
+        assert loader.calls == 4
+        assert cache.get(7)['version'] in (3, 4)
+        assert cache.stats()['hits'] == 1
+
+class TestStatsCacheRoutes:
+    """Test suite for the cached /api/history/stats route"""
+
+    def test_stats_cached_between_polls(self, app, client):
+        """Test that repeated polls hit the cache"""
+        client.get('/api/history/stats?days=7')
+        client.get('/api/history/stats?days=7')
+
+        stats = json.loads(client.get('/api/history/stats/cache').data)
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+
+    def test_add_search_bumps_generation(self, app, client):
+        """Test that new searches make the cached stats stale"""
+        app.history_stats.min_refresh_interval = 0
+        client.get('/api/history/stats')
+
+        with app.app_context():
+            HistoryService.from_app(app).add_search('frodo', 'Ring', 1)
+
+        assert app.history_stats.generation == 1
+        wait_for(lambda: json.loads(client.get('/api/history/stats').data)['total_searches'] == 1)
+
+    def test_clear_history_invalidates(self, app, client):
+        """Test that clearing history is reflected immediately"""
+        with app.app_context():
+            HistoryService.from_app(app).add_search('frodo', 'Ring', 1)
+        assert json.loads(client.get('/api/history/stats').data)['total_searches'] == 1
+
+        client.post('/api/history/clear', json={'confirm': True})
+
+        assert json.loads(client.get('/api/history/stats').data)['total_searches'] == 0
@@ -0,0 +1,80 @@
+# tests/test_streaming.py
+
+import gzip
+import json
+import pytest
+from app.utils.streaming import stream_json_array
+
+def make_items(count):
+    return ({'_id': str(i), 'dialog': f'Quote number {i}'} for i in range(count))
+
+class TestStreamJsonArray:
+    """Test suite for streamed JSON responses"""
+
+    def test_small_body_sent_plain(self, app):
+        """Test that bodies under the threshold are not streamed or compressed"""
+        with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+            response = stream_json_array('quotes', make_items(2))
+
+            assert not response.is_streamed
+            assert 'Content-Encoding' not in response.headers
+            assert json.loads(response.get_data())['quotes'][1]['_id'] == '1'
+
+    def test_large_body_gzip(self, app):
+        """Test that large bodies are streamed with gzip when accepted"""
+        with app.test_request_context(headers={'Accept-Encoding': 'gzip, deflate'}):
+            response = stream_json_array('quotes', make_items(5000))
+
+            assert response.is_streamed
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert 'Accept-Encoding' in response.headers['Vary']
+            data = json.loads(gzip.decompress(b''.join(response.response)))
+
+        assert len(data['quotes']) == 5000
+
+    def test_large_body_brotli(self, app):
+        """Test that brotli is preferred when installed and accepted"""
+        brotli = pytest.importorskip('brotli')
+        with app.test_request_context(headers={'Accept-Encoding': 'gzip, br'}):
+            response = stream_json_array('quotes', make_items(5000))
+
+            assert response.headers['Content-Encoding'] == 'br'
+            data = json.loads(brotli.decompress(b''.join(response.response)))
+
+        assert len(data['quotes']) == 5000
+
+    def test_identity_when_not_accepted(self, app):
+        """Test that clients without Accept-Encoding get an uncompressed stream"""
+        with app.test_request_context():
+            response = stream_json_array('quotes', make_items(5000))
+
+            assert response.is_streamed
+            assert 'Content-Encoding' not in response.headers
+            assert len(json.loads(b''.join(response.response))['quotes']) == 5000
+
+    def test_items_consumed_lazily(self, app):
+        """Test that only the first chunk is serialized before the body is read"""
+        pulled = []
+
+        def items():
+            for item in make_items(100000):
+                pulled.append(1)
+                yield item
+
+        with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+            response = stream_json_array('quotes', items())
+            assert len(pulled) < 100
+
+            first_chunk = next(iter(response.response))
+            assert first_chunk
+            assert len(pulled) < 2000
+
+    def test_error_before_first_chunk_propagates(self, app):
+        """Test that an early failure is raised to the caller"""
+        def failing():
+            raise RuntimeError('upstream down')
+            yield
+
+        with app.test_request_context():
+            with pytest.raises(RuntimeError):
+                stream_json_array('quotes', failing())
@@ -0,0 +1,38 @@
+# tests/test_upstream_client.py
+
+from app.services.upstream_client import UpstreamClient
+
+class TestUpstreamClient:
+    """Test suite for the shared upstream HTTP client"""
+
+    def test_client_is_app_scoped(self, app):
+        """Test that every LotrService reuses the client created in create_app"""
+        from app.services.lotr_service import LotrService
+
+        with app.test_request_context():
+            assert LotrService().client is app.upstream
+            assert LotrService().client.session is app.upstream.session
+
+    def test_pool_and_retry_configuration(self):
+        """Test that the session adapter honours pool size and retry settings"""
+        client = UpstreamClient('https://example.test', token='abc', pool_size=7,
+                                max_retries=2, backoff_factor=0.1)
+        adapter = client.session.get_adapter('https://example.test/movie')
+
+        assert adapter._pool_maxsize == 7
+        assert adapter.max_retries.total == 2
+        assert adapter.max_retries.backoff_factor == 0.1
+        assert client.session.headers['Authorization'] == 'Bearer abc'
+
+    def test_default_timeout_applied(self, monkeypatch):
+        """Test that connect/read timeouts are sent with every request"""
+        client = UpstreamClient('https://example.test', connect_timeout=1, read_timeout=5)
+        seen = {}
+
+        def mock_get(session, url, **kwargs):
+            seen.update(kwargs)
+
+        monkeypatch.setattr('requests.Session.get', mock_get)
+        client.get('https://example.test/movie')
+
+        assert seen['timeout'] == (1, 5)